@@ -0,0 +1,102 @@
+#! /usr/bin/env jython
+"""
+Compares the native DMR to python conversion used by the command handlers with the JSON round trip
+(toJSONString + json.loads) that was used previously.
+
+Usage:
+    JBOSS_HOME=/opt/keycloak jython benchmarks/dmr_conversion.py --datasources 500 --rounds 5
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import argparse
+import time
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from jyboss.context import JyBossContext
+from jyboss.command.core import convert_dmr_to_python, expression_deserializer
+
+__metaclass__ = type
+
+
+def json_route(node):
+    return json.loads(node.toJSONString(True), object_hook=expression_deserializer)
+
+
+def native_route(node):
+    return convert_dmr_to_python(node)
+
+
+def build_model(datasources, attributes):
+    """
+    Build a synthetic datasources subsystem that looks like a recursive read-resource result.
+    """
+    # noinspection PyUnresolvedReferences
+    from org.jboss.dmr import ModelNode, ValueExpression
+
+    root = ModelNode()
+    ds_type = root.get('data-source')
+    for i in range(datasources):
+        ds = ds_type.get('DS%d' % i)
+        for a in range(attributes):
+            kind = a % 4
+            if kind == 0:
+                ds.get('string-attribute-%d' % a).set('value-%d-%d' % (i, a))
+            elif kind == 1:
+                ds.get('int-attribute-%d' % a).set(a)
+            elif kind == 2:
+                ds.get('bool-attribute-%d' % a).set(a % 2 == 0)
+            else:
+                ds.get('expression-attribute-%d' % a).set(ValueExpression('${ds.%d.attr.%d:default}' % (i, a)))
+        props = ds.get('connection-properties')
+        for p in range(5):
+            props.get('prop-%d' % p).get('value').set('%d' % p)
+    return root
+
+
+def measure(fun, node, rounds):
+    timings = []
+    result = None
+    for _ in range(rounds):
+        start = time.time()
+        result = fun(node)
+        timings.append(time.time() - start)
+    return min(timings), sum(timings) / len(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DMR to python conversion.')
+    parser.add_argument('--jboss-home', default=None, help='server home used to locate the jboss client libraries')
+    parser.add_argument('--datasources', type=int, default=200, help='number of synthetic datasources')
+    parser.add_argument('--attributes', type=int, default=60, help='number of attributes per datasource')
+    parser.add_argument('--rounds', type=int, default=5, help='number of measured rounds per route')
+    args = parser.parse_args()
+
+    # make sure the jboss client libraries are on the classpath
+    context = JyBossContext(jboss_home=args.jboss_home)
+    context.create_cli()
+
+    node = build_model(args.datasources, args.attributes)
+    print('model: %d datasources, %d attributes each, %d bytes of JSON' % (
+        args.datasources, args.attributes, len(node.toJSONString(True))))
+
+    # warm up the JIT for both routes
+    json_route(node)
+    native_route(node)
+
+    j_min, j_avg, j_result = measure(json_route, node, args.rounds)
+    n_min, n_avg, n_result = measure(native_route, node, args.rounds)
+
+    print('%-8s min %8.3fs avg %8.3fs' % ('json', j_min, j_avg))
+    print('%-8s min %8.3fs avg %8.3fs' % ('native', n_min, n_avg))
+    print('speedup  %.2fx' % (j_avg / n_avg if n_avg > 0 else float('inf')))
+    print('results equal: %s' % (j_result == n_result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+"""
+In memory stand-in for a server management controller. It executes the subset of the DMR operations the jyboss
+modules use (read-resource, read-attribute, read-children-names, write-attribute, undefine-attribute, add, remove,
+list and map operations and composite) so module applies can be timed without a server. Every request handed to the
+controller is one round trip, an optional latency simulates the network hop to a remote controller.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import time
+from collections import OrderedDict
+
+from jyboss.context import Connection
+from jyboss.exceptions import ContextError
+from jyboss.command.core import dmr_address, address_to_path
+from jyboss.offline import OfflineCli
+
+__metaclass__ = type
+
+
+class _OperationFailure(Exception):
+    pass
+
+
+def _not_found(address):
+    return _OperationFailure("WFLYCTL0216: Management resource '%s' not found" % address_to_path(address))
+
+
+def default_schema(context):
+    """
+    Collect the attribute names of the resource types the benchmarks apply from the jyboss modules, so the read
+    results contain undefined attributes the same way a server does.
+
+    :param context: {JyBossContext} - the context to create the modules with
+    :return: {dict} - attribute names keyed by resource type or type=name
+    """
+    from jyboss.command.datasources import DatasourcesModule
+    from jyboss.command.infinispan import CacheContainerModule, TransportModule, LocalCache
+    from jyboss.command.undertow import UndertowHttpListenerModule, UndertowAjpListenerModule
+
+    schema = {
+        'subsystem=datasources': DatasourcesModule.SUBSYSTEM_PARAMS,
+        'data-source': DatasourcesModule.DATASOURCE_PARAMS,
+        'xa-data-source': DatasourcesModule.DATASOURCE_PARAMS,
+        'jdbc-driver': DatasourcesModule.JDBC_DRIVER_PARAMS,
+        'cache-container': CacheContainerModule.CONTAINER_PARAMS,
+        'transport=TRANSPORT': TransportModule.TRANSPORT_PARAMS,
+        'http-listener': UndertowHttpListenerModule.LISTENER_PARAMS,
+        'ajp-listener': UndertowAjpListenerModule.LISTENER_PARAMS
+    }
+    cache = LocalCache(context)
+    for cache_type in ['local-cache', 'replicated-cache', 'invalidation-cache', 'distributed-cache']:
+        schema[cache_type] = cache.cache_params
+    for component_type, component in cache.cache_modules.items():
+        schema['component=%s' % component_type] = component.component_params
+    return schema
+
+
+class _Resource(object):
+    """
+    a management resource with its attributes and child resources
+    """
+
+    def __init__(self, attribute_names=None):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        self.attributes = ModelNode()
+        self.attributes.setEmptyObject()
+        for name in attribute_names or []:
+            self.attributes.get(name)
+        self.children = OrderedDict()
+
+    def child(self, child_type, name):
+        return self.children.get(child_type, {}).get(name)
+
+    def clone(self):
+        resource = _Resource()
+        resource.attributes = self.attributes.clone()
+        for child_type, children in self.children.items():
+            resource.children[child_type] = OrderedDict((n, c.clone()) for n, c in children.items())
+        return resource
+
+    def read(self, recursive, attributes_only=False):
+        node = self.attributes.clone()
+        if attributes_only:
+            return node
+        for child_type, children in self.children.items():
+            child_node = node.get(child_type)
+            if len(children) == 0:
+                continue
+            for name, child in children.items():
+                if recursive:
+                    child_node.get(name).set(child.read(recursive))
+                else:
+                    child_node.get(name)
+        return node
+
+
+class InMemoryController(object):
+    """
+    executes management operation requests against a model held in memory
+    """
+
+    def __init__(self, schema=None, latency=0.0):
+        """
+        :param schema: {dict} - attribute names keyed by resource type or type=name, see default_schema
+        :param latency: {float} - seconds to wait for every round trip
+        """
+        self.schema = schema if schema is not None else {}
+        self.latency = latency
+        self.root = _Resource()
+        self.round_trips = 0
+        self.operations = 0
+        # the offline cli saves a dirty model, the controller has nothing to save
+        self.dirty = False
+
+    def reset_stats(self):
+        self.round_trips = 0
+        self.operations = 0
+
+    def attribute_names(self, child_type, name):
+        names = self.schema.get('%s=%s' % (child_type, name))
+        return names if names is not None else self.schema.get(child_type, [])
+
+    def execute(self, request):
+        """
+        Execute a management operation, a composite counts as a single round trip.
+
+        :param request: {ModelNode} - the operation request
+        :return: {ModelNode} - the operation response with outcome and result or failure-description
+        """
+        self.round_trips += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return self._respond(request)
+
+    def _respond(self, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        operation = request.get('operation').asString()
+        if operation == 'composite':
+            return self._composite(request)
+        self.operations += 1
+        response = ModelNode()
+        try:
+            result = self._execute(operation, dmr_address(request), request)
+            response.get('outcome').set('success')
+            if result is not None:
+                response.get('result').set(result)
+        except _OperationFailure as e:
+            response.get('outcome').set('failed')
+            response.get('failure-description').set(e.args[0])
+            response.get('rolled-back').set(True)
+        return response
+
+    def _composite(self, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        response = ModelNode()
+        snapshot = self.root.clone()
+        failed = None
+        steps = request.get('steps').asList()
+        for i in range(steps.size()):
+            step_response = self._respond(steps.get(i))
+            response.get('result').get('step-%d' % (i + 1)).set(step_response)
+            if step_response.get('outcome').asString() != 'success':
+                failed = 'step-%d: %s' % (i + 1, step_response.get('failure-description').asString())
+                break
+        if failed is not None:
+            self.root = snapshot
+            response.get('outcome').set('failed')
+            response.get('failure-description').set(
+                'WFLYCTL0062: Composite operation failed and was rolled back. Steps that failed: %s' % failed)
+            response.get('rolled-back').set(True)
+        else:
+            response.get('outcome').set('success')
+        return response
+
+    def _resolve(self, address):
+        resource = self.root
+        for child_type, name in address:
+            resource = resource.child(child_type, name)
+            if resource is None:
+                raise _not_found(address)
+        return resource
+
+    def _expand(self, address):
+        """
+        resolve the wildcard names of an address to all existing addresses
+        """
+        addresses = [[]]
+        for child_type, name in address:
+            expanded = []
+            for parent_address in addresses:
+                parent = self._resolve(parent_address)
+                names = list(parent.children.get(child_type, {}).keys()) if name == '*' else [name]
+                expanded += [parent_address + [(child_type, n)] for n in names]
+            addresses = expanded
+        return addresses
+
+    def _execute(self, operation, address, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+
+        if operation in ['reload', 'shutdown'] and len(address) == 0:
+            return None
+
+        if operation == 'add':
+            return self._add(address, request)
+
+        if operation == 'read-resource' and '*' in [name for _, name in address]:
+            # a wildcard read answers with the address and result of every matching resource
+            result = ModelNode()
+            result.setEmptyList()
+            for resource_address in self._expand(address):
+                item = ModelNode()
+                item_address = item.get('address')
+                item_address.setEmptyList()
+                for child_type, name in resource_address:
+                    item_address.add(child_type, name)
+                item.get('outcome').set('success')
+                item.get('result').set(self._read_resource(resource_address, request))
+                result.add(item)
+            return result
+
+        resource = self._resolve(address)
+
+        if operation == 'read-resource':
+            return self._read_resource(address, request)
+
+        elif operation == 'read-attribute':
+            name = request.get('name').asString()
+            if not resource.attributes.has(name):
+                raise _OperationFailure("WFLYCTL0201: Unknown attribute '%s'" % name)
+            return resource.attributes.get(name).clone()
+
+        elif operation == 'write-attribute':
+            resource.attributes.get(request.get('name').asString()).set(
+                request.get('value') if request.has('value') else ModelNode())
+            return None
+
+        elif operation == 'undefine-attribute':
+            resource.attributes.get(request.get('name').asString()).set(ModelNode())
+            return None
+
+        elif operation == 'remove':
+            if len(address) == 0:
+                raise _OperationFailure('the root resource cannot be removed')
+            child_type, name = address[-1]
+            del self._resolve(address[:-1]).children[child_type][name]
+            return None
+
+        elif operation == 'read-children-names':
+            result = ModelNode()
+            result.setEmptyList()
+            for name in resource.children.get(request.get('child-type').asString(), {}).keys():
+                result.add(name)
+            return result
+
+        elif operation == 'read-children-types':
+            result = ModelNode()
+            result.setEmptyList()
+            for child_type in resource.children.keys():
+                result.add(child_type)
+            return result
+
+        elif operation in ['list-add', 'list-remove', 'list-clear']:
+            return self._list_operation(operation, resource, request)
+
+        elif operation in ['map-put', 'map-remove', 'map-clear']:
+            return self._map_operation(operation, resource, request)
+
+        else:
+            raise _OperationFailure("WFLYCTL0031: No operation named '%s' exists at address %s" %
+                                    (operation, address_to_path(address)))
+
+    def _read_resource(self, address, request):
+        recursive = request.get('recursive').asBoolean(False) if request.has('recursive') else False
+        attributes_only = request.get('attributes-only').asBoolean(False) \
+            if request.has('attributes-only') else False
+        return self._resolve(address).read(recursive, attributes_only)
+
+    def _add(self, address, request):
+        if len(address) == 0:
+            raise _OperationFailure("WFLYCTL0212: Duplicate resource %s" % address_to_path(address))
+        parent = self._resolve(address[:-1])
+        child_type, name = address[-1]
+        if parent.child(child_type, name) is not None:
+            raise _OperationFailure("WFLYCTL0212: Duplicate resource %s" % address_to_path(address))
+        resource = _Resource(self.attribute_names(child_type, name))
+        for key in request.keys():
+            if key not in ['operation', 'address', 'operation-headers'] and request.get(key).isDefined():
+                resource.attributes.get(key).set(request.get(key))
+        parent.children.setdefault(child_type, OrderedDict())[name] = resource
+        return None
+
+    @staticmethod
+    def _list_operation(operation, resource, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        current = resource.attributes.get(request.get('name').asString())
+        items = [] if not current.isDefined() else [item.clone() for item in current.asList()]
+        if operation == 'list-clear':
+            items = []
+        elif operation == 'list-add':
+            index = request.get('index').asInt() if request.has('index') else len(items)
+            items.insert(index, request.get('value').clone())
+        elif request.has('index'):
+            del items[request.get('index').asInt()]
+        else:
+            items = [item for item in items if not item.equals(request.get('value'))]
+        value = ModelNode()
+        value.setEmptyList()
+        for item in items:
+            value.add(item)
+        current.set(value)
+        return None
+
+    @staticmethod
+    def _map_operation(operation, resource, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        current = resource.attributes.get(request.get('name').asString())
+        entries = ModelNode()
+        entries.setEmptyObject()
+        if current.isDefined() and operation != 'map-clear':
+            for key in current.keys():
+                entries.get(key).set(current.get(key))
+        if operation == 'map-put':
+            entries.get(request.get('key').asString()).set(request.get('value'))
+        elif operation == 'map-remove' and entries.has(request.get('key').asString()):
+            entries.remove(request.get('key').asString())
+        current.set(entries)
+        return None
+
+
+class ControllerCli(OfflineCli):
+    """
+    a drop in for the jyboss Cli that executes the operations on an in memory controller
+    """
+
+    def __init__(self, controller):
+        super(ControllerCli, self).__init__(config_path=None)
+        self.controller = controller
+
+    def connect(self):
+        if self.model is not None:
+            raise ContextError('%s: already connected to the controller' % self.__class__.__name__)
+        # noinspection PyUnresolvedReferences
+        from org.jboss.as.cli import CommandContextFactory
+        # a command context that is never connected is only used to parse the cli operations
+        self.ctx = CommandContextFactory.getInstance().newCommandContext()
+        self.model = self.controller
+
+    def disconnect(self):
+        try:
+            self.check_not_connected()
+        finally:
+            if self.ctx is not None:
+                self.ctx.terminateSession()
+            self.ctx = None
+            self.model = None
+
+
+class ControllerConnection(Connection):
+    """
+    a connection to an in memory controller
+    """
+
+    def __init__(self, controller, context=None):
+        super(ControllerConnection, self).__init__(context=context)
+        self.controller = controller
+
+    def connect(self):
+        self.context.register_change_handler(self)
+
+        if self.jcli is not None and self.jcli.is_connected():
+            raise ContextError('%s.connect: this resource is already connected' % self.__class__.__name__)
+
+        # the jboss client libraries are needed to parse the cli operations and to build the dmr results
+        self.context.create_cli()
+        jcli = ControllerCli(self.controller)
+        jcli.connect()
+        jcli.stats = self.context.stats
+        self.jcli = jcli
+
+    def _connect(self, cli):
+        pass
+
+    def get_mode(self):
+        return 'controller'
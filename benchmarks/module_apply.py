@@ -0,0 +1,195 @@
+#! /usr/bin/env jython
+"""
+Times the apply of the jyboss modules on synthetic configurations of increasing size against an in memory management
+controller (see benchmarks/fake_controller.py). Each scenario seeds the controller with the existing resources, then
+applies instructions that update a share of them and add a few new ones. The numbers reported per apply are the wall
+time, the round trips and operations sent to the controller and the memory allocated and retained by the apply.
+
+Usage:
+    JBOSS_HOME=/opt/keycloak jython benchmarks/module_apply.py --sizes 10,100,1000 --modes plain,composite,plan
+    JBOSS_HOME=/opt/keycloak jython benchmarks/module_apply.py --scenarios datasources --latency-ms 2
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import argparse
+import time
+
+from jyboss.context import JyBossContext
+from jyboss.runner import create_change_processor, execute_instructions
+
+from fake_controller import InMemoryController, ControllerConnection, default_schema
+
+__metaclass__ = type
+
+MODES = ['plain', 'cache', 'composite', 'plan']
+
+
+def seed_datasources(size):
+    cmds = ['/subsystem=datasources:add()']
+    for i in range(size):
+        cmds.append('/subsystem=datasources/data-source=DS%d:add(jndi-name="java:/jdbc/DS%d", '
+                    'connection-url="jdbc:h2:mem:ds%d", driver-name=h2, max-pool-size=10)' % (i, i, i))
+    return cmds
+
+
+def datasources(size, changed):
+    return {'datasources': {'data-source': [{
+        'name': 'DS%d' % i,
+        'state': 'present',
+        'jndi-name': 'java:/jdbc/DS%d' % i,
+        'connection-url': 'jdbc:h2:mem:ds%d' % i,
+        'driver-name': 'h2',
+        'max-pool-size': 20 if i < changed else 10
+    } for i in range(size)]}}
+
+
+def seed_caches(size):
+    cmds = ['/subsystem=infinispan:add()',
+            '/subsystem=infinispan/cache-container=bench:add(default-cache=c0)']
+    for i in range(size):
+        cmds.append('/subsystem=infinispan/cache-container=bench/local-cache=c%d:add(statistics-enabled=false)' % i)
+        cmds.append('/subsystem=infinispan/cache-container=bench/local-cache=c%d/component=locking:add('
+                    'isolation=READ_COMMITTED)' % i)
+    return cmds
+
+
+def caches(size, changed):
+    return {'infinispan': {'state': 'present', 'cache-container': [{
+        'name': 'bench',
+        'state': 'present',
+        'default-cache': 'c0',
+        'caches': [{
+            'name': 'c%d' % i,
+            'type': 'local-cache',
+            'state': 'present',
+            'statistics-enabled': i < changed,
+            'locking': {'isolation': 'READ_COMMITTED'}
+        } for i in range(size)]
+    }]}}
+
+
+def seed_listeners(size):
+    cmds = ['/subsystem=undertow:add()', '/subsystem=undertow/server=default-server:add()']
+    for i in range(size):
+        cmds.append('/subsystem=undertow/server=default-server/http-listener=L%d:add(socket-binding=http%d, '
+                    'max-connections=100)' % (i, i))
+    return cmds
+
+
+def listeners(size, changed):
+    return {'undertow': {'server_name': 'default-server', 'http_listener': [{
+        'name': 'L%d' % i,
+        'state': 'present',
+        'socket-binding': 'http%d' % i,
+        'max-connections': 200 if i < changed else 100
+    } for i in range(size)]}}
+
+
+SCENARIOS = {
+    'datasources': (seed_datasources, datasources),
+    'caches': (seed_caches, caches),
+    'listeners': (seed_listeners, listeners)
+}
+
+
+class MemoryProbe(object):
+    """
+    measures the bytes allocated by the current thread and the heap retained between two points
+    """
+
+    def __init__(self):
+        # noinspection PyUnresolvedReferences
+        from java.lang import Runtime, Thread
+        # noinspection PyUnresolvedReferences
+        from java.lang.management import ManagementFactory
+        self.runtime = Runtime.getRuntime()
+        self.thread_id = Thread.currentThread().getId()
+        threads = ManagementFactory.getThreadMXBean()
+        # only the hotspot flavour of the bean can report allocations
+        self.threads = threads if hasattr(threads, 'getThreadAllocatedBytes') else None
+
+    def used(self):
+        # noinspection PyUnresolvedReferences
+        from java.lang import System
+        System.gc()
+        return self.runtime.totalMemory() - self.runtime.freeMemory()
+
+    def allocated(self):
+        return self.threads.getThreadAllocatedBytes(self.thread_id) if self.threads is not None else 0
+
+
+def run(context, scenario, size, mode, args, probe):
+    seed, instructions = SCENARIOS[scenario]
+    existing = size - int(size * args.new_ratio)
+    params = instructions(size, int(size * args.change_ratio))
+    params['plan'] = mode == 'plan'
+
+    controller = InMemoryController(schema=default_schema(context))
+    connection = ControllerConnection(controller, context)
+    connection.connect()
+    try:
+        for cmd in seed(existing):
+            response = connection.jcli.cmd(cmd).getResponse()
+            if response.get('outcome').asString() != 'success':
+                raise RuntimeError('failed to seed the controller with %s: %s' % (cmd, response))
+
+        context.cache = mode == 'cache'
+        context.composite = mode == 'composite'
+        change_processor = create_change_processor(context)
+        controller.latency = args.latency_ms / 1000.0
+        controller.reset_stats()
+
+        used = probe.used()
+        allocated = probe.allocated()
+        start = time.time()
+        execute_instructions(context, params, change_processor)
+        elapsed = time.time() - start
+        allocated = probe.allocated() - allocated
+        retained = probe.used() - used
+    finally:
+        connection.disconnect()
+        context.cache = False
+        context.composite = False
+
+    return elapsed, controller.round_trips, controller.operations, allocated, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark module apply against an in memory controller.')
+    parser.add_argument('--jboss-home', default=None, help='server home used to locate the jboss client libraries')
+    parser.add_argument('--scenarios', default=','.join(sorted(SCENARIOS.keys())),
+                        help='comma separated scenarios to run')
+    parser.add_argument('--sizes', default='10,100,1000', help='comma separated number of resources per scenario')
+    parser.add_argument('--modes', default=','.join(MODES), help='comma separated apply modes %s' % MODES)
+    parser.add_argument('--change-ratio', type=float, default=0.1, help='share of the resources that is updated')
+    parser.add_argument('--new-ratio', type=float, default=0.1, help='share of the resources that is added')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated latency of every round trip')
+    parser.add_argument('--rounds', type=int, default=3, help='number of measured rounds per scenario')
+    args = parser.parse_args()
+
+    # make sure the jboss client libraries are on the classpath
+    context = JyBossContext(jboss_home=args.jboss_home)
+    context.create_cli()
+    context.interactive = False
+    probe = MemoryProbe()
+
+    print('%-12s %6s %-10s %9s %9s %7s %7s %10s %10s %10s' % (
+        'scenario', 'size', 'mode', 'min', 'avg', 'trips', 'ops', 'ms/trip', 'alloc KB', 'retain KB'))
+    for scenario in args.scenarios.split(','):
+        for size in [int(s) for s in args.sizes.split(',')]:
+            for mode in args.modes.split(','):
+                # warm up the JIT for the code path of the mode
+                run(context, scenario, size, mode, args, probe)
+                timings = [run(context, scenario, size, mode, args, probe) for _ in range(args.rounds)]
+                elapsed = [t[0] for t in timings]
+                _, trips, ops, allocated, retained = timings[-1]
+                avg = sum(elapsed) / len(elapsed)
+                print('%-12s %6d %-10s %8.3fs %8.3fs %7d %7d %10.3f %10d %10d' % (
+                    scenario, size, mode, min(elapsed), avg, trips, ops, avg * 1000 / trips if trips > 0 else 0,
+                    allocated // 1024, retained // 1024))
+
+
+if __name__ == '__main__':
+    main()
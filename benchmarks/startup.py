@@ -0,0 +1,75 @@
+#! /usr/bin/env jython
+"""
+Times the start of a fresh jython process that imports jyboss and loads the jboss cli, the cost every ansible task
+pays before it can talk to a server. Each stage runs in its own process, `cold` runs drop the classpath cache of the
+jboss home before every process, `cached` runs keep it and `manifest` runs use a pre-built classpath manifest.
+
+Usage:
+    JBOSS_HOME=/opt/keycloak jython benchmarks/startup.py --rounds 5
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from jyboss.classpath import ClasspathCache, write_manifest
+
+__metaclass__ = type
+
+STAGES = {
+    'import': 'import jyboss',
+    'cli': 'import jyboss; jyboss.jyboss.create_cli()'
+}
+
+MODES = ['cold', 'cached', 'manifest']
+
+
+def run(code, env):
+    start = time.time()
+    subprocess.check_call([sys.executable, '-c', code], env=env)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the start of a jython process with jyboss.')
+    parser.add_argument('--jboss-home', default=os.environ.get('JBOSS_HOME'), help='the server home to load the cli of')
+    parser.add_argument('--stages', default='import,cli', help='comma separated stages %s' % sorted(STAGES.keys()))
+    parser.add_argument('--modes', default=','.join(MODES), help='comma separated classpath modes %s' % MODES)
+    parser.add_argument('--rounds', type=int, default=5, help='number of measured processes per stage and mode')
+    args = parser.parse_args()
+    if args.jboss_home is None:
+        parser.error('--jboss-home or JBOSS_HOME must be set')
+
+    manifest = os.path.join(tempfile.mkdtemp(), 'classpath.txt')
+    write_manifest(args.jboss_home, manifest)
+
+    base_env = dict(os.environ)
+    base_env['JBOSS_HOME'] = args.jboss_home
+    base_env.pop('JYBOSS_CLASSPATH_MANIFEST', None)
+
+    print('%-8s %-10s %9s %9s %9s' % ('stage', 'mode', 'min', 'avg', 'max'))
+    for stage in args.stages.split(','):
+        for mode in args.modes.split(','):
+            env = dict(base_env)
+            if mode == 'manifest':
+                env['JYBOSS_CLASSPATH_MANIFEST'] = manifest
+            timings = []
+            # the first process warms the os file cache and fills the classpath cache
+            for i in range(args.rounds + 1):
+                if mode == 'cold':
+                    ClasspathCache.instance().invalidate(args.jboss_home)
+                elapsed = run(STAGES[stage], env)
+                if i > 0:
+                    timings.append(elapsed)
+            print('%-8s %-10s %8.3fs %8.3fs %8.3fs' % (
+                stage, mode, min(timings), sum(timings) / len(timings), max(timings)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,11 @@
 # Make coding more python3-ish
 from __future__ import (absolute_import, division, print_function)
 
-from jyboss.context import JyBossContext, MODE_EMBEDDED, MODE_STANDALONE
+from jyboss.context import JyBossContext, MODE_EMBEDDED, MODE_STANDALONE, MODE_OFFLINE
 from jyboss.context import ConnectionResource as _ConnectionResource
+# jyboss.command replaces itself in sys.modules to load its handlers lazily, an import that is not the first one is
+# resolved from sys.modules and always sees the replacement
+import jyboss.command as _command
 from jyboss.command import ls, cmd, cd, batch
 
 #
@@ -14,4 +17,5 @@ __metaclass__ = type
 jyboss = JyBossContext.instance()
 standalone = _ConnectionResource(MODE_STANDALONE, jyboss)
 embedded = _ConnectionResource(MODE_EMBEDDED, jyboss)
+offline = _ConnectionResource(MODE_OFFLINE, jyboss)
 disconnect = jyboss.disconnect
@@ -304,11 +304,15 @@ class AnsibleModule(object):
     """simple implementation of the python module util shipped with ansible"""
 
     def __init__(self, argument_spec, bypass_checks=False, required_together=None, required_one_of=None,
-                 required_if=None):
+                 required_if=None, supports_check_mode=False):
         self.argument_spec = argument_spec
+        self.supports_check_mode = supports_check_mode
 
         self._load_params()
 
+        self.check_mode = self.params.get('_ansible_check_mode', False)
+        self._diff = self.params.get('_ansible_diff', False)
+
         self._CHECK_ARGUMENT_TYPES_DISPATCHER = {
             'str': self._check_type_str,
             'list': self._check_type_list,
@@ -341,6 +345,9 @@ class AnsibleModule(object):
 
         self.pretty_print = self.params.get('pretty', False)
 
+        if self.check_mode and not self.supports_check_mode:
+            self.exit_json(skipped=True, msg='remote module does not support check mode')
+
     def fail_on_missing_params(self, required_params=None):
         """ This is for checking for required params when we can not check via argspec because we
         need more information than is simply given in the argspec.
@@ -0,0 +1,220 @@
+"""
+Location of the jboss client libraries of a server home. Every process start has to put the jboss cli client jars on
+the class path before the cli can be loaded. The jars found in a jboss home and the version of the cli they contain
+are kept in a cache in the jyboss home, so later processes neither have to search the server home nor open the jars.
+A pre-built classpath manifest, a text file listing one jar per line, takes precedence over the cache.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import sys
+import uuid
+import argparse
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from synchronize import make_synchronized
+from jyboss.exceptions import ContextError
+from jyboss.logging import debug, warn
+
+__metaclass__ = type
+
+DEFAULT_CACHE_FILE = 'classpath.json'
+
+# jars of a jboss home the cli needs, relative to the jboss home, the first one is the cli client
+CLIENT_JARS = [
+    os.path.join('bin', 'client', 'jboss-cli-client.jar'),
+    'jboss-modules.jar'
+]
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime]
+
+
+def cli_version(jar):
+    """
+    :param jar: {str} - the jboss cli client jar
+    :return: {str} - the implementation version in the manifest of the jar, None if the jar has no version
+    """
+    # noinspection PyUnresolvedReferences
+    from java.util.jar import JarFile, Attributes
+    jar_file = JarFile(jar)
+    try:
+        manifest = jar_file.getManifest()
+        if manifest is None:
+            return None
+        return manifest.getMainAttributes().getValue(Attributes.Name.IMPLEMENTATION_VERSION)
+    finally:
+        jar_file.close()
+
+
+def find_jars(jboss_home):
+    """
+    :param jboss_home: {str} - the jboss home to search
+    :return: {list(str)} - the client jars of the jboss home
+    """
+    jars = [os.path.join(jboss_home, jar) for jar in CLIENT_JARS]
+    if not os.path.isfile(jars[0]):
+        raise ContextError('jboss cli client library %s does not exist' % jars[0])
+    return [jar for jar in jars if os.path.isfile(jar)]
+
+
+def read_manifest(manifest):
+    """
+    Read a classpath manifest, relative jar paths are relative to the directory of the manifest. Lines starting with
+    # are comments.
+
+    :param manifest: {str} - the manifest file
+    :return: {list(str)} - the jars listed in the manifest
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest) as f:
+        lines = [line.strip() for line in f]
+    jars = [os.path.join(base_dir, line) for line in lines if line != '' and not line.startswith('#')]
+    for jar in jars:
+        if not os.path.isfile(jar):
+            raise ContextError('jar %s of classpath manifest %s does not exist' % (jar, manifest))
+    return jars
+
+
+def write_manifest(jboss_home, manifest):
+    """
+    Write the classpath manifest of a jboss home.
+
+    :param jboss_home: {str} - the jboss home to take the client jars from
+    :param manifest: {str} - the manifest file to write
+    :return: {list(str)} - the jars written to the manifest
+    """
+    jars = find_jars(jboss_home)
+    with open(manifest, 'w') as f:
+        f.write('# jboss client libraries of %s\n' % jboss_home)
+        for jar in jars:
+            f.write('%s\n' % os.path.abspath(jar))
+    return jars
+
+
+class ClasspathCache(object):
+    """
+    client jars and cli version by jboss home, an entry is dropped once one of its jars changes
+    """
+    _DEFAULT_INSTANCE = None
+
+    def __init__(self, cache_file=None):
+        """
+        :param cache_file: {str} - the file to persist the cache in, defaults to classpath.json in the jyboss home
+        """
+        if cache_file is None:
+            # the context imports this module while it loads the cli
+            from jyboss.context import get_jyboss_home
+            cache_file = os.path.join(get_jyboss_home(), DEFAULT_CACHE_FILE)
+        self.cache_file = cache_file
+        self._entries = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def instance():
+        if ClasspathCache._DEFAULT_INSTANCE is None:
+            ClasspathCache._DEFAULT_INSTANCE = ClasspathCache()
+        return ClasspathCache._DEFAULT_INSTANCE
+
+    @make_synchronized
+    def lookup(self, jboss_home):
+        """
+        :param jboss_home: {str} - the jboss home
+        :return: {dict} - the cached jars and version of the jboss home, None if it is not cached or changed since
+        """
+        entry = self._load().get(os.path.abspath(jboss_home))
+        if entry is None:
+            return None
+        try:
+            if all(_fingerprint(jar) == fingerprint for jar, fingerprint in entry['jars']):
+                return entry
+        except (OSError, KeyError, TypeError, ValueError):
+            pass
+        debug('%s: classpath of %s changed' % (self.__class__.__name__, jboss_home))
+        return None
+
+    @make_synchronized
+    def resolve(self, jboss_home):
+        """
+        Get the client jars and cli version of a jboss home, the jboss home is only searched if it is not cached.
+
+        :param jboss_home: {str} - the jboss home
+        :return: {tuple(list(str), str)} - the client jars and the cli version of the jboss home
+        """
+        entry = self.lookup(jboss_home)
+        if entry is not None:
+            self.hits += 1
+            return [jar for jar, _ in entry['jars']], entry.get('version')
+
+        self.misses += 1
+        jars = find_jars(jboss_home)
+        version = cli_version(jars[0])
+        self._load()[os.path.abspath(jboss_home)] = {
+            'jars': [[jar, _fingerprint(jar)] for jar in jars],
+            'version': version
+        }
+        self._save()
+        return jars, version
+
+    @make_synchronized
+    def invalidate(self, jboss_home=None):
+        """
+        Drop the cached classpath of a jboss home or of all.
+
+        :param jboss_home: {str} - the jboss home to drop, all if not set
+        """
+        entries = self._load()
+        if jboss_home is None:
+            entries.clear()
+        else:
+            entries.pop(os.path.abspath(jboss_home), None)
+        self._save()
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if os.path.isfile(self.cache_file):
+                try:
+                    with open(self.cache_file) as f:
+                        self._entries = json.load(f)
+                except (IOError, ValueError) as e:
+                    warn('%s: ignoring unreadable classpath cache %s: %s' % (self.__class__.__name__,
+                                                                            self.cache_file, e))
+        return self._entries
+
+    def _save(self):
+        tmp_file = '%s.%s' % (self.cache_file, uuid.uuid4().hex)
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(self._entries, f)
+            from jyboss.context import replace_file
+            replace_file(tmp_file, self.cache_file)
+        except (IOError, OSError) as e:
+            # the cache only saves time, a run must not fail because it cannot be written
+            warn('%s: failed to save classpath cache %s: %s' % (self.__class__.__name__, self.cache_file, e))
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Write the classpath manifest of the jboss client libraries.')
+    parser.add_argument('--jboss-home', default=os.environ.get('JBOSS_HOME'), help='the jboss home to use')
+    parser.add_argument('manifest', help='the manifest file to write')
+    args = parser.parse_args(args)
+    if args.jboss_home is None:
+        parser.error('--jboss-home or JBOSS_HOME must be set')
+    for jar in write_manifest(args.jboss_home, args.manifest):
+        print(jar)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,14 @@
 # Make coding more python3-ish
 from __future__ import (absolute_import, division, print_function)
 
+import time
+
 from jyboss.exceptions import ContextError, CommandError
 
 try:
     from java.lang import System, IllegalStateException, IllegalArgumentException
-    from java.io import IOException
+    from java.io import IOException, FileInputStream, BufferedInputStream
+    from java.util.concurrent import TimeUnit, ExecutionException
     from java.net import URI, URISyntaxException
 except ImportError as jpe:
     raise ContextError('Java packages are not available, please run this module with jython.', jpe)
@@ -33,6 +36,8 @@ class Cli(object):
 
     def __init__(self):
         self.ctx = None
+        # records the management operations if set, see jyboss.stats.OperationStats
+        self.stats = None
 
     @staticmethod
     def instance():
@@ -84,6 +89,32 @@ class Cli(object):
         except CommandLineException as ce:
             raise IllegalStateException("Unable to connect to controller.", ce)
 
+    def reload(self, admin_only=False):
+        """
+        Reload the server and wait until it is back, the configuration file is read again.
+
+        :param admin_only: {bool} - reload into admin only mode, an embedded server must stay in admin only mode
+        """
+        self.check_not_connected()
+        command = 'reload --admin-only=%s' % ('true' if admin_only else 'false')
+        try:
+            start = time.time()
+            self.ctx.handle(command)
+            if self.stats is not None:
+                self.stats.record(None, None, time.time() - start, command=command)
+        except CommandLineException as ce:
+            raise IllegalStateException("Unable to reload server.", ce)
+
+    def reconnect(self):
+        """
+        Connect the command context to the controller again, e.g. after a reload closed the connection.
+        """
+        self.check_not_connected()
+        try:
+            self.ctx.connectController()
+        except CommandLineException as ce:
+            raise IllegalStateException("Unable to connect to controller.", ce)
+
     def connect(self):
         self.check_already_connected()
         try:
@@ -131,21 +162,129 @@ class Cli(object):
         finally:
             self.ctx = None
 
+    def _execute(self, request):
+        start = time.time()
+        response = self.ctx.getModelControllerClient().execute(request)
+        if self.stats is not None:
+            self.stats.record(request, response, time.time() - start)
+        return response
+
     def cmd(self, cli_command):
         self.check_not_connected()
         try:
             request = self.ctx.buildRequest(cli_command)
-            response = self.ctx.getModelControllerClient().execute(request)
+            response = self._execute(request)
             return Result(cli_command, request=request, response=response)
         except CommandFormatException as cfe:
             try:
+                start = time.time()
                 self.ctx.handle(cli_command)
+                if self.stats is not None:
+                    self.stats.record(None, None, time.time() - start, command=cli_command)
                 return Result(cli_command, exit_code=self.ctx.getExitCode())
             except CommandLineException as cle:
                 raise CommandError("Error handling command: %s" % cli_command, cle)
         except IOException as ioe:
             raise IllegalStateException("Unable to send command " + cli_command + " to server.", ioe)
 
+    def cmd_async(self, cli_command):
+        """
+        Submit a cli operation to the server without waiting for the response, so the server and the network can
+        work on independent operations at the same time. Commands that are not management operations cannot be
+        submitted asynchronously and are executed straight away.
+
+        :param cli_command: {str} - the cli operation to submit
+        :return: {PendingResult} - the pending result, get() waits for the response
+        """
+        self.check_not_connected()
+        try:
+            request = self.ctx.buildRequest(cli_command)
+        except CommandFormatException:
+            return PendingResult(cli_command, result=self.cmd(cli_command))
+        # noinspection PyUnresolvedReferences
+        from org.jboss.as.controller.client import OperationMessageHandler
+        try:
+            future = self.ctx.getModelControllerClient().executeAsync(request, OperationMessageHandler.DISCARD)
+            return PendingResult(cli_command, request=request, future=future, stats=self.stats)
+        except IOException as ioe:
+            raise IllegalStateException("Unable to send command " + cli_command + " to server.", ioe)
+
+    def cmd_upload(self, request, paths, description=None):
+        """
+        Execute a management operation that sends files to the server as attachments, e.g. the content of a
+        deployment. The operation refers to the files by their position in paths (input-stream-index), the files are
+        streamed from disk while the operation is sent and never held in memory.
+
+        :param request: {ModelNode} - the operation request
+        :param paths: {list(str)} - the files to attach
+        :param description: {str} - describes the operation in the result, the operation name if not set
+        :return: {Result} - the result of the operation
+        """
+        self.check_not_connected()
+        # noinspection PyUnresolvedReferences
+        from org.jboss.as.controller.client import OperationBuilder
+        description = description if description is not None else request.get('operation').asString()
+        builder = OperationBuilder(request, True)
+        streams = []
+        try:
+            for path in paths:
+                stream = BufferedInputStream(FileInputStream(path))
+                streams.append(stream)
+                builder.addInputStream(stream)
+            start = time.time()
+            response = self.ctx.getModelControllerClient().execute(builder.build())
+            if self.stats is not None:
+                self.stats.record(request, response, time.time() - start)
+            return Result(description, request=request, response=response)
+        except IOException as ioe:
+            raise IllegalStateException("Unable to send " + description + " to server.", ioe)
+        finally:
+            # the operation only closes its streams once it was executed, not if a file cannot be opened or the
+            # execution fails, closing them again after a successful execution has no effect
+            for stream in streams:
+                try:
+                    stream.close()
+                except IOException:
+                    pass
+
+    def build_request(self, cli_command):
+        """
+        Parse a cli operation into its DMR request without sending it to the server.
+
+        :param cli_command: {str} - the cli operation to parse
+        :return: {ModelNode} - the request, relative addresses are resolved against the current node
+        """
+        self.check_not_connected()
+        try:
+            return self.ctx.buildRequest(cli_command)
+        except CommandFormatException as cfe:
+            raise CommandError("Command is not a management operation: %s" % cli_command, cfe)
+
+    def cmd_composite(self, cli_commands):
+        """
+        Execute a list of cli operations as a single DMR composite operation. The operations are executed in order
+        by the controller in a single round trip and are rolled back as a unit if any of the steps fail.
+
+        :param cli_commands: {list(str)} - the cli operations to execute, must all be management operations
+        :return: {Result} - the result of the composite, the step results are in result/step-N of the response
+        """
+        self.check_not_connected()
+        request = ModelNode()
+        request.get('operation').set('composite')
+        request.get('address').setEmptyList()
+        steps = request.get('steps')
+        steps.setEmptyList()
+        for cli_command in cli_commands:
+            try:
+                steps.add(self.ctx.buildRequest(cli_command))
+            except CommandFormatException as cfe:
+                raise CommandError("Command cannot be part of a composite operation: %s" % cli_command, cfe)
+        try:
+            response = self._execute(request)
+            return Result(cli_commands, request=request, response=response)
+        except IOException as ioe:
+            raise IllegalStateException("Unable to send composite operation to server.", ioe)
+
     def batch_start(self):
         self.check_not_connected()
         try:
@@ -186,6 +325,52 @@ class Cli(object):
             raise IllegalStateException("Failed to add %s to batch command." % batch_command, e)
 
 
+class PendingResult(object):
+    """
+    the result of an operation submitted with Cli.cmd_async that may still be executing on the server
+    """
+
+    def __init__(self, cli_command=None, request=None, future=None, result=None, stats=None):
+        self.cliCommand = cli_command
+        self.request = request
+        self.future = future
+        self.result = result
+        self.stats = stats
+        self.submitted = time.time()
+
+    def isDone(self):
+        return self.result is not None or self.future.isDone()
+
+    def cancel(self):
+        """
+        Cancel the operation if the server has not completed it yet.
+
+        :return: {bool} - True if the operation was cancelled
+        """
+        return self.result is None and self.future.cancel(True)
+
+    def get(self, timeout=None):
+        """
+        Wait for the response of the operation.
+
+        :param timeout: {float} - optional seconds to wait, a java TimeoutException is raised when they pass
+        :return: {Result} - the result of the operation
+        """
+        if self.result is None:
+            try:
+                if timeout is None:
+                    response = self.future.get()
+                else:
+                    response = self.future.get(int(timeout * 1000), TimeUnit.MILLISECONDS)
+            except ExecutionException as ee:
+                raise IllegalStateException("Unable to send command " + self.cliCommand + " to server.", ee)
+            if self.stats is not None:
+                # the time until the response is collected, which includes the wait of the caller
+                self.stats.record(self.request, response, time.time() - self.submitted)
+            self.result = Result(self.cliCommand, request=self.request, response=response)
+        return self.result
+
+
 class Result(object):
     def __init__(self, cli_command=None, request=None, response=None, exit_code=None):
         self.cliCommand = cli_command
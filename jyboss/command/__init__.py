@@ -1,34 +1,22 @@
+"""
+This package contains command modules to configure jboss subsystems. The management specific handlers are imported
+on first use, importing all of them costs noticeable time under jython.
+"""
+
 # Make coding more python3-ish
 from __future__ import (absolute_import, division, print_function)
 
+import sys
+import importlib
+from functools import partial
+from types import ModuleType
+
 # care command handlers
 from .core import escape_keys, unescape_keys, expression_deserializer
 from .core import ReloadCommandHandler, CliCmdHandler
 from .core import ChangeObservable
 from .core import CommandHandler as _BasicCommandHandler
 
-# management specific handlers
-from .undertow import UndertowModule
-from .undertow import UndertowFilterRefModule
-from .undertow import UndertowFilterModule
-from .undertow import UndertowHttpListenerModule
-from .undertow import UndertowAjpListenerModule
-
-from .extension import ExtensionModule
-from .ee import EEModule
-from .weld import WeldModule
-from .modcluster import  ModClusterModule
-from .datasources import DatasourcesModule
-from .module import ModuleModule
-from .security import SecurityModule
-from .keycloak import KeycloakAdapterModule
-from .keycloak import KeycloakServerModule
-from .deployment import DeploymentModule
-from .jgroups import JGroupsModule
-from .infinispan import InfinispanModule
-from .interface import InterfaceModule
-from .binding import SocketBindingModule
-
 __metaclass__ = type
 
 try:
@@ -38,14 +26,105 @@ except NameError:
     # Python 3
     unicode = str
 
-"""
-This package contains command modules to configure jboss subsystems.
-"""
+# management specific handlers and the module of this package they are defined in
+_HANDLER_MODULES = {
+    'UndertowModule': 'undertow',
+    'UndertowFilterRefModule': 'undertow',
+    'UndertowFilterModule': 'undertow',
+    'UndertowHttpListenerModule': 'undertow',
+    'UndertowAjpListenerModule': 'undertow',
+    'ExtensionModule': 'extension',
+    'EEModule': 'ee',
+    'WeldModule': 'weld',
+    'ModClusterModule': 'modcluster',
+    'DatasourcesModule': 'datasources',
+    'ModuleModule': 'module',
+    'SecurityModule': 'security',
+    'KeycloakAdapterModule': 'keycloak',
+    'KeycloakServerModule': 'keycloak',
+    'DeploymentModule': 'deployment',
+    'JGroupsModule': 'jgroups',
+    'InfinispanModule': 'infinispan',
+    'InterfaceModule': 'interface',
+    'SocketBindingModule': 'binding'
+}
+
+# the handlers of the instruction keys, in the order they are registered with a change processor
+HANDLERS = [
+    ('extension', 'ExtensionModule'),
+    ('undertow', 'UndertowModule'),
+    ('socket_binding', 'SocketBindingModule'),
+    ('security', 'SecurityModule'),
+    ('keycloak_adapter', 'KeycloakAdapterModule'),
+    ('keycloak_server', 'KeycloakServerModule'),
+    ('ee', 'EEModule'),
+    ('weld', 'WeldModule'),
+    ('modcluster', 'ModClusterModule'),
+    ('module', 'ModuleModule'),
+    ('datasources', 'DatasourcesModule'),
+    ('deployment', 'DeploymentModule'),
+    ('cmd', 'CliCmdHandler'),
+    ('reload', 'ReloadCommandHandler'),
+    ('jgroups', 'JGroupsModule'),
+    ('infinispan', 'InfinispanModule'),
+    ('interface', 'InterfaceModule')
+]
+
+__all__ = ['escape_keys', 'unescape_keys', 'expression_deserializer', 'ReloadCommandHandler', 'CliCmdHandler',
+           'ChangeObservable', 'HANDLERS', 'handler_class', 'register_handlers', 'cd', 'ls', 'cmd',
+           'batch'] + sorted(_HANDLER_MODULES.keys())
+
+
+def handler_class(name):
+    """
+    :param name: {str} - the class name of a command handler
+    :return: {type} - the handler class, its module is imported if it is not loaded yet
+    """
+    module_name = _HANDLER_MODULES.get(name)
+    if module_name is None:
+        return globals()[name]
+    return getattr(importlib.import_module('%s.%s' % (__name__, module_name)), name)
+
+
+def _create_handler(name, context):
+    return handler_class(name)(context)
+
+
+def register_handlers(change_processor, context):
+    """
+    Register all known handlers with a change processor, a handler is only created once the processor sees an
+    instruction for it.
+
+    :param change_processor: {ChangeObservable} - the processor to register the handlers with
+    :param context: {JyBossContext} - the context the handlers will operate on
+    """
+    for key, name in HANDLERS:
+        change_processor.register_lazy(key, partial(_create_handler, name, context))
+
+
+class _CommandPackage(ModuleType):
+    """
+    this package, resolves the handler classes and the shell aliases on first access
+    """
+
+    def __getattr__(self, name):
+        if name in _HANDLER_MODULES:
+            value = handler_class(name)
+        elif name in ['cd', 'ls', 'cmd', 'batch']:
+            # the basic handler binds the default context, which should not be created on import
+            base = self.__dict__.get('_base')
+            if base is None:
+                base = self._base = _BasicCommandHandler()
+            # create shell alias for core functions
+            value = base if name == 'batch' else getattr(base, name)
+        else:
+            raise AttributeError("'module' object has no attribute '%s'" % name)
+        setattr(self, name, value)
+        return value
 
-_base = _BasicCommandHandler()
-# create shell alias for core functions
-cd = _base.cd
-ls = _base.ls
-cmd = _base.cmd
 
-batch = _base
+_package = _CommandPackage(__name__, __doc__)
+_package.__dict__.update(globals())
+# keep the original module alive, the functions of this package still resolve their globals through it
+_package._module = sys.modules[__name__]
+sys.modules[__name__] = _package
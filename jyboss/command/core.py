@@ -3,7 +3,6 @@ from __future__ import (absolute_import, division, print_function)
 
 import inspect
 import re
-import collections
 from abc import ABCMeta, abstractmethod
 from copy import deepcopy
 
@@ -13,9 +12,9 @@ from jyboss.context import ConfigurationChangeHandler, JyBossContext
 
 try:
     # noinspection PyUnresolvedReferences
-    from java.lang import IllegalArgumentException
+    from java.lang import IllegalArgumentException, IllegalStateException
     # noinspection PyUnresolvedReferences
-    from java.util import NoSuchElementException
+    from java.util import NoSuchElementException, Base64
 except ImportError as jpe:
     raise ContextError('Java packages are not available, please run this module with jython.', jpe)
 
@@ -184,6 +183,54 @@ def stringify_object(obj):
         raise ParameterError('Cannot convert object value %s of type %s to unicode' % (obj, type(obj)))
 
 
+def list_edits(old_list, new_list):
+    """
+    Compute the shortest sequence of list removes and adds that turns one list into another. The elements of the
+    longest common subsequence of both lists stay in place, the other elements of the old list are removed from the
+    highest index down and the missing elements of the new list are then added at their final index from the lowest
+    index up.
+
+    :param old_list {list} - the current list
+    :param new_list {list} - the desired list
+    :return {list(tuple(str, int, object))} - the remove and add edits with the index and the element they apply to
+    """
+    # the common head and tail need no edits and are kept out of the quadratic part
+    head = 0
+    while head < len(old_list) and head < len(new_list) and old_list[head] == new_list[head]:
+        head += 1
+    tail = 0
+    while tail < len(old_list) - head and tail < len(new_list) - head and \
+            old_list[len(old_list) - 1 - tail] == new_list[len(new_list) - 1 - tail]:
+        tail += 1
+    old = old_list[head:len(old_list) - tail]
+    new = new_list[head:len(new_list) - tail]
+
+    # lcs[i][j] is the length of the longest common subsequence of old[i:] and new[j:]
+    lcs = [[0] * (len(new) + 1) for _ in range(len(old) + 1)]
+    for i in range(len(old) - 1, -1, -1):
+        for j in range(len(new) - 1, -1, -1):
+            if old[i] == new[j]:
+                lcs[i][j] = lcs[i + 1][j + 1] + 1
+            else:
+                lcs[i][j] = max(lcs[i + 1][j], lcs[i][j + 1])
+
+    removes = []
+    adds = []
+    i = j = 0
+    while i < len(old) or j < len(new):
+        if i < len(old) and j < len(new) and old[i] == new[j]:
+            i += 1
+            j += 1
+        elif j < len(new) and (i == len(old) or lcs[i][j + 1] >= lcs[i + 1][j]):
+            adds.append(('add', head + j, new[j]))
+            j += 1
+        else:
+            removes.append(('remove', head + i, old[i]))
+            i += 1
+
+    return list(reversed(removes)) + adds
+
+
 def clean_python_value(obj, target_type_hint=None):
     if obj is None:
         return None
@@ -195,8 +242,15 @@ def clean_python_value(obj, target_type_hint=None):
             match = _expression_matcher.match(obj).group(1)  # why was expression parser using .search() ?
         except AttributeError:  # no expression wrapping to clean
             match = obj
-        return match if target_type_hint is None or target_type_hint == NoneType \
-            else target_type_hint(match)
+        else:
+            # an expression is resolved by the server, it cannot be converted to the attribute type
+            return match
+        if target_type_hint is None or target_type_hint == NoneType or isinstance(match, target_type_hint):
+            return match
+        elif target_type_hint is bool:
+            return match.lower() == 'true'
+        else:
+            return target_type_hint(match)
     elif isinstance(obj, list):
         return list(clean_python_value(item) for item in obj)
     elif isinstance(obj, dict):
@@ -205,39 +259,226 @@ def clean_python_value(obj, target_type_hint=None):
         raise IllegalArgumentException('Value cannot be pre-processed for synching: %r' % obj)
 
 
-def convert_dmr_to_python(n):
-    # TODO barf if not a DMR node
-    if n is None \
-            or not n.isDefined() \
-            or n.type == n.type.UNDEFINED:
+def _convert_dmr_value(n, t):
+    """
+    Convert a DMR node that does not contain other nodes into a python value.
+
+    :param n {ModelNode} - the node to convert
+    :param t {ModelType} - the type of the node
+    :return {object} - the python value of the node
+    """
+    if t == t.UNDEFINED:
         return None
-    elif n.type == n.type.INT:
+    elif t == t.STRING:
+        return n.asString()
+    elif t == t.INT:
         return n.asInt()
-    elif n.type == n.type.LONG:
+    elif t == t.LONG:
         return n.asLong()
-    elif n.type == n.type.STRING:
-        return n.asString()
-    elif n.type == n.type.BOOLEAN:
+    elif t == t.BOOLEAN:
         return n.asBoolean()
-    elif n.type == n.type.EXPRESSION:
+    elif t == t.EXPRESSION:
         exp = n.asExpression()
         return exp.getExpressionString()
-    elif n.type == n.type.LIST:
-        v_list = []
-        for _, v_list_node in enumerate(n.asList()):
-            i_v = convert_dmr_to_python(v_list_node)
-            v_list.append(i_v)
-        return v_list
-    elif n.type == n.type.OBJECT:
-        props = n.asPropertyList()
-        obj = {}
-        for prop in props:
-            obj[prop.name] = convert_dmr_to_python(prop.value)
-        return obj
+    elif t == t.DOUBLE:
+        return n.asDouble()
+    elif t == t.BIG_DECIMAL:
+        return float(n.asBigDecimal().toString())
+    elif t == t.BIG_INTEGER:
+        return long(n.asBigInteger().toString())
+    elif t == t.BYTES:
+        # same encoding as the DMR JSON serializer
+        return {'BYTES_VALUE': Base64.getEncoder().encodeToString(n.asBytes())}
+    elif t == t.TYPE:
+        return {'TYPE_MODEL_VALUE': n.asType().toString()}
     else:
         raise IllegalArgumentException('Node type cannot be converted to a python value: %r' % n)
 
 
+def convert_dmr_to_python(n, max_depth=None, path=None):
+    """
+    Convert a DMR node into python values in a single pass over the node. The result matches what parsing the JSON
+    representation of the node would produce: expressions collapse to their expression string, properties become
+    single key dicts, bytes and types are wrapped in BYTES_VALUE and TYPE_MODEL_VALUE dicts.
+
+    The node tree is walked with an explicit stack and children are accessed in place with keys()/get() so that
+    deep trees neither hit the recursion limit nor copy the child collections of every node.
+
+    Example:
+        # only convert the attributes of each datasource, child resources of a datasource are listed by name
+        convert_dmr_to_python(node, max_depth=3, path=['data-source', '*'])
+
+    :param n {ModelNode} - the node to convert
+    :param max_depth {int} - if set, objects at this depth are converted to their keys mapped to None and lists
+                             to None, the same way a non recursive read lists child resources
+    :param path {list(str)} - if set, the n-th level of objects is restricted to the key at the n-th position of
+                              the path, '*' selects all keys of the level; lists do not consume a path element
+    :return {object} - the python representation of the node
+    """
+    # TODO barf if not a DMR node
+    result = [None]
+    # each entry is the node to convert, the container and key to store the result in, the depth and path position
+    stack = [(n, result, 0, 0, 0)]
+
+    while len(stack) > 0:
+        node, parent, key, depth, pos = stack.pop()
+        if node is None or not node.isDefined():
+            continue
+
+        t = node.type
+        if t == t.OBJECT:
+            if max_depth is not None and depth >= max_depth:
+                parent[key] = dict((k, None) for k in node.keys())
+                continue
+            obj = {}
+            parent[key] = obj
+            selector = path[pos] if path is not None and pos < len(path) else '*'
+            if selector == '*':
+                for k in node.keys():
+                    obj[k] = None
+                    stack.append((node.get(k), obj, k, depth + 1, pos + 1))
+            elif node.has(selector):
+                obj[selector] = None
+                stack.append((node.get(selector), obj, selector, depth + 1, pos + 1))
+        elif t == t.LIST:
+            if max_depth is not None and depth >= max_depth:
+                continue
+            # the int value of a list node is its size
+            size = node.asInt()
+            v_list = [None] * size
+            parent[key] = v_list
+            for i in range(size):
+                stack.append((node.get(i), v_list, i, depth + 1, pos))
+        elif t == t.PROPERTY:
+            prop = node.asProperty()
+            obj = {prop.name: None}
+            parent[key] = obj
+            stack.append((prop.value, obj, prop.name, depth + 1, pos))
+        else:
+            parent[key] = _convert_dmr_value(node, t)
+
+    return result[0]
+
+
+def address_to_path(address):
+    """
+    Convert a DMR address into a cli resource path.
+
+    :param address {list(tuple(str, str))} - the address as list of type and name pairs
+    :return {string} - the cli path of the address
+    """
+    segments = []
+    for t, n in address:
+        if any(c in n for c in '/:=,"'):
+            n = '"%s"' % n.replace('"', '\\"')
+        segments.append('%s=%s' % (t, n))
+    return '/' + '/'.join(segments)
+
+
+def dmr_address(request):
+    """
+    Extract the address of a DMR request as a tuple of type and name pairs.
+
+    :param request {ModelNode} - the operation request
+    :return {tuple(tuple(str, str))} - the normalized address of the request
+    """
+    if request is None or not request.has('address') or not request.get('address').isDefined():
+        return ()
+    address = []
+    for segment in request.get('address').asList():
+        prop = segment.asProperty()
+        address.append((prop.getName(), prop.getValue().asString()))
+    return tuple(address)
+
+
+class ModelCache(object):
+    """
+    Snapshot cache of the management model for a single connection. Every top level resource (e.g. a subsystem)
+    is read once recursively and subsequent reads of the resource or any of its children are served from the
+    snapshot. Executing an operation that is not a read drops the snapshot of the top level resource it addresses.
+    """
+
+    READ_OPERATIONS = [
+        'query',
+        'resolve-expression',
+        'validate-address',
+        'validate-operation',
+        'whoami'
+    ]
+
+    def __init__(self):
+        self._snapshots = {}
+
+    def __contains__(self, root):
+        return root in self._snapshots
+
+    def roots(self):
+        return list(self._snapshots.keys())
+
+    def snapshot(self, root):
+        """
+        :param root: {tuple(str, str)} - the top level address segment
+        :return: {ModelNode} - the stored snapshot itself, not a copy, or None if the resource does not exist
+        """
+        return self._snapshots.get(root)
+
+    def store(self, root, node):
+        """
+        Store the recursive read of a top level resource.
+
+        :param root: {tuple(str, str)} - the top level address segment
+        :param node: {ModelNode} - the recursive read of the resource or None if the resource does not exist
+        """
+        self._snapshots[root] = node
+
+    def lookup(self, address):
+        """
+        Navigate the snapshot to the resource at the given address.
+
+        :param address: {tuple(tuple(str, str))} - the normalized resource address, the snapshot of the first
+                        segment must be present
+        :return: {ModelNode} - a copy of the cached resource
+        """
+        node = self._snapshots[address[0]]
+        for t, n in address[1:]:
+            if node is None:
+                break
+            if node.has(t) and node.get(t).isDefined() and node.get(t).has(n):
+                node = node.get(t).get(n)
+            else:
+                node = None
+
+        if node is None or not node.isDefined():
+            raise NotFoundError('WFLYCTL0216: Management resource \'%s\' not found' % address_to_path(address))
+
+        return node.clone()
+
+    def invalidate(self, request):
+        """
+        Drop all snapshots the given operation request could have modified.
+
+        :param request: {ModelNode} - the executed request
+        """
+        if request is None:
+            return
+
+        operation = request.get('operation').asString() if request.has('operation') else None
+        if operation == 'composite':
+            for step in request.get('steps').asList():
+                self.invalidate(step)
+        elif operation is not None and (operation.startswith('read-') or operation in self.READ_OPERATIONS):
+            pass
+        else:
+            address = dmr_address(request)
+            if len(address) == 0:
+                self.clear()
+            else:
+                self._snapshots.pop(address[0], None)
+
+    def clear(self):
+        self._snapshots.clear()
+
+
 class CommandHandler(ConfigurationChangeHandler):
     def __init__(self, context=None):
         super(CommandHandler, self).__init__()
@@ -273,22 +514,198 @@ class CommandHandler(ConfigurationChangeHandler):
         """
         self._cli().batch_reset()
 
+    def _execute(self, cmd, change=None):
+        """
+        Execute a cli command, while a plan is computed the command is planned instead, see jyboss.command.plan.
+
+        :param cmd: {str} - the cli command to execute
+        :param change: {dict} - the change record of a planned write operation
+        :return: {Result} - the result of the command
+        """
+        plan = self.context.plan
+        if plan is not None:
+            return plan.execute(self._cli(), cmd, change)
+        return self._cli().cmd(cmd)
+
+    def _raise_failure(self, cmd, result):
+        errm = self._extract_errm(result)
+        if errm is None:
+            raise OperationError('Unknown error occurred executing: %s' % cmd)
+        elif _not_found_matcher.match(errm) is not None:
+            raise NotFoundError(errm)
+        else:
+            raise OperationError(errm)
+
     def cmd(self, cmd, silent=False):
         debug('%s.cmd(): %s' % (self.__class__.__name__, cmd))
-        result = self._cli().cmd(cmd)
+        result = self._execute(cmd)
+        self._invalidate_cache(result)
+        self._track_process_state(result)
         if result.isSuccess():
             return self._return_success(result, silent=silent)
         else:
+            self._raise_failure(cmd, result)
+
+    def cmd_async(self, cmd):
+        """
+        Submit a cli operation without waiting for its response, the responses of independent operations are then
+        collected with gather(). While a plan is computed the operation is planned straight away. Operations cannot
+        be submitted while a composite operation is in progress, they would overtake its queued writes.
+
+        :param cmd: {str} - the cli operation to submit
+        :return: {PendingResult} - the pending result of the operation
+        """
+        debug('%s.cmd_async(): %s' % (self.__class__.__name__, cmd))
+        if self.context.plan is not None:
+            from jyboss.cli import PendingResult
+            return PendingResult(cmd, result=self._execute(cmd))
+        elif self.context.operation_queue is not None:
+            raise CommandError('%s: %s cannot be submitted while a composite operation is in progress' % (
+                self.__class__.__name__, cmd))
+        return self._cli().cmd_async(cmd)
+
+    def gather(self, pending, dmr=False, ignore_not_found=False):
+        """
+        Wait for the responses of operations submitted with cmd_async(). All responses are collected before the
+        first failure is raised so no operation is left in flight.
+
+        :param pending: {list(PendingResult)} - the submitted operations
+        :param dmr: {bool} - return the result nodes like cmd_dmr() instead of python values like cmd()
+        :param ignore_not_found: {bool} - return None for operations on resources that do not exist
+        :return: {list} - the results in the order of the submitted operations
+        """
+        results = []
+        failure = None
+        for p in pending:
+            try:
+                result = p.get()
+            except IllegalStateException as ise:
+                # the operation may have been applied, the remaining ones are still in flight and are read first
+                cache = None if self.context.connection is None else self.context.connection.model_cache
+                if cache is not None:
+                    cache.invalidate(p.request)
+                results.append(None)
+                if failure is None:
+                    failure = ise
+                continue
+            self._invalidate_cache(result)
+            self._track_process_state(result)
+            if result.isSuccess():
+                if not dmr:
+                    results.append(self._return_success(result))
+                else:
+                    r = result.getResponse()
+                    results.append(r.get('result') if r is not None and r.has('result') else r)
+                continue
+            results.append(None)
+            try:
+                self._raise_failure(p.cliCommand, result)
+            except NotFoundError as nfe:
+                if not ignore_not_found and failure is None:
+                    failure = nfe
+            except OperationError as oe:
+                if failure is None:
+                    failure = oe
+        if failure is not None:
+            raise failure
+        return results
+
+    def queue_cmd(self, cmd, change=None):
+        """
+        Queue a write operation on the composite operation that is currently in progress or execute it straight away
+        if no composite is active.
+
+        :param cmd: {str} - the cli operation to queue
+        :param change: {dict} - the change record that describes the operation, it receives the step outcome
+        """
+        queue = self.context.operation_queue
+        if self.context.plan is not None:
+            debug('%s.queue_cmd(): plan %s' % (self.__class__.__name__, cmd))
+            result = self._execute(cmd, change)
+            if not result.isSuccess():
+                self._raise_failure(cmd, result)
+        elif queue is None:
+            self.cmd(cmd)
+        else:
+            debug('%s.queue_cmd(): %s' % (self.__class__.__name__, cmd))
+            queue.append((cmd, change))
+
+    def composite(self, always=False):
+        """
+        Create a composite operation scope. All operations queued with queue_cmd() inside the scope are submitted
+        to the server in a single composite operation once the outermost scope exits. If the context is not in
+        composite mode the operations are executed as they are queued.
+
+        Example:
+            with self.composite():
+                self.queue_cmd('/subsystem=ee:write-attribute(name=a, value=b)')
+
+        :param always: {bool} - collect the operations even if the context is not in composite mode, for modules that
+                       compute all writes of a resource tree up front
+        :return: {CompositeOperation} - the composite operation scope
+        """
+        return CompositeOperation(self, always=always)
+
+    def flush(self, operations):
+        """
+        Submit a list of queued operations to the server as one composite operation and map the step outcomes back
+        into the change records.
+
+        :param operations: {list(tuple(str, dict))} - the queued cli operations and their change records
+        """
+        if len(operations) < 1:
+            return
+        elif len(operations) == 1:
+            self.cmd(operations[0][0])
+            return
+
+        cmds = [op for op, _ in operations]
+        debug('%s.flush(): submit %d operations as composite' % (self.__class__.__name__, len(cmds)))
+        result = self._cli().cmd_composite(cmds)
+        self._invalidate_cache(result)
+        self._track_process_state(result)
+        response = result.getResponse()
+        steps = response.get('result')
+
+        for i, (op, change) in enumerate(operations):
+            step_key = 'step-%d' % (i + 1)
+            step = steps.get(step_key) if steps.isDefined() and steps.has(step_key) else None
+            if step is None:
+                continue
+            if step.has('outcome') and step.get('outcome').asString() == 'failed':
+                errm = step.get('failure-description').asString() if step.has('failure-description') else None
+                if errm is None:
+                    raise OperationError('Unknown error occurred executing: %s' % op)
+                elif _not_found_matcher.match(errm) is not None:
+                    raise NotFoundError(errm)
+                else:
+                    raise OperationError('%s: %s' % (op, errm))
+            if change is not None and step.has('response-headers'):
+                headers = step.get('response-headers')
+                if headers.has('process-state'):
+                    change['process-state'] = headers.get('process-state').asString()
+
+        if not result.isSuccess():
             errm = self._extract_errm(result)
-            if errm is None:
-                raise OperationError('Unknown error occurred executing: %s' % cmd)
-            elif _not_found_matcher.match(errm) is not None:
-                raise NotFoundError(errm)
-            else:
-                raise OperationError(errm)
+            raise OperationError('Unknown error occurred executing composite operation' if errm is None else errm)
+
+    def submit(self, operations):
+        """
+        Submit write operations that belong together in one composite operation. While a plan is computed or a
+        composite operation is in progress the operations join it instead.
+
+        :param operations: {list(tuple(str, dict))} - the cli operations and their change records
+        """
+        if self.context.plan is not None or self.context.operation_queue is not None:
+            for cmd, change in operations:
+                self.queue_cmd(cmd, change)
+        else:
+            self.flush(operations)
 
     def cmd_dmr(self, cmd):
-        result = self._cli().cmd('%s' % cmd)
+        result = self._execute('%s' % cmd)
+        self._invalidate_cache(result)
+        self._track_process_state(result)
         if result.isSuccess():
             r = result.getResponse()
             if r.has('result'):
@@ -296,20 +713,109 @@ class CommandHandler(ConfigurationChangeHandler):
             else:
                 return r
         else:
-            errm = self._extract_errm(result)
-            if errm is None:
-                raise OperationError('Unknown error occurred executing: %s' % cmd)
-            elif _not_found_matcher.match(errm) is not None:
-                raise NotFoundError(errm)
-            else:
-                raise OperationError(errm)
+            self._raise_failure(cmd, result)
+
+    def _model_cache(self):
+        """
+        Get the model cache of the current connection.
 
-    def dmr_to_python(self, node=None):
-        if node is None:
+        :return: {ModelCache} - the model cache or None if the context does not cache reads
+        """
+        connection = self.context.connection
+        if not self.context.cache or connection is None or self.context.plan is not None:
+            # a plan serves reads from its own snapshot
             return None
+        if connection.model_cache is None:
+            connection.model_cache = ModelCache()
+        return connection.model_cache
+
+    def _invalidate_cache(self, result):
+        """
+        Drop cached snapshots that may have been modified by the executed command.
+
+        :param result: {Result} - the result of the executed command
+        """
+        connection = self.context.connection
+        cache = None if connection is None else connection.model_cache
+        if cache is None:
+            return
+        if result.is_local_command:
+            # local commands do not expose a request, only a change of the current node is known to be harmless
+            if not result.cliCommand.strip().startswith('cd'):
+                cache.clear()
         else:
-            node_str = node.toJSONString(True)
-            return json.loads(node_str, object_hook=expression_deserializer)
+            cache.invalidate(result.getRequest())
+
+    def _track_process_state(self, result):
+        """
+        Remember on the connection if the executed command left the server in reload-required or restart-required
+        state, a reusable embedded server is reset before the next connection uses it.
+
+        :param result: {Result} - the result of the executed command
+        """
+        connection = self.context.connection
+        response = result.getResponse()
+        if connection is None or response is None:
+            return
+        responses = [response]
+        request = result.getRequest()
+        if request is not None and request.has('operation') and request.get('operation').asString() == 'composite' \
+                and response.has('result'):
+            steps = response.get('result')
+            responses += [steps.get(key) for key in steps.keys() if key.startswith('step-')]
+        for r in responses:
+            if not r.has('response-headers'):
+                continue
+            headers = r.get('response-headers')
+            if headers.has('process-state'):
+                state = headers.get('process-state').asString()
+            elif headers.has('operation-requires-restart') and headers.get('operation-requires-restart').asBoolean():
+                state = 'restart-required'
+            elif headers.has('operation-requires-reload') and headers.get('operation-requires-reload').asBoolean():
+                state = 'reload-required'
+            else:
+                continue
+            if state == 'restart-required' or connection.process_state is None:
+                connection.process_state = state
+
+    def _cached_read(self, resource_path):
+        """
+        Read a resource from the model cache, loading the snapshot of its top level resource if needed.
+
+        :param resource_path: {string} - the absolute or relative path to the resource to read
+        :return: {ModelNode} - the cached resource or None if the resource cannot be served from the cache
+        """
+        cache = self._model_cache()
+        if cache is None:
+            return None
+
+        try:
+            address = dmr_address(self._cli().build_request('%s:read-resource' % resource_path))
+        except CommandError:
+            return None
+
+        if len(address) == 0:
+            return None
+
+        root = address[0]
+        if root not in cache:
+            try:
+                cache.store(root, self.cmd_dmr('%s:read-resource(recursive=true)' % address_to_path([root])))
+            except NotFoundError:
+                cache.store(root, None)
+
+        return cache.lookup(address)
+
+    def dmr_to_python(self, node=None, max_depth=None, path=None):
+        """
+        Convert a DMR node into python values, see convert_dmr_to_python.
+
+        :param node: {ModelNode} - the node to convert
+        :param max_depth: {int} - optional depth at which the conversion stops
+        :param path: {list(str)} - optional path of object keys to restrict the conversion to
+        :return: {object} - the python representation of the node
+        """
+        return convert_dmr_to_python(node, max_depth=max_depth, path=path)
 
     def _as_value_pair(self, node):
         pass
@@ -375,7 +881,7 @@ class CommandHandler(ConfigurationChangeHandler):
             raise OperationError(e.getMessage())
 
     def ls(self, path=None, silent=False):
-        result = self._cli().cmd('ls' if path is None else 'ls %s' % path)
+        result = self._execute('ls' if path is None else 'ls %s' % path)
         if result.isSuccess():
             return self._return_success(result, _ls_response_magic, silent=silent)
         else:
@@ -392,6 +898,9 @@ class CommandHandler(ConfigurationChangeHandler):
         :param silent: if True disable output to stdout
         """
         result = self._cli().cmd('run-batch')
+        # the batch runs as one composite operation, the snapshots of all its steps are stale
+        self._invalidate_cache(result)
+        self._track_process_state(result)
         if result.isSuccess():
             return self._return_success(result, silent=silent)
         else:
@@ -418,6 +927,34 @@ class CommandHandler(ConfigurationChangeHandler):
         return self._cli().batch_is_active()
 
 
+class CompositeOperation(object):
+    """
+    Scope that collects the operations queued by command handlers and submits them as a single composite operation.
+    Scopes can be nested, only the outermost scope of a context will submit the operations.
+    """
+
+    def __init__(self, handler, always=False):
+        self.handler = handler
+        self.context = handler.context
+        self.always = always
+        self._owner = False
+
+    def __enter__(self):
+        if (self.context.composite or self.always) and self.context.operation_queue is None:
+            self.context.operation_queue = []
+            self._owner = True
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._owner:
+            operations = self.context.operation_queue
+            self.context.operation_queue = None
+            self._owner = False
+            if exc_type is None:
+                self.handler.flush(operations)
+        return False
+
+
 class ChangeObservable(object):
     """
     Observable class that will be used to process the command line and delegate processing to the actual handler
@@ -425,8 +962,25 @@ class ChangeObservable(object):
 
     def __init__(self):
         self._observers = {}
+        # observers that are only created once an instruction of their key is processed, see register_lazy
+        self._factories = {}
 
     def process_instructions(self, instructions):
+        local_instructions, actions = self._actions(instructions)
+        return self._execute_action(local_instructions, actions)
+
+    def observers_for(self, instructions):
+        """
+        :param instructions: {dict} - the instructions to process
+        :return: {list} - the observers that will process the instructions, in processing order
+        """
+        _, actions = self._actions(instructions)
+        observers = []
+        for key, _ in actions:
+            observers += [o for o in self._observers_of(key) if o not in observers]
+        return observers
+
+    def _actions(self, instructions):
         actions = []
 
         local_instructions = deepcopy(instructions)
@@ -446,12 +1000,12 @@ class ChangeObservable(object):
                 # need to remove the key as part of elimination
                 del local_instructions[k]
 
-            elif k in self._observers:
+            elif k in self._observers or k in self._factories:
                 actions.append((k, instruction))
                 # need to remove the key as part of elimination
                 del local_instructions[k]
 
-        return self._execute_action(local_instructions, actions)
+        return local_instructions, actions
 
     def _execute_action(self, configuration, actions):
         result = dict(changed=False)
@@ -461,7 +1015,7 @@ class ChangeObservable(object):
             local_instruction = deepcopy(configuration)
             local_instruction[key] = action
             # notify all observers that can handle this command instruction
-            for observer in self._observers.setdefault(key, []):
+            for observer in self._observers_of(key):
                 changes = observer.apply(**local_instruction)
                 if changes is not None:
                     result['changed'] = True
@@ -493,19 +1047,60 @@ class ChangeObservable(object):
         else:
             raise ParameterError('%s.apply is not implemented correctly' % observer.__class__.__name__)
 
+    def register_lazy(self, key, factory):
+        """
+        Register an observer that is only created once an instruction with its key is processed.
+
+        :param key: {str} - the instruction key the observer handles
+        :param factory: {callable} - creates the observer, called without arguments
+        """
+        if factory is None:
+            raise ParameterError('observer factory cannot be null')
+        self._factories.setdefault(key, []).append(factory)
+
+    def _observers_of(self, key):
+        for factory in self._factories.pop(key, []):
+            self.register(factory())
+        return self._observers.setdefault(key, [])
+
 
 class ReloadCommandHandler(CommandHandler):
     def __init__(self, context=None):
         super(ReloadCommandHandler, self).__init__(context=context)
 
-    def apply(self, reload=False, **kwargs):
+    def apply(self, reload=False, reload_timeout=None, **kwargs):
+        """
+        Reload the server in order with the other instructions and wait until it runs again, see
+        jyboss.command.scheduler. A reload that is only required by earlier writes is requested instead if the run
+        defers reloads, the run then reloads once at its end and reports the reload.
+
+        :param reload: {bool|str} - True to always reload, required to reload only if a write requires it
+        :param reload_timeout: {int} - seconds to wait for the reloaded server to run again
+        """
         debug('%s:apply() %r' % (self.__class__.__name__, reload))
-        if bool(reload):
-            self.cmd('/:reload()')
-            return ['reloaded']
+        from jyboss.command.scheduler import ReloadScheduler, RELOAD_ALWAYS, RELOAD_REQUIRED, DEFAULT_TIMEOUT
+        if reload == RELOAD_REQUIRED:
+            mode = RELOAD_REQUIRED
+        elif bool(reload):
+            mode = RELOAD_ALWAYS
         else:
             return None
 
+        scheduler = ReloadScheduler(self.context, timeout=reload_timeout or DEFAULT_TIMEOUT)
+        if mode == RELOAD_REQUIRED and scheduler.deferred():
+            scheduler.request(mode)
+            return None
+
+        plan = self.context.plan
+        if plan is not None:
+            # the reload has to wait for the planned writes before it
+            change = {'action': 'reload', 'mode': mode}
+            plan.record_action(':reload', lambda: scheduler.reload(mode), change)
+            return [change]
+
+        report = scheduler.reload(mode)
+        return [report] if report['reloaded'] else None
+
 
 class CliCmdHandler(CommandHandler):
     """
@@ -543,22 +1138,38 @@ class BaseJBossModule(CommandHandler):
     def __init__(self, path, context=None):
         super(BaseJBossModule, self).__init__(context=context)
         self.path = path
-        self.compareLists = lambda x, y: collections.Counter(x) == collections.Counter(y)
 
     def update_list(self, parent_path=None, name=None, old_value=None, new_value=None, **kwargs):
         change = None
-        # check if both lists have the same content (ignoring order or elements)
-        if not self.compareLists(old_value, new_value):
-            # not the same, clear list and add all values of the new list
-            self.cmd('%s:list-clear(name=%s)' % (parent_path, name))
-            for i, v in enumerate(new_value):
-                self.cmd('%s:list-add(name=%s,index=%s,value="%s")' % (parent_path, name, i, v))
-            change = {
-                'attribute': name,
-                'action': 'update',
-                'old_value': old_value,
-                'new_value': new_value
-            }
+        # the edits keep the order of the new list, so a list with the same elements in another order is changed too
+        if old_value == new_value:
+            return change
+
+        change = {
+            'attribute': name,
+            'action': 'update',
+            'old_value': old_value,
+            'new_value': new_value
+        }
+        if new_value is None:
+            change['action'] = 'delete'
+            self.queue_cmd('%s:undefine-attribute(name=%s)' % (parent_path, name), change)
+            return change
+
+        edits = None if old_value is None else list_edits(old_value, new_value)
+        # every operation costs about as much as a list element, a write of the whole list is one operation that
+        # carries all elements
+        with self.composite(always=True):
+            if edits is None or 2 * len(edits) > len(new_value) + 1:
+                self.queue_cmd('%s:write-attribute(name=%s, value=[%s])' % (
+                    parent_path, name, ', '.join(convert_type(v) for v in new_value)), change)
+            else:
+                for op, i, v in edits:
+                    if op == 'remove':
+                        self.queue_cmd('%s:list-remove(name=%s, index=%d)' % (parent_path, name, i), change)
+                    else:
+                        self.queue_cmd('%s:list-add(name=%s, index=%d, value=%s)' % (parent_path, name, i,
+                                                                                     convert_type(v)), change)
 
         return change
 
@@ -566,33 +1177,33 @@ class BaseJBossModule(CommandHandler):
         change = None
 
         if new_value is None and old_value is not None:
-            self.cmd('%s:undefine-attribute(name=%s)' % (parent_path, name))
-
             change = {
                 'attribute': name,
                 'action': 'delete',
                 'old_value': old_value
             }
-        elif new_value is not None and old_value is None:
-            self.cmd('%s:write-attribute(name=%s, value=%s)' % (parent_path, name, convert_type(new_value)))
+            self.queue_cmd('%s:undefine-attribute(name=%s)' % (parent_path, name), change)
 
+        elif new_value is not None and old_value is None:
             change = {
                 'attribute': name,
                 'action': 'add',
                 'old_value': old_value,
                 'new_value': new_value
             }
+            self.queue_cmd('%s:write-attribute(name=%s, value=%s)' % (parent_path, name, convert_type(new_value)),
+                           change)
         else:
             new_value = stringify_object(new_value)
             if new_value != old_value:
-                self.cmd('%s:write-attribute(name=%s, value=%s)' % (parent_path, name, convert_type(new_value)))
-
                 change = {
                     'attribute': name,
                     'action': 'update',
                     'old_value': old_value,
                     'new_value': new_value
                 }
+                self.queue_cmd('%s:write-attribute(name=%s, value=%s)' % (parent_path, name, convert_type(new_value)),
+                               change)
                 # we can't compare objects here since we don't know that their types would be
                 # best we can do is turn all fields into string and compare strings
 
@@ -603,22 +1214,22 @@ class BaseJBossModule(CommandHandler):
         change = None
 
         if new_value is None and old_value is not None:
-            self.cmd('%s:undefine-attribute(name=%s)' % (parent_path, name))
-
             change = {
                 'attribute': name,
                 'action': 'delete',
                 'old_value': old_value
             }
-        elif new_value is not None and new_value != old_value:
-            self.cmd('%s:write-attribute(name=%s, value=%s)' % (parent_path, name, convert_type(new_value)))
+            self.queue_cmd('%s:undefine-attribute(name=%s)' % (parent_path, name), change)
 
+        elif new_value is not None and new_value != old_value:
             change = {
                 'attribute': name,
                 'action': 'add' if new_value is not None and old_value is None else 'update',
                 'old_value': old_value,
                 'new_value': new_value
             }
+            self.queue_cmd('%s:write-attribute(name=%s, value=%s)' % (parent_path, name, convert_type(new_value)),
+                           change)
 
         return change
 
@@ -664,49 +1275,66 @@ class BaseJBossModule(CommandHandler):
 
         changes = []
 
-        for k_t, v_t in target_state.items():
-
-            if allowable_attributes is not None and k_t not in allowable_attributes:
-                raise NotImplementedError(
-                    'Setting attribute %s is not supported by this module. Node path is %s' % (k_t, parent_path))
-
-            if parent_node.has(k_t):
-                attr = parent_node.require(k_t)
-            else:
-                raise ParameterError('%s.sync_attr: synchronizing attribute %s is not supported on jboss node %s' % (
-                    self.__class__.__name__, k_t, parent_path))
-
-            # convert the attribute value to a comparable python value
-            try:
-                v_a = convert_dmr_to_python(attr)
-            except IllegalArgumentException:
-                raise ParameterError('%s.sync_attr: synchronizing attribute %s of type %s is not supported' % (
-                    self.__class__.__name__, k_t, attr.type))
-
-            # also need to ensure the v_t is escaped/cleaned so we can compare
-            v_t = clean_python_value(v_t, type(v_a))
-
-            debug('%s.sync_attr: param %s of type %s will be processed old[%r] new[%r]' % (
-                self.__class__.__name__, k_t, attr.type, v_a, v_t))
+        # in composite mode all attribute writes of the node are submitted in a single round trip
+        with self.composite():
+            for k_t, v_t in target_state.items():
+                change = self._sync_attribute(parent_node, parent_path, allowable_attributes, k_t, v_t,
+                                              callback_handler, callback_args)
+                if change is not None:
+                    changes.append(change)
 
-            callback_args['name'] = k_t
-            callback_args['old_value'] = v_a
-            callback_args['new_value'] = v_t
+        return changes
 
-            # if either value is of type list, we need to engage a different callback handler as syncing list is
-            # not as simple as updating single value attributes, if both are undefined we don't really care and
-            # if their types differ, the caster would have already thrown a tantrum
-            if isinstance(v_a, list) or isinstance(v_t, list):
-                callback_handler = self.update_list
+    def _sync_attribute(self, parent_node, parent_path, allowable_attributes, k_t, v_t, callback_handler,
+                        callback_args):
+        """
+        Synchronise a single attribute of a configuration object, see _sync_attributes.
 
-            if isinstance(v_a, dict) or isinstance(v_t, dict):
-                callback_handler = self.update_object
+        :return: the change applied or None if the attribute is already in sync
+        """
+        if allowable_attributes is not None and k_t not in allowable_attributes:
+            raise NotImplementedError(
+                'Setting attribute %s is not supported by this module. Node path is %s' % (k_t, parent_path))
 
-            change = callback_handler(**callback_args)
-            if change is not None:
-                changes.append(change)
+        if parent_node.has(k_t):
+            attr = parent_node.require(k_t)
+        else:
+            raise ParameterError('%s.sync_attr: synchronizing attribute %s is not supported on jboss node %s' % (
+                self.__class__.__name__, k_t, parent_path))
 
-        return changes
+        # convert the attribute value to a comparable python value
+        try:
+            v_a = convert_dmr_to_python(attr)
+        except IllegalArgumentException:
+            raise ParameterError('%s.sync_attr: synchronizing attribute %s of type %s is not supported' % (
+                self.__class__.__name__, k_t, attr.type))
+
+        # also need to ensure the v_t is escaped/cleaned so we can compare, an undefined attribute is compared by the
+        # type the server declares for it
+        type_hint = type(v_a)
+        if v_a is None and not isinstance(v_t, (list, dict)):
+            resource_type = self.resource_metadata(parent_path)
+            if resource_type is not None and resource_type.attribute_type(k_t) not in [None, list, dict]:
+                type_hint = resource_type.attribute_type(k_t)
+        v_t = clean_python_value(v_t, type_hint)
+
+        debug('%s.sync_attr: param %s of type %s will be processed old[%r] new[%r]' % (
+            self.__class__.__name__, k_t, attr.type, v_a, v_t))
+
+        callback_args['name'] = k_t
+        callback_args['old_value'] = v_a
+        callback_args['new_value'] = v_t
+
+        # if either value is of type list, we need to engage a different callback handler as syncing list is
+        # not as simple as updating single value attributes, if both are undefined we don't really care and
+        # if their types differ, the caster would have already thrown a tantrum
+        if isinstance(v_a, list) or isinstance(v_t, list):
+            callback_handler = self.update_list
+
+        if isinstance(v_a, dict) or isinstance(v_t, dict):
+            callback_handler = self.update_object
+
+        return callback_handler(**callback_args)
 
     def _get_param(self, obj, name, default=undefined):
         """
@@ -738,6 +1366,10 @@ class BaseJBossModule(CommandHandler):
         :param attribute_name {string} - the attribute name to read
         :return {ModelNode} - a dmr result node
         """
+        node = self._cached_read(resource_path)
+        if node is not None and node.has(attribute_name):
+            return node.get(attribute_name)
+
         cmd = '%s:read-attribute(name=%s)' % (resource_path, attribute_name)
         return self.cmd_dmr(cmd)
 
@@ -746,12 +1378,36 @@ class BaseJBossModule(CommandHandler):
         Read a resource and return it as a dmr node
 
         :param resource_path: {string} - the absolute or relative path to the resource to read
-        :param recursive: {bool} - show the resource content recursive
+        :param recursive: {bool} - show the resource content recursive, reads served from the model cache are
+                          always recursive
         :return: a dmr node
         """
+        node = self._cached_read(resource_path)
+        if node is not None:
+            return node
+
         cmd = '%s:read-resource(recursive=%s)' % (resource_path, str(recursive).lower())
         return self.cmd_dmr(cmd)
 
+    def read_child_dmr(self, parent_node, resource_path, child_type, child_name):
+        """
+        Get a child resource from the recursive read of its parent, so a module that walks a resource tree does not
+        read every child again.
+
+        :param parent_node: {ModelNode} - the recursive read of the parent, undefined to read the child from the
+                            server, None if the parent does not exist yet
+        :param resource_path: {string} - the path of the child resource
+        :param child_type: {string} - the child type, e.g. local-cache
+        :param child_name: {string} - the child name
+        :return: {ModelNode} - the child resource
+        :raises NotFoundError: if the child does not exist
+        """
+        if parent_node is undefined:
+            return self.read_resource_dmr(resource_path, recursive=True)
+        if parent_node is not None and parent_node.has(child_type) and parent_node.get(child_type).has(child_name):
+            return parent_node.get(child_type).get(child_name)
+        raise NotFoundError('%s: resource %s does not exist' % (self.__class__.__name__, resource_path))
+
     def read_resource(self, resource_path, recursive=False):
         """
         Read a resource and return it in python type format
@@ -763,6 +1419,153 @@ class BaseJBossModule(CommandHandler):
         node = self.read_resource_dmr(resource_path, recursive)
         return self.dmr_to_python(node=node)
 
+    def read_resource_description(self, resource_path):
+        """
+        Read the recursive description of a resource type. The description is read for any resource of the type so
+        it is available before the resource is added, it is served from the metadata index of the server if possible.
+
+        :param resource_path: {string} - the path of the resource
+        :return: {dict} - the resource description
+        """
+        resource_type = self.resource_metadata(resource_path)
+        if resource_type is not None:
+            return resource_type.description
+
+        address = list(dmr_address(self._cli().build_request('%s:read-resource-description' % resource_path)))
+        if len(address) > 0:
+            address[-1] = (address[-1][0], '*')
+        node = self.cmd_dmr('%s:read-resource-description(recursive=true)' % address_to_path(address))
+        if node.type == node.type.LIST:
+            # a wildcard address returns the description of every matching resource
+            node = node.get(0).get('result')
+        return self.dmr_to_python(node=node)
+
+    def resource_metadata(self, resource_path):
+        """
+        Look up the type of a resource in the metadata index of the connected server, see jyboss.command.metadata. The
+        descriptions of the top level resource are read once per server release.
+
+        :param resource_path: {string} - the path of the resource
+        :return: {ResourceType} - the resource type, None if the server does not provide resource descriptions
+        """
+        from jyboss.command.metadata import MetadataIndex, release_key
+
+        connection = self.context.connection
+        if connection is None:
+            return None
+
+        if connection.metadata is None:
+            connection.metadata = False
+            try:
+                root = self.dmr_to_python(self.cmd_dmr(':read-resource(attributes-only=true, include-runtime=true)'))
+                # an offline model does not know the release it was written by
+                if root is not None and root.get('release-version') is not None:
+                    connection.metadata = MetadataIndex.instance(release_key(root))
+            except (CommandError, OperationError, NotFoundError) as e:
+                debug('%s.resource_metadata: server release is not available: %s' % (self.__class__.__name__, e))
+        index = connection.metadata
+        if not index:
+            return None
+
+        try:
+            address = dmr_address(self._cli().build_request('%s:read-resource' % resource_path))
+        except CommandError:
+            return None
+        if len(address) == 0:
+            return None
+
+        root_key = index.root_key(address[0])
+        if root_key is None:
+            root_key = self._index_description(index, address[0])
+            if root_key is None:
+                return None
+        return index.resource_type(root_key, address)
+
+    def _index_description(self, index, root):
+        """
+        Read the recursive description of a top level resource into the metadata index.
+
+        :param index: {MetadataIndex} - the index of the server release
+        :param root: {tuple(str, str)} - the type and name of the top level resource
+        :return: {str} - the key of the description in the index, None if it cannot be read
+        """
+        try:
+            try:
+                key = address_to_path([root])
+                node = self.cmd_dmr('%s:read-resource-description(recursive=true)' % key)
+            except NotFoundError:
+                # the resource does not exist yet, use the description registered for its name or the one
+                # registration for any name of its type, e.g. interface, other registrations describe other resources
+                key = None
+                entries = self.cmd_dmr('%s:read-resource-description(recursive=true)' %
+                                       address_to_path([(root[0], '*')]))
+                entries = entries.asList() if entries.type == entries.type.LIST else []
+                for entry in entries:
+                    entry_address = dmr_address(entry)
+                    if entry_address == (root,) or (len(entries) == 1 and entry_address == ((root[0], '*'),)):
+                        key = address_to_path(entry_address)
+                        node = entry.get('result')
+                        break
+                if key is None or not index.wildcard_allowed(key):
+                    debug('%s.resource_metadata: no registration of %s' % (self.__class__.__name__, root))
+                    return None
+        except (CommandError, OperationError, NotFoundError) as e:
+            debug('%s.resource_metadata: no description of %s: %s' % (self.__class__.__name__, root, e))
+            return None
+        index.store(key, self.dmr_to_python(node=node))
+        return key
+
+    def supported_attributes(self, resource_path, attributes, updatable=False, requested=None):
+        """
+        Restrict the attributes a module manages to the ones the connected server knows for the resource type.
+
+        :param resource_path: {string} - the path of the resource
+        :param attributes: {list(string)} - the attributes the module manages
+        :param updatable: {bool} - only keep the attributes that can be written once the resource exists
+        :param requested: {dict} - the desired state, an attribute it sets that the server does not know is an error
+        :return: {list(string)} - the supported attributes, all of them if the server does not provide descriptions
+        """
+        resource_type = self.resource_metadata(resource_path)
+        if resource_type is None:
+            return attributes
+        unknown = [a for a in attributes if requested is not None and requested.get(a) is not None and
+                   not resource_type.has_attribute(a)]
+        if len(unknown) > 0:
+            raise ParameterError('%s: the server does not know the attributes %s of %s' % (
+                self.__class__.__name__, ', '.join(sorted(unknown)), resource_path))
+        return [a for a in attributes if resource_type.has_attribute(a) and
+                not (updatable and resource_type.read_only(a))]
+
+    def sync_tree(self, resource_path, schema, target_state, current_node=undefined):
+        """
+        Synchronise a resource and its child resources with a desired document, see jyboss.command.tree. All
+        operations are submitted in a single composite operation.
+
+        :param resource_path: {string} - the path of the resource
+        :param schema: {ResourceSchema} - the schema of the resource
+        :param target_state: {dict} - the desired document of the resource
+        :param current_node: {ModelNode} - the recursive read of the resource, None if it does not exist, read from
+                             the server if not provided
+        :return: {dict} - the change of the resource, None if the resource is in sync
+        """
+        from jyboss.command.tree import TreeDiff
+
+        if current_node is undefined:
+            try:
+                current_node = self.read_resource_dmr(resource_path, recursive=True)
+            except NotFoundError:
+                current_node = None
+
+        resource_type = self.resource_metadata(resource_path)
+        if resource_type is not None:
+            description = resource_type.description
+        else:
+            description = self.read_resource_description(resource_path) if schema.needs_description() else None
+        current = None if current_node is None else (self.dmr_to_python(node=current_node) or {})
+        operations, change = TreeDiff(description).diff(resource_path, schema, target_state, current)
+        self.submit(operations)
+        return change
+
     def _format_apply_param(self, arg):
         """
         Apply parameters can be either dicts of list of dicts, this method will simply turn it into a list.
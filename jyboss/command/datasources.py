@@ -3,6 +3,7 @@ from __future__ import (absolute_import, division, print_function)
 
 from jyboss.exceptions import ParameterError, NotFoundError
 from jyboss.command.core import BaseJBossModule
+from jyboss.command.tree import ResourceSchema
 from jyboss.logging import debug
 
 __metaclass__ = type
@@ -107,6 +108,13 @@ class DatasourcesModule(BaseJBossModule):
         'pool-name'
     ]
 
+    # xa properties cannot be updated, a changed property is removed and added again
+    XA_DATASOURCE_PROPERTIES_SCHEMA = ResourceSchema(value='value', recreate=True)
+
+    DATASOURCE_SCHEMA = ResourceSchema(attributes=DATASOURCE_PARAMS,
+                                       immutable=DATASOURCE_NON_UPDATEABLE_PARAMS,
+                                       children={'xa-datasource-properties': XA_DATASOURCE_PROPERTIES_SCHEMA})
+
     JDBC_DRIVER_PARAMS = [
         'deployment-name',
         'driver-class-name',
@@ -191,73 +199,23 @@ class DatasourcesModule(BaseJBossModule):
 
         ds_path = '%s/%s=%s' % (self.path, datasource_type, name)
 
-        changes = []
-        try:
-            ds_dmr = self.read_resource_dmr(ds_path)
-            # update datasource
-            fc = dict((k, v) for (k, v) in iteritems(datasource) if
-                      k in self.DATASOURCE_PARAMS and k not in self.DATASOURCE_NON_UPDATEABLE_PARAMS)
-
-            a_changes = self._sync_attributes(parent_node=ds_dmr,
-                                              parent_path=ds_path,
-                                              target_state=fc,
-                                              allowable_attributes=self.DATASOURCE_PARAMS)
-
-            # also sync existing xa props
-            if 'xa-datasource-properties' in datasource:
-                a_changes += self.apply_xa_properties(datasource_type, name, datasource['xa-datasource-properties'])
-
-            if len(a_changes) > 0:
-                changes.append({'datasource': name, 'type': datasource_type, 'action': 'update', 'changes': a_changes})
-
-        except NotFoundError:
-            # create the datasource
-            ds_params = self.convert_to_dmr_params(datasource, self.DATASOURCE_PARAMS)
-            self.cmd('%s/%s=%s:add(%s)' % (self.path, datasource_type, name, ds_params))
-
-            add_change = {
-                'datasource': name,
-                'type': datasource_type,
-                'action': 'add',
-                'params': ds_params
-            }
-
-            if 'xa-datasource-properties' in datasource:
-                xa_params = self.apply_xa_properties(datasource_type, name, datasource['xa-datasource-properties'])
-                add_change['xa-datasource-properties'] = xa_params
-
-            changes.append(add_change)
-
-        return changes
-
-    def apply_xa_properties(self, datasource_type, name, properties):
-
-        changes = []
+        change = self.sync_tree(ds_path, self.DATASOURCE_SCHEMA, datasource)
+        if change is None:
+            return []
 
-        for key, new_value in iteritems(properties):
-            ds_path = '%s/%s=%s/xa-datasource-properties=%s' % (self.path, datasource_type, name, key)
-            # test if value exists
-            try:
-                dmr = self.read_attribute_dmr(ds_path, 'value')
-                old_value = self.dmr_to_python(dmr)
-                if new_value is None:  # if value is none, remove it
-                    self.cmd('%s:remove()' % ds_path)
-                    changes.append({'attribute': key, 'action': 'delete', 'old_value': old_value})
-                elif new_value is not None and new_value != old_value:  # if value is not none, add or update it
-                    self.cmd('%s:remove()' % ds_path)
-                    self.cmd('%s:add(value=%s' % (ds_path, self.convert_type(new_value)))
-                    changes.append({
-                        'attribute': key,
-                        'action': 'update',
-                        'old_value': old_value,
-                        'new_value': new_value
-                    })
-            except NotFoundError:
-                if new_value is not None:  # if value is not none, add it
-                    self.cmd('%s:add(value=%s' % (ds_path, self.convert_type(new_value)))
-                    changes.append({'attribute': key, 'action': 'add', 'new_value': new_value})
+        ds_change = {
+            'datasource': name,
+            'type': datasource_type,
+            'action': change['action']
+        }
+        if change['action'] == 'add':
+            ds_change['params'] = change.get('params', '')
+            if len(change['changes']) > 0:
+                ds_change['xa-datasource-properties'] = change['changes']
+        else:
+            ds_change['changes'] = change['changes']
 
-        return changes
+        return [ds_change]
 
     # JDBC Driver
     def apply_jdbc_drivers(self, jdbc_drivers):
@@ -292,20 +250,23 @@ class DatasourcesModule(BaseJBossModule):
         jdbc_driver_path = '%s/jdbc-driver=%s' % (self.path, name)
 
         changes = []
+        # the attributes of the driver as far as the server release knows them
+        params = self.supported_attributes(jdbc_driver_path, self.JDBC_DRIVER_PARAMS, requested=jdbc_driver)
+        updatable_params = self.supported_attributes(jdbc_driver_path, params, updatable=True)
         try:
             jdbc_driver_dmr = self.read_resource_dmr(jdbc_driver_path)
             # update jdbc_driver
             for (k, v) in iteritems(jdbc_driver):
-                if k in self.JDBC_DRIVER_NON_UPDATEABLE_PARAMS:
+                if k in self.JDBC_DRIVER_NON_UPDATEABLE_PARAMS or k in params and k not in updatable_params:
                     debug('Warning, parameter %s cannot be updated on jdbc driver and will be ignored' % k)
 
             fc = dict(
                 (k, v) for (k, v) in iteritems(jdbc_driver) if
-                k in self.JDBC_DRIVER_PARAMS and k not in self.JDBC_DRIVER_NON_UPDATEABLE_PARAMS)
+                k in updatable_params and k not in self.JDBC_DRIVER_NON_UPDATEABLE_PARAMS)
             a_changes = self._sync_attributes(parent_node=jdbc_driver_dmr,
                                               parent_path=jdbc_driver_path,
                                               target_state=fc,
-                                              allowable_attributes=self.JDBC_DRIVER_PARAMS)
+                                              allowable_attributes=params)
             if len(a_changes) > 0:
                 changes.append({'jdbc-driver': name, 'action': 'update', 'changes': a_changes})
 
@@ -315,7 +276,7 @@ class DatasourcesModule(BaseJBossModule):
             if 'driver-name' not in jdbc_driver:
                 jdbc_driver['driver-name'] = name
 
-            jdbc_driver_params = self.convert_to_dmr_params(jdbc_driver, self.JDBC_DRIVER_PARAMS)
+            jdbc_driver_params = self.convert_to_dmr_params(jdbc_driver, params)
             self.cmd('%s/jdbc-driver=%s:add(%s)' % (self.path, name, jdbc_driver_params))
             changes.append({'jdbc-driver': name, 'action': 'add', 'params': jdbc_driver_params})
 
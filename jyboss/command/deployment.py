@@ -1,8 +1,12 @@
 # Make coding more python3-ish
 from __future__ import (absolute_import, division, print_function)
 
-from jyboss.exceptions import NotFoundError
-from jyboss.command.core import BaseJBossModule
+import os
+import time
+
+from jyboss.exceptions import NotFoundError, OperationError, ParameterError
+from jyboss.command.core import BaseJBossModule, dmr_address
+from jyboss.content import ContentHashIndex
 from jyboss.logging import debug
 
 __metaclass__ = type
@@ -19,10 +23,24 @@ else:
         return d.iteritems()
 
 
+def _cli_argument(value):
+    """
+    Quote a cli command argument that contains whitespace or characters the cli parses, e.g. an archive path.
+
+    :param value: {str} - the argument value
+    :return: {str} - the value as it can be passed on the cli command line
+    """
+    if any(c.isspace() or c in '"\\=,' for c in value):
+        return '"%s"' % value.replace('\\', '\\\\').replace('"', '\\"')
+    return value
+
+
 class DeploymentModule(BaseJBossModule):
     DEPLOYMENT_PARAMS = [
         'name',
-        'enabled'
+        'enabled',
+        'path',
+        'runtime-name'
     ]
 
     def __init__(self, context=None):
@@ -30,23 +48,210 @@ class DeploymentModule(BaseJBossModule):
 
     def apply(self, deployment=None, **kwargs):
 
-        deployments = self._format_apply_param(deployment)
+        deployments = self.unescape_keys(self._format_apply_param(deployment))
 
         changes = []
+        uploads = [d for d in deployments if self._get_param(d, 'path', None) is not None]
+        # the content hashes are only needed for uploads, both are read before anything is written
+        items = self.read_deployments(['enabled', 'content'] if len(uploads) > 0 else ['enabled'])
+        if len(uploads) > 0:
+            changes += self.apply_content(uploads, self._content_hashes(items[1]))
+        # an uploaded deployment is added or replaced in the requested state already, the others keep their state
+        uploaded = [change['deployment'] for change in changes]
 
+        current = self._enabled(items[0])
+
+        toggles = []
         for d in deployments:
             name = self._get_param(d, 'name')
-            enabled = self._get_param(d, 'enabled')
+            if name in uploaded:
+                continue
+            # deployments with an archive are enabled unless stated otherwise, like uploaded ones
+            enabled = self._get_param(d, 'enabled', True) if 'path' in d else self._get_param(d, 'enabled')
             action = 'deploy' if enabled else 'undeploy'
             debug(self.__class__.__name__ + '.apply: ' + (self.path % name) + ':' + action)
-            try:
-                cur_depl = self.read_resource(self.path % name)
-                if 'enabled' in cur_depl:
-                    if cur_depl['enabled'] != enabled:
-                        self.cmd((self.path % name) + ':' + action)
-                        changes.append({'deployment': name, 'action': action})
+            if name in current and current[name] is not None and current[name] != enabled:
+                toggles.append(((self.path % name) + ':' + action, {'deployment': name, 'action': action}))
 
-            except NotFoundError:
-                pass
+        self.toggle(toggles)
+        changes += [change for _, change in toggles]
 
         return changes if len(changes) > 0 else None
+
+    def apply_content(self, deployments, hashes):
+        """
+        Upload the archives of deployments whose content on the server differs from the local file. The content is
+        compared by its SHA-1 hash so unchanged archives are not transferred, see jyboss.content.ContentHashIndex.
+
+        :param deployments: {list(dict)} - the deployments with the path of their archive
+        :param hashes: {dict} - the hex content hash of the deployments on the server keyed by name
+        :return: {list(dict)} - the change records of the uploaded deployments
+        """
+        changes = []
+        for d in deployments:
+            name = self._get_param(d, 'name')
+            path = self._get_param(d, 'path')
+            if not os.path.isfile(path):
+                raise ParameterError('%s: deployment archive %s does not exist' % (self.__class__.__name__, path))
+            local_hash = ContentHashIndex.instance().hash(path)
+            if hashes.get(name) == local_hash:
+                debug('%s.apply_content: %s is already deployed with content %s' % (
+                    self.__class__.__name__, name, local_hash))
+                continue
+            change = {'deployment': name, 'action': 'replace' if name in hashes else 'add', 'hash': local_hash}
+            self.upload(name, path, self._get_param(d, 'enabled', True), self._get_param(d, 'runtime-name', None),
+                        name in hashes, change)
+            changes.append(change)
+
+        return changes
+
+    def read_deployments(self, attributes):
+        """
+        Read attributes of all deployments with a single wildcard read per attribute. The reads are independent and
+        are submitted together so they overlap on the server, inside a composite operation they are executed in turn.
+
+        :param attributes: {list(str)} - the names of the attributes to read
+        :return: {list(ModelNode)} - the wildcard read results in the order of the attributes, None if there are no
+                 deployments
+        """
+        cmds = ['%s:read-attribute(name=%s)' % (self.path % '*', attribute) for attribute in attributes]
+        if self.context.operation_queue is None:
+            return self.gather([self.cmd_async(cmd) for cmd in cmds], dmr=True, ignore_not_found=True)
+
+        items = []
+        for cmd in cmds:
+            try:
+                items.append(self.cmd_dmr(cmd))
+            except NotFoundError:
+                items.append(None)
+        return items
+
+    @staticmethod
+    def _content_hashes(items):
+        """
+        :param items: {ModelNode} - the result of the wildcard read of the content attribute
+        :return: {dict} - the hex hash keyed by deployment name, None for unmanaged deployments
+        """
+        if items is None:
+            return {}
+
+        hashes = {}
+        for item in items.asList():
+            if item.get('outcome').asString() != 'success':
+                continue
+            content = item.get('result')
+            hashes[dmr_address(item)[-1][1]] = None
+            if content.isDefined() and len(content.asList()) > 0 and content.get(0).has('hash'):
+                hashes[dmr_address(item)[-1][1]] = ''.join(
+                    '%02x' % (b & 0xff) for b in content.get(0).get('hash').asBytes())
+        return hashes
+
+    def upload(self, name, path, enabled, runtime_name, replace, change):
+        """
+        Stream a deployment archive from disk to the server, the bytes sent and the throughput are added to the
+        change record.
+
+        :param name: {str} - the deployment name
+        :param path: {str} - the archive to upload
+        :param enabled: {bool} - deploy the content once it is uploaded
+        :param runtime_name: {str} - optional runtime name of the deployment
+        :param replace: {bool} - replace the content of an existing deployment
+        :param change: {dict} - the change record
+        """
+        if self.context.plan is not None:
+            # content cannot be part of a plan snapshot, the cli deploy command streams it when the plan is executed
+            cmd = 'deploy %s --name=%s' % (_cli_argument(path), _cli_argument(name))
+            if runtime_name is not None:
+                cmd += ' --runtime-name=%s' % _cli_argument(runtime_name)
+            if replace:
+                cmd += ' --force'
+            elif not enabled:
+                cmd += ' --disabled'
+            self._execute(cmd)
+            return
+
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        request = ModelNode()
+        if replace:
+            request.get('operation').set('full-replace-deployment')
+            request.get('address').setEmptyList()
+            request.get('name').set(name)
+        else:
+            request.get('operation').set('add')
+            request.get('address').add('deployment', name)
+        request.get('content').add().get('input-stream-index').set(0)
+        request.get('enabled').set(bool(enabled))
+        if runtime_name is not None:
+            request.get('runtime-name').set(runtime_name)
+
+        size = os.path.getsize(path)
+        debug('%s.upload: %s %d bytes from %s' % (self.__class__.__name__, name, size, path))
+        start = time.time()
+        result = self._cli().cmd_upload(request, [path], description='upload %s to %s' % (path, self.path % name))
+        elapsed = time.time() - start
+        self._invalidate_cache(result)
+        self._track_process_state(result)
+        if not result.isSuccess():
+            self._raise_failure(result.cliCommand, result)
+
+        change['bytes'] = size
+        change['seconds'] = round(elapsed, 3)
+        change['bytes-per-second'] = int(size / elapsed) if elapsed > 0 else size
+
+    @staticmethod
+    def _enabled(items):
+        """
+        :param items: {ModelNode} - the result of the wildcard read of the enabled attribute
+        :return: {dict} - the enabled flag keyed by deployment name, None if the flag is not defined
+        """
+        if items is None:
+            return {}
+
+        current = {}
+        for item in items.asList():
+            name = dmr_address(item)[-1][1]
+            if item.get('outcome').asString() != 'success':
+                continue
+            value = item.get('result')
+            current[name] = value.asBoolean() if value.isDefined() else None
+        return current
+
+    def toggle(self, toggles):
+        """
+        Submit the deploy and undeploy operations in one composite operation and record the outcome of every
+        deployment in its change record. A failed composite is rolled back as a whole.
+
+        :param toggles: {list(tuple(str, dict))} - the cli operations and their change records
+        """
+        if len(toggles) == 0:
+            return
+        elif self.context.plan is not None or self.context.operation_queue is not None:
+            # part of a plan or of a composite operation that is already in progress
+            for cmd, change in toggles:
+                self.queue_cmd(cmd, change)
+            return
+
+        result = self._cli().cmd_composite([cmd for cmd, _ in toggles])
+        self._invalidate_cache(result)
+        self._track_process_state(result)
+        steps = result.getResponse().get('result')
+
+        failures = []
+        for i, (cmd, change) in enumerate(toggles):
+            step_key = 'step-%d' % (i + 1)
+            step = steps.get(step_key) if steps.isDefined() and steps.has(step_key) else None
+            if step is None or not step.has('outcome'):
+                change['outcome'] = 'cancelled'
+                continue
+            change['outcome'] = step.get('outcome').asString()
+            if change['outcome'] == 'failed' and step.has('failure-description'):
+                change['failure-description'] = step.get('failure-description').asString()
+                failures.append('%s: %s' % (change['deployment'], change['failure-description']))
+            elif step.has('rolled-back') and step.get('rolled-back').asBoolean(False):
+                change['outcome'] = 'rolled-back'
+
+        if not result.isSuccess():
+            errm = self._extract_errm(result)
+            raise OperationError('deployment changes were rolled back: %s' % (
+                '; '.join(failures) if len(failures) > 0 else errm))
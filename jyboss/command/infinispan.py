@@ -1,10 +1,15 @@
+"""
+The infinispan subsystem is read once recursively, the cache containers, caches and their components are synced
+against the sub trees of this read. All writes of a cache container are submitted in one composite operation.
+"""
+
 # Make coding more python3-ish
 from __future__ import (absolute_import, division, print_function)
 
 from abc import ABCMeta
 
 from jyboss.exceptions import ParameterError, NotFoundError
-from jyboss.command.core import BaseJBossModule
+from jyboss.command.core import BaseJBossModule, undefined
 from jyboss.logging import debug
 
 __metaclass__ = type
@@ -26,6 +31,25 @@ except ImportError:
     import json
 
 
+def _remove(module, parent_node, resource_path, child_type, child_name, change):
+    """
+    Remove a child resource if it exists.
+
+    :param module: {BaseJBossModule} - the module removing the resource
+    :param parent_node: {ModelNode} - the recursive read of the parent, see BaseJBossModule.read_child_dmr
+    :return: {list(dict)} - the change if the resource was removed
+    """
+    try:
+        if parent_node is undefined:
+            module.cmd('%s:remove()' % resource_path)
+        else:
+            module.read_child_dmr(parent_node, resource_path, child_type, child_name)
+            module.queue_cmd('%s:remove()' % resource_path, change)
+        return [change]
+    except NotFoundError:
+        return []
+
+
 class InfinispanModule(BaseJBossModule):
     def __init__(self, context=None):
         super(InfinispanModule, self).__init__(path='/subsystem=infinispan', context=context)
@@ -58,16 +82,17 @@ class InfinispanModule(BaseJBossModule):
         changes = []
 
         try:
-            self.read_resource(self.path, recursive=False)
+            subsystem_node = self.read_resource_dmr(self.path, recursive=True)
         except NotFoundError:
             self.cmd('%s:add()' % self.path)
             changes.append({'subsystem': 'infinispan', 'action': 'add'})
+            subsystem_node = None
 
         for key in infinispan:
             # first check if a submodule handler exists for the key element
             if key in self.submodules:
                 handler = self.submodules[key]
-                handler_changes = handler.apply(infinispan[key])
+                handler_changes = handler.apply(infinispan[key], subsystem_node=subsystem_node)
                 if len(handler_changes) > 0:
                     changes += handler_changes
             elif key in ['state']:
@@ -108,8 +133,11 @@ class CacheContainerModule(BaseJBossModule):
             'caches': CacheResolverDelegate(self.context)
         }
 
-    def apply(self, containers=None, **kwargs):
-
+    def apply(self, containers=None, subsystem_node=undefined, **kwargs):
+        """
+        :param containers: {list(dict)} - the cache container configurations
+        :param subsystem_node: {ModelNode} - the recursive read of the subsystem, see BaseJBossModule.read_child_dmr
+        """
         containers = self._format_apply_param(containers)
 
         changes = []
@@ -120,22 +148,24 @@ class CacheContainerModule(BaseJBossModule):
                 raise ParameterError('The container state is not one of [present|absent]')
 
             if state == 'present':
-                changes += self.apply_present(container)
+                changes += self.apply_present(container, subsystem_node)
             elif state == 'absent':
-                changes += self.apply_absent(container)
+                changes += self.apply_absent(container, subsystem_node)
 
         return changes
 
-    def apply_absent(self, stack):
+    def apply_absent(self, stack, subsystem_node=undefined):
 
         name = self._get_param(stack, 'name')
-        try:
-            self.cmd((self.path + ':remove()') % name)
-            return [{'cache-container': name, 'action': 'delete'}]
-        except NotFoundError:
-            return []
+        return _remove(self, subsystem_node, self.path % name, 'cache-container', name,
+                       {'cache-container': name, 'action': 'delete'})
 
-    def apply_present(self, container):
+    def apply_present(self, container, subsystem_node=undefined):
+        # the writes of the container and everything below it are submitted in one round trip
+        with self.composite(always=True):
+            return self._apply_present(container, subsystem_node)
+
+    def _apply_present(self, container, subsystem_node):
         container_name = self._get_param(container, 'name')
         container_path = self.path % container_name
 
@@ -146,7 +176,7 @@ class CacheContainerModule(BaseJBossModule):
         }
 
         try:
-            container_dmr = self.read_resource_dmr(container_path, recursive=True)
+            container_dmr = self.read_child_dmr(subsystem_node, container_path, 'cache-container', container_name)
             fc = dict(
                 (k, v) for (k, v) in iteritems(container) if k in self.CONTAINER_PARAMS)
             update_changes = self._sync_attributes(parent_node=container_dmr,
@@ -159,16 +189,17 @@ class CacheContainerModule(BaseJBossModule):
 
         except NotFoundError:
             container_params = self.convert_to_dmr_params(container, self.CONTAINER_PARAMS)
-            self.cmd('%s:add(%s)' % (container_path, container_params))
+            self.queue_cmd('%s:add(%s)' % (container_path, container_params), change)
             change['action'] = 'add'
             if len(container_params) > 0:
                 change['params'] = container_params
+            container_dmr = None
 
         # now apply all sub component handlers
         for key in container:
             if key in self.submodules:
                 handler = self.submodules[key]
-                modchanges = handler.apply(container_name, container[key])
+                modchanges = handler.apply(container_name, container[key], container_node=container_dmr)
                 if len(modchanges) > 0:
                     if change['action'] is None:
                         change['action'] = 'update'
@@ -197,7 +228,7 @@ class TransportModule(BaseJBossModule):
             path='/subsystem=infinispan/cache-container=%s/transport=TRANSPORT',
             context=context)
 
-    def apply(self, container_name, transport=None, **kwargs):
+    def apply(self, container_name, transport=None, container_node=undefined, **kwargs):
 
         changes = []
 
@@ -206,21 +237,17 @@ class TransportModule(BaseJBossModule):
             raise ParameterError('The container transport state is not one of [present|absent]')
 
         if state == 'present':
-            changes += self.apply_present(container_name, transport)
+            changes += self.apply_present(container_name, transport, container_node)
         elif state == 'absent':
-            changes += self.apply_absent(transport)
+            changes += self.apply_absent(container_name, container_node)
 
         return changes
 
-    def apply_absent(self, container_name):
-
-        try:
-            self.cmd((self.path + ':remove()') % container_name)
-            return [{'transport': 'TRANSPORT', 'action': 'delete'}]
-        except NotFoundError:
-            return []
+    def apply_absent(self, container_name, container_node=undefined):
+        return _remove(self, container_node, self.path % container_name, 'transport', 'TRANSPORT',
+                       {'transport': 'TRANSPORT', 'action': 'delete'})
 
-    def apply_present(self, container_name, transport):
+    def apply_present(self, container_name, transport, container_node=undefined):
         transport_path = self.path % container_name
         change = {
             'transport': 'TRANSPORT',
@@ -229,7 +256,7 @@ class TransportModule(BaseJBossModule):
         }
 
         try:
-            transport_dmr = self.read_resource_dmr(transport_path, recursive=True)
+            transport_dmr = self.read_child_dmr(container_node, transport_path, 'transport', 'TRANSPORT')
             fc = dict(
                 (k, v) for (k, v) in iteritems(transport) if k in self.TRANSPORT_PARAMS)
             a_changes = self._sync_attributes(parent_node=transport_dmr,
@@ -242,7 +269,7 @@ class TransportModule(BaseJBossModule):
 
         except NotFoundError:
             transport_params = self.convert_to_dmr_params(transport, self.TRANSPORT_PARAMS)
-            self.cmd('%s:add(%s)' % (transport_path, transport_params))
+            self.queue_cmd('%s:add(%s)' % (transport_path, transport_params), change)
             change['action'] = 'add'
             if len(transport_params) > 0:
                 change['params'] = transport_params
@@ -262,7 +289,7 @@ class CacheResolverDelegate(object):
             'distributed-cache': DistributedCache(context)
         }
 
-    def apply(self, container_name, caches):
+    def apply(self, container_name, caches, container_node=undefined):
 
         changes = []
 
@@ -271,7 +298,7 @@ class CacheResolverDelegate(object):
                 raise ParameterError('%s: cache type was not provided' % self.__class__.__name__)
             cache_type = cache['type']
             if cache_type in self.submodules:
-                changes += self.submodules[cache_type].apply(container_name, cache)
+                changes += self.submodules[cache_type].apply(container_name, cache, container_node=container_node)
             else:
                 raise ParameterError(
                     '%s does not have a cache handler for type %s' % (self.__class__.__name__, cache_type))
@@ -328,29 +355,26 @@ class Cache(BaseJBossModule):
             # remote-store
         }
 
-    def apply(self, container_name, cache=None, **kwargs):
+    def apply(self, container_name, cache=None, container_node=undefined, **kwargs):
         changes = []
         state = self._get_param(cache, 'state')
         if state not in ['present', 'absent']:
             raise ParameterError('The cache state is not one of [present|absent]')
 
         if state == 'present':
-            changes += self.apply_present(container_name, cache)
+            changes += self.apply_present(container_name, cache, container_node)
         elif state == 'absent':
-            changes += self.apply_absent(container_name, cache)
+            changes += self.apply_absent(container_name, cache, container_node)
 
         return changes
 
-    def apply_absent(self, container_name, cache):
+    def apply_absent(self, container_name, cache, container_node=undefined):
         cache_name = self._get_param(cache, 'name')
         cache_type = self._get_param(cache, 'type')
-        try:
-            self.cmd((self.path + ':remove()') % (container_name, cache_type, cache_name))
-            return [{cache_type: cache_name, 'action': 'delete'}]
-        except NotFoundError:
-            return []
+        return _remove(self, container_node, self.path % (container_name, cache_type, cache_name), cache_type,
+                       cache_name, {cache_type: cache_name, 'action': 'delete'})
 
-    def apply_present(self, container_name, cache):
+    def apply_present(self, container_name, cache, container_node=undefined):
         cache_name = self._get_param(cache, 'name')
         cache_type = self._get_param(cache, 'type')
         cache_path = self.path % (container_name, cache_type, cache_name)
@@ -362,7 +386,7 @@ class Cache(BaseJBossModule):
         }
 
         try:
-            cache_dmr = self.read_resource_dmr(cache_path, recursive=True)
+            cache_dmr = self.read_child_dmr(container_node, cache_path, cache_type, cache_name)
             fc = dict(
                 (k, v) for (k, v) in iteritems(cache) if k in self.cache_params)
             attr_changes = self._sync_attributes(parent_node=cache_dmr,
@@ -375,16 +399,18 @@ class Cache(BaseJBossModule):
 
         except NotFoundError:
             cache_params = self.convert_to_dmr_params(cache, self.cache_params)
-            self.cmd('%s:add(%s)' % (cache_path, cache_params))
+            self.queue_cmd('%s:add(%s)' % (cache_path, cache_params), change)
             change['action'] = 'add'
             if len(cache_params) > 0:
                 change['params'] = cache_params
+            cache_dmr = None
 
         # process all submodules
         for key in cache:
             if key in self.cache_modules:
                 modchanges = self.cache_modules[key].apply(container_name=container_name, cache_type=cache_type,
-                                                           cache_name=cache_name, config=cache[key])
+                                                           cache_name=cache_name, config=cache[key],
+                                                           cache_node=cache_dmr)
                 if len(modchanges) > 0:
                     change[key] = modchanges
 
@@ -463,20 +489,17 @@ class Component(BaseJBossModule):
         self.component_type = component_type
         self.component_params = component_params
 
-    def apply(self, container_name, cache_type, cache_name, config=None, **kwargs):
+    def apply(self, container_name, cache_type, cache_name, config=None, cache_node=undefined, **kwargs):
         if config is None:
-            return self.apply_absent(container_name, cache_type, cache_name)
+            return self.apply_absent(container_name, cache_type, cache_name, cache_node)
         else:
-            return self.apply_present(container_name, cache_type, cache_name, config)
+            return self.apply_present(container_name, cache_type, cache_name, config, cache_node)
 
-    def apply_absent(self, container_name, cache_type, cache_name):
-        try:
-            self.cmd((self.path + ':remove()') % (container_name, cache_type, cache_name, self.component_type))
-            return [{'component': self.component_type, 'action': 'delete'}]
-        except NotFoundError:
-            return []
+    def apply_absent(self, container_name, cache_type, cache_name, cache_node=undefined):
+        return _remove(self, cache_node, self.path % (container_name, cache_type, cache_name, self.component_type),
+                       'component', self.component_type, {'component': self.component_type, 'action': 'delete'})
 
-    def apply_present(self, container_name, cache_type, cache_name, config):
+    def apply_present(self, container_name, cache_type, cache_name, config, cache_node=undefined):
         config_path = self.path % (container_name, cache_type, cache_name, self.component_type)
         change = {
             'component': self.component_type,
@@ -485,7 +508,7 @@ class Component(BaseJBossModule):
         }
 
         try:
-            config_dmr = self.read_resource_dmr(config_path, recursive=True)
+            config_dmr = self.read_child_dmr(cache_node, config_path, 'component', self.component_type)
             fc = dict(
                 (k, v) for (k, v) in iteritems(config) if k in self.component_params)
             attr_changes = self._sync_attributes(parent_node=config_dmr,
@@ -498,7 +521,7 @@ class Component(BaseJBossModule):
 
         except NotFoundError:
             config_params = self.convert_to_dmr_params(config, self.component_params)
-            self.cmd('%s:add(%s)' % (config_path, config_params))
+            self.queue_cmd('%s:add(%s)' % (config_path, config_params), change)
             change['action'] = 'add'
             if len(config_params) > 0:
                 change['params'] = config_params
@@ -67,19 +67,21 @@ class InterfaceModule(BaseJBossModule):
         name = self._get_param(interface, 'name')
         iface_path = self.path % name
         changes = []
+        # the interface criteria differ between server releases
+        params = self.supported_attributes(iface_path, self.INTERFACE_PARAMS, requested=interface)
 
         try:
             iface_dmr = self.read_resource_dmr(iface_path, recursive=True)
             fc = dict(
-                (k, v) for (k, v) in iteritems(interface) if k in self.INTERFACE_PARAMS)
+                (k, v) for (k, v) in iteritems(interface) if k in params)
             a_changes = self._sync_attributes(parent_node=iface_dmr,
                                               parent_path=iface_path,
                                               target_state=fc,
-                                              allowable_attributes=self.INTERFACE_PARAMS)
+                                              allowable_attributes=params)
             if len(a_changes) > 0:
                 changes.append({'interface': name, 'action': 'update', 'changes': a_changes})
         except NotFoundError:
-            iface_params = self.convert_to_dmr_params(interface, self.INTERFACE_PARAMS)
+            iface_params = self.convert_to_dmr_params(interface, params)
             self.cmd('%s:add(%s)' % (iface_path, iface_params))
             changes.append({'interface': name, 'action': 'add'})
         return changes
@@ -2,6 +2,7 @@
 from __future__ import (absolute_import, division, print_function)
 
 import copy
+import collections
 
 from jyboss.exceptions import ParameterError, NotFoundError
 from jyboss.command.core import BaseJBossModule
@@ -161,17 +162,18 @@ class JGroupsStackModule(BaseJBossModule):
         changes = []
 
         try:
-            self.read_resource_dmr(stack_path, recursive=True)
+            stack_node = self.read_resource_dmr(stack_path, recursive=True)
         except NotFoundError:
             self.cmd('%s:add()' % stack_path)
             changes.append({'stack': name, 'action': 'add'})
+            stack_node = None
 
         # now sync sub items
         for k, v in iteritems(stack):
             if k == 'transport':
                 changes += self.sync_transport(name, v)
             elif k == 'protocol':
-                changes += self.sync_protocols(name, v)
+                changes += self.sync_protocols(name, v, stack_node)
             elif k in ['name', 'state']:
                 pass
             else:
@@ -217,28 +219,33 @@ class JGroupsStackModule(BaseJBossModule):
 
         return changes
 
-    def sync_protocols(self, stack_name, protocols):
+    def sync_protocols(self, stack_name, protocols, stack_node):
         """
         Synching protocols is a bit more complicated in jgroups as order of items is important. This method will check
         for ordered equality of the list of protocols and if equal will attempt to sync each item or if not equal will
-        remove all and add them.
+        remove all and add them. The differences are computed from one recursive read of the stack and the writes are
+        submitted in a single composite operation.
         :param stack_name: the name of the stack within the protocol
         :param protocols: the list of protocols to sync
+        :param stack_node: the recursive read of the stack, None for a stack that was just added
         :return: any changes that have been applied in the process
         """
+        stack_path = self.path % stack_name
+        old_protos = self._read_protocols(stack_node)
+        operations = []
         changes = []
 
-        if self._check_protocol_order(stack_name, protocols):
+        if self._check_protocol_order(old_protos.keys(), [p.get('type') for p in protocols]):
             # synch properties of each proto - can asume the order and quantity of protos is all good
             for new_proto in protocols:
                 protocol_type = self._get_param(new_proto, 'type')
-                old_proto = self.read_resource('{0}/protocol={1}'.format(self.path % stack_name, protocol_type))
+                protocol_path = '{0}/protocol={1}'.format(stack_path, protocol_type)
 
                 # FIXME sync all registered params
 
                 # sync properties params
                 # match all new to all old properties
-                old_properties = old_proto.get('properties', {})
+                old_properties = old_protos[protocol_type]
                 for property in new_proto.get('properties', []):
                     p_k = property.get('name', None)
                     p_vn = property.get('value', None)
@@ -246,13 +253,13 @@ class JGroupsStackModule(BaseJBossModule):
                     if p_vn is None:
                         if p_k in old_properties:
                             # remove it
-                            self.cmd('{0}/protocol={1}/property={2}/:remove()' \
-                                     .format(self.path % stack_name, protocol_type, p_k))
-                            changes.append({
+                            change = {
                                 'protocol': protocol_type,
                                 'property': p_k,
                                 'action': 'delete'
-                            })
+                            }
+                            operations.append(('{0}/property={1}/:remove()'.format(protocol_path, p_k), change))
+                            changes.append(change)
                     # then we check if we need to compare both
                     elif p_k in old_properties:
                         # FIXME convert to comparable values
@@ -262,67 +269,82 @@ class JGroupsStackModule(BaseJBossModule):
                             p_vo = p_vo['EXPRESSION_VALUE']
 
                         if str(p_vo) != str(p_vn):
-                            # update it
-                            self.cmd('{0}/protocol={1}/property={2}/:add(value={3})' \
-                                     .format(self.path % stack_name, protocol_type, p_k, p_vn))
-                            changes.append({
+                            # update it, the property resource only has a value so it is replaced
+                            change = {
                                 'protocol': protocol_type,
                                 'property': p_k,
                                 'action': 'update',
                                 'old_value': p_vo,
                                 'new_value': p_vn
-                            })
+                            }
+                            operations.append(('{0}/property={1}/:remove()'.format(protocol_path, p_k), None))
+                            operations.append(('{0}/property={1}/:add(value={2})'.format(protocol_path, p_k, p_vn),
+                                               change))
+                            changes.append(change)
                     # lastly we may need to add if not exists
                     else:
                         # add it
-                        self.cmd('{0}/protocol={1}/property={2}/:add(value={3})' \
-                                 .format(self.path % stack_name, protocol_type, p_k, p_vn))
-                        changes.append({
+                        change = {
                             'protocol': protocol_type,
                             'property': p_k,
                             'action': 'add',
                             'new_value': p_vn
-                        })
+                        }
+                        operations.append(('{0}/property={1}/:add(value={2})'.format(protocol_path, p_k, p_vn),
+                                           change))
+                        changes.append(change)
 
         else:
             # delete old protocols and add new set (we don't care about order here)
-            old_protos = self.ls((self.path % stack_name) + '/protocol', silent=True)
-            for old_proto in old_protos:
-                self.cmd((self.path % stack_name) + ('/protocol=%s:remove()' % old_proto))
-                changes.append({'protocol': old_proto, 'action': 'delete'})
+            for old_proto in old_protos.keys():
+                change = {'protocol': old_proto, 'action': 'delete'}
+                operations.append(('%s/protocol=%s:remove()' % (stack_path, old_proto), change))
+                changes.append(change)
             # add new set
             for new_proto in protocols:
                 protocol_type = self._get_param(new_proto, 'type')
                 proto_params = self.convert_to_dmr_params(new_proto, None)
-                self.cmd('{0}/protocol={1}:add({2})'.format(self.path % stack_name, protocol_type, proto_params))
                 properties = new_proto.get('properties', [])
+                change = {'protocol': protocol_type, 'action': 'add', 'parameters': proto_params,
+                          'properties': properties}
+                operations.append(('{0}/protocol={1}:add({2})'.format(stack_path, protocol_type, proto_params),
+                                   change))
                 for new_prop in properties:
                     p_k = new_prop.get('name')
                     p_v = new_prop.get('value')
                     if p_v is not None:
-                        self.cmd('{0}/protocol={1}/property={2}/:add(value={3})' \
-                                 .format(self.path % stack_name, protocol_type, p_k, p_v))
-                changes.append({'protocol': protocol_type, 'action': 'add', 'parameters': proto_params,
-                                'properties': properties})
+                        operations.append(('{0}/protocol={1}/property={2}/:add(value={3})'
+                                           .format(stack_path, protocol_type, p_k, p_v), None))
+                changes.append(change)
 
+        self.submit(operations)
         return changes
 
-    def _check_protocol_order(self, stack_name, protocols):
-        old_stack = self.read_resource_dmr(self.path % stack_name)
-        if old_stack.has('protocol') and str(old_stack.get('protocol').type) != 'UNDEFINED':
-            old_protos = [str(p) for p in old_stack.get('protocol').keys()]
-        else:
-            old_protos = []
-
-        new_protos = [p.get('type') for p in protocols]
-
-        equal = len(old_protos) > 0 and len(old_protos) == len(new_protos)
-
-        while len(old_protos) > 0 and equal:
-            if old_protos.pop() != new_protos.pop():
-                equal = False
-
-        return equal
+    def _read_protocols(self, stack_node):
+        """
+        :param stack_node: {ModelNode} - the recursive read of a stack
+        :return: {OrderedDict} - the properties of each protocol of the stack by protocol type, in stack order
+        """
+        protocols = collections.OrderedDict()
+        if stack_node is None or not stack_node.has('protocol') or not stack_node.get('protocol').isDefined():
+            return protocols
+        protocol_nodes = stack_node.get('protocol')
+        for protocol_type in protocol_nodes.keys():
+            protocol_node = protocol_nodes.get(protocol_type)
+            properties = None
+            if protocol_node.has('properties'):
+                properties = self.dmr_to_python(node=protocol_node.get('properties'))
+            if not properties and protocol_node.has('property') and protocol_node.get('property').isDefined():
+                # servers without the properties attribute only have the property child resources
+                property_nodes = protocol_node.get('property')
+                properties = dict((str(k), self.dmr_to_python(node=property_nodes.get(k).get('value')))
+                                  for k in property_nodes.keys())
+            protocols[str(protocol_type)] = properties or {}
+        return protocols
+
+    @staticmethod
+    def _check_protocol_order(old_protos, new_protos):
+        return len(old_protos) > 0 and list(old_protos) == list(new_protos)
 
 
 class JGroupsChannelModule(BaseJBossModule):
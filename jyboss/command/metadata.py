@@ -0,0 +1,239 @@
+"""
+Resource descriptions of a server release. The descriptions of a top level resource, e.g. a subsystem, are read with
+read-resource-description(recursive=true) the first time a module asks for them and kept in a file per release in the
+jyboss home, later runs against a server of the same release never read them again. The index flattens the
+descriptions into resource types by address so the attributes and child types of a resource are looked up directly.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import re
+import uuid
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from synchronize import make_synchronized
+from jyboss.logging import debug, warn
+
+__metaclass__ = type
+
+try:
+    dict.iteritems
+except AttributeError:
+    # Python 3
+    def iteritems(d):
+        return d.items()
+else:
+    # Python 2
+    def iteritems(d):
+        return d.iteritems()
+
+try:
+    # Python 2
+    unicode
+    long
+except NameError:
+    # Python 3
+    unicode = str
+    long = int
+
+DEFAULT_CACHE_DIR = 'metadata'
+
+# the python types of the dmr attribute types
+DMR_TYPES = {
+    'BOOLEAN': bool,
+    'INT': int,
+    'LONG': long,
+    'DOUBLE': float,
+    'BIG_DECIMAL': float,
+    'BIG_INTEGER': long,
+    'STRING': unicode,
+    'LIST': list,
+    'OBJECT': dict
+}
+
+_unsafe_chars = re.compile('[^A-Za-z0-9._-]+')
+
+# top level types registered per name, the description of one of them never describes another
+NAMED_ROOT_TYPES = ['subsystem']
+
+
+def release_key(root):
+    """
+    :param root: {dict} - the attributes of the root resource of a server
+    :return: {str} - the product and release of the server, usable as file name
+    """
+    parts = [root.get('product-name') or 'WildFly', root.get('product-version'), root.get('release-version')]
+    return _unsafe_chars.sub('_', '-'.join(unicode(p) for p in parts if p is not None))
+
+
+def _dmr_type(value):
+    if isinstance(value, dict):
+        value = value.get('TYPE_MODEL_VALUE')
+    return value
+
+
+class ResourceType(object):
+    """
+    the attributes and child types of one resource type
+    """
+
+    def __init__(self, description):
+        """
+        :param description: {dict} - the resource description of the type
+        """
+        self.description = description
+        self.attributes = dict((name, {
+            'type': _dmr_type(a.get('type')),
+            'restart-required': a.get('restart-required', 'no-services'),
+            'read-only': a.get('access-type', 'read-write') != 'read-write',
+            'nillable': a.get('nillable', True)
+        }) for name, a in iteritems(description.get('attributes') or {}))
+        self.child_types = sorted((description.get('children') or {}).keys())
+
+    def has_attribute(self, name):
+        return name in self.attributes
+
+    def attribute_type(self, name):
+        """
+        :return: {type} - the python type of an attribute, None if the attribute or its type is unknown
+        """
+        attribute = self.attributes.get(name)
+        return None if attribute is None else DMR_TYPES.get(attribute['type'])
+
+    def restart_required(self, name):
+        """
+        :return: {str} - what a write of the attribute requires, e.g. no-services, all-services or jvm
+        """
+        attribute = self.attributes.get(name)
+        return None if attribute is None else attribute['restart-required']
+
+    def read_only(self, name):
+        """
+        :return: {bool} - True if the attribute cannot be written, e.g. a metric or a value only set by add
+        """
+        attribute = self.attributes.get(name)
+        return attribute is not None and attribute['read-only']
+
+    def writable_attributes(self):
+        return [name for name, a in iteritems(self.attributes) if not a['read-only']]
+
+
+class MetadataIndex(object):
+    """
+    resource descriptions of one server release by top level resource, persisted in the jyboss home
+    """
+    _INSTANCES = {}
+
+    def __init__(self, release, cache_dir=None):
+        """
+        :param release: {str} - the release key of the server, see release_key
+        :param cache_dir: {str} - the directory to persist the index in, metadata in the jyboss home if not set
+        """
+        if cache_dir is None:
+            from jyboss.context import get_jyboss_home
+            cache_dir = os.path.join(get_jyboss_home(), DEFAULT_CACHE_DIR)
+        self.release = release
+        self.cache_file = os.path.join(cache_dir, '%s.json' % release)
+        self._roots = None
+        self._types = {}
+
+    @staticmethod
+    def instance(release):
+        """
+        :param release: {str} - the release key of the server
+        :return: {MetadataIndex} - the index of the release, shared by all connections of this process
+        """
+        index = MetadataIndex._INSTANCES.get(release)
+        if index is None:
+            index = MetadataIndex._INSTANCES[release] = MetadataIndex(release)
+        return index
+
+    @make_synchronized
+    def root_key(self, root):
+        """
+        :param root: {tuple(str, str)} - the type and name of a top level resource
+        :return: {str} - the key the description of the resource is stored under, None if it is not indexed
+        """
+        roots = self._load()
+        for key in ['/%s=%s' % root, '/%s=*' % root[0]]:
+            if key in roots and self.wildcard_allowed(key):
+                return key
+        return None
+
+    @staticmethod
+    def wildcard_allowed(key):
+        """
+        :param key: {str} - the path of a top level resource
+        :return: {bool} - False if the key is a wildcard for a type that is registered per name, e.g. /subsystem=*
+        """
+        root_type, name = key.lstrip('/').split('=', 1)
+        return name != '*' or root_type not in NAMED_ROOT_TYPES
+
+    @make_synchronized
+    def store(self, key, description):
+        """
+        Add the recursive description of a top level resource to the index and persist it.
+
+        :param key: {str} - the path of the top level resource, its name is * if the description is for any name
+        :param description: {dict} - the recursive resource description
+        """
+        if not self.wildcard_allowed(key):
+            raise ValueError('%s: %s does not describe all resources of its type' % (self.__class__.__name__, key))
+        self._load()[key] = description
+        self._types = dict((k, v) for k, v in iteritems(self._types) if k[0] != key)
+        self._save()
+
+    @make_synchronized
+    def resource_type(self, root_key, address):
+        """
+        :param root_key: {str} - the key of the top level resource of the address, see root_key
+        :param address: {tuple(tuple(str, str))} - the address of a resource
+        :return: {ResourceType} - the type of the resource, None if the description has no such resource
+        """
+        cache_key = (root_key, address[1:])
+        resource_type = self._types.get(cache_key)
+        if resource_type is None and cache_key not in self._types:
+            description = self._load().get(root_key)
+            for child_type, name in address[1:]:
+                if description is None:
+                    break
+                models = ((description.get('children') or {}).get(child_type) or {}).get('model-description') or {}
+                description = models.get(name) or models.get('*')
+            resource_type = None if description is None else ResourceType(description)
+            self._types[cache_key] = resource_type
+        return resource_type
+
+    def _load(self):
+        if self._roots is None:
+            self._roots = {}
+            if os.path.isfile(self.cache_file):
+                try:
+                    with open(self.cache_file) as f:
+                        self._roots = json.load(f)
+                except (IOError, ValueError) as e:
+                    warn('%s: ignoring unreadable metadata index %s: %s' % (self.__class__.__name__,
+                                                                           self.cache_file, e))
+        return self._roots
+
+    def _save(self):
+        cache_dir = os.path.dirname(self.cache_file)
+        tmp_file = '%s.%s' % (self.cache_file, uuid.uuid4().hex)
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            with open(tmp_file, 'w') as f:
+                json.dump(self._roots, f)
+            from jyboss.context import replace_file
+            replace_file(tmp_file, self.cache_file)
+            debug('%s: saved %d descriptions to %s' % (self.__class__.__name__, len(self._roots), self.cache_file))
+        except (IOError, OSError) as e:
+            # the index only saves time, a run must not fail because it cannot be written
+            warn('%s: failed to save metadata index %s: %s' % (self.__class__.__name__, self.cache_file, e))
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
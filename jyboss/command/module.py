@@ -1,8 +1,16 @@
 # Make coding more python3-ish
 from __future__ import (absolute_import, division, print_function)
 
-from jyboss.exceptions import ParameterError, CommandError
+import os
+import re
+import uuid
+import shutil
+from xml.sax.saxutils import escape
+
+from jyboss.exceptions import ParameterError
 from jyboss.command.core import BaseJBossModule
+from jyboss.content import ContentHashIndex
+from jyboss.context import replace_file
 from jyboss.logging import debug
 
 from java.io import File
@@ -20,8 +28,20 @@ else:
     def iteritems(d):
         return d.iteritems()
 
+DEFAULT_MODULE_BASE = 'system.layers.base'
+
+_RESOURCE_ROOT_MATCHER = re.compile(r'<resource-root\s+path="([^"]+)"')
+
+
+def _attr(value):
+    return escape('%s' % value, {'"': '&quot;'})
+
 
 class ModuleModule(BaseJBossModule):
+    """
+    installs modules into the module path of the jboss home, the module.xml is written and the resources are copied
+    directly instead of running the cli module command
+    """
     MODULE_PARAMS = [
         {'name': 'name', 'type': 'str'},
         {'name': 'property', 'type': 'property'},
@@ -44,54 +64,186 @@ class ModuleModule(BaseJBossModule):
                 raise ParameterError('The module state is not one of [present|absent]')
 
             if state == 'present':
-                args = ['%s add' % self.path]
-            elif state == 'absent':
-                args = ['%s remove' % self.path]
-
-            delim = mod.get('resource-delimiter', File.pathSeparatorChar)
-            module_base = mod.get('module-base', 'system.layers.base')
-
-            for k, v in mod.items():
-                if k in ['name']:
-                    args.append('--%s=%s.%s' % (k, module_base, v))
-                elif k in ['slot', 'main-class', 'module-xml']:
-                    args.append('--%s=%s' % (k, v))
-                elif k in ['resources']:
-                    if isinstance(v, list):
-                        args.append('--%s=%s' % (k, delim.join(v)))
-                    else:
-                        args.append('--%s=%s' % (k, v))
-                elif k in ['properties']:
-                    if isinstance(v, dict):
-                        args.append('--%s=%s' % (k, ','.join('%s=%s' % (name, value) for name, value in iteritems(v))))
-                    else:
-                        raise ParameterError('Format of %s parameter is invalid.' % k)
+                change = self.apply_present(mod)
+            else:
+                change = self.apply_absent(mod)
 
-            try:
-                cmd = ' '.join(args)
-                debug('module: execute command %s' % cmd)
-                self.cmd(cmd)
-                changes.append(
-                    {'module': self._get_param(mod, 'name'), 'action': 'add' if state == 'present' else 'delete'})
-            except CommandError as ce:
-                debug('module command error %r' % ce)
-                self.debug_errm(ce)
-                cause = getattr(ce, 'cause') if hasattr(ce, 'cause') else None
-                msg = getattr(cause, 'message') if cause is not None and hasattr(cause, 'message') else ''
-                if msg.find('already exists') != -1 or msg.find('Failed to locate module') != -1:
-                    # ignore as nothing to do
-                    debug('Ignoring module deploy error: %s' % msg)
-                else:
-                    raise ce
-            except Exception as coe:
-                debug('module other error %r' % coe)
-                self.debug_errm(coe)
-                raise coe
+            if change is not None:
+                changes.append(change)
 
         return changes if len(changes) > 0 else None
 
-    def debug_errm(self, err, level=0):
-        msg = err.message if 'message' in err and err['message'] is not None else ''
-        debug(msg.rjust(level + 1, '>'))
-        if 'cause' in err and err['cause'] is not None:
-            self.debug_errm(err.cause, level + 1)
+    def apply_present(self, mod):
+        name = self._get_param(mod, 'name')
+        slot = mod.get('slot', 'main')
+        module_dir = self.module_dir(mod.get('module-base', DEFAULT_MODULE_BASE), name, slot)
+
+        resources = self._resources(mod)
+        for resource in resources:
+            if not os.path.isfile(resource):
+                raise ParameterError('%s: module resource %s does not exist' % (self.__class__.__name__, resource))
+
+        module_xml = self.module_xml(mod, name, slot, resources)
+        current_xml = None
+        module_xml_path = os.path.join(module_dir, 'module.xml')
+        if os.path.isfile(module_xml_path):
+            with open(module_xml_path) as f:
+                current_xml = f.read()
+
+        # only resources whose content differs from the installed one are copied
+        copies = [r for r in resources if not self._same_content(r, os.path.join(module_dir, os.path.basename(r)))]
+        names = [os.path.basename(r) for r in resources]
+        stale = [] if current_xml is None else \
+            [p for p in _RESOURCE_ROOT_MATCHER.findall(current_xml) if p not in names and '/' not in p]
+
+        if current_xml == module_xml and len(copies) == 0 and len(stale) == 0:
+            debug('%s: module %s:%s is up to date' % (self.__class__.__name__, name, slot))
+            return None
+
+        change = {'module': name, 'action': 'add' if current_xml is None else 'update'}
+        if len(copies) > 0:
+            change['resources'] = [os.path.basename(r) for r in copies]
+        if len(stale) > 0:
+            change['removed'] = stale
+
+        self._run('install module %s:%s into %s' % (name, slot, module_dir),
+                  lambda: self.install(module_dir, module_xml, copies, stale), change)
+        return change
+
+    def apply_absent(self, mod):
+        name = self._get_param(mod, 'name')
+        slot = mod.get('slot', 'main')
+        module_base = mod.get('module-base', DEFAULT_MODULE_BASE)
+        module_dir = self.module_dir(module_base, name, slot)
+        if not os.path.isdir(module_dir):
+            return None
+
+        change = {'module': name, 'action': 'delete'}
+        self._run('remove module %s:%s from %s' % (name, slot, module_dir),
+                  lambda: self.uninstall(module_dir, self.module_dir(module_base)), change)
+        return change
+
+    def module_dir(self, module_base, name=None, slot=None):
+        """
+        :param module_base: {str} - the module layer, e.g. system.layers.base
+        :param name: {str} - the module name, the directory of the layer if not set
+        :param slot: {str} - the module slot
+        :return: {str} - the directory of a module in the module path of the jboss home
+        """
+        segments = [s for s in module_base.split('.') if s != '']
+        if name is not None:
+            segments += name.split('.')
+        if slot is not None:
+            segments.append(slot)
+        return os.path.join(self.context.get_jboss_home(), 'modules', *segments)
+
+    def module_xml(self, mod, name, slot, resources):
+        """
+        :return: {str} - the module.xml of a module instruction, the module-xml file if one is given
+        """
+        if mod.get('module-xml') is not None:
+            with open(mod['module-xml']) as f:
+                return f.read()
+
+        lines = ['<?xml version="1.0" ?>', '',
+                 '<module xmlns="urn:jboss:module:1.1" name="%s" slot="%s">' % (_attr(name), _attr(slot))]
+
+        properties = mod.get('properties')
+        if properties is not None:
+            if not isinstance(properties, dict):
+                raise ParameterError('Format of properties parameter is invalid.')
+            lines += ['', '    <properties>']
+            lines += ['        <property name="%s" value="%s"/>' % (_attr(k), _attr(v))
+                      for k, v in sorted(iteritems(properties))]
+            lines.append('    </properties>')
+
+        if mod.get('main-class') is not None:
+            lines += ['', '    <main-class name="%s"/>' % _attr(mod['main-class'])]
+
+        if len(resources) > 0:
+            lines += ['', '    <resources>']
+            lines += ['        <resource-root path="%s"/>' % _attr(os.path.basename(r)) for r in resources]
+            lines.append('    </resources>')
+
+        dependencies = mod.get('dependencies')
+        if dependencies is not None:
+            if not isinstance(dependencies, list):
+                dependencies = [d.strip() for d in dependencies.split(',')]
+            lines += ['', '    <dependencies>']
+            lines += ['        <module name="%s"/>' % _attr(d) for d in dependencies]
+            lines.append('    </dependencies>')
+
+        lines.append('</module>')
+        return '\n'.join(lines) + '\n'
+
+    def install(self, module_dir, module_xml, copies, stale):
+        """
+        Write a module into its directory, resources are hard linked if the file system allows it and copied if not.
+
+        :param module_dir: {str} - the module slot directory
+        :param module_xml: {str} - the content of the module.xml
+        :param copies: {list(str)} - the resources to link or copy into the module
+        :param stale: {list(str)} - resources of a previous version of the module to remove
+        """
+        if not os.path.isdir(module_dir):
+            os.makedirs(module_dir)
+
+        for resource in copies:
+            target = os.path.join(module_dir, os.path.basename(resource))
+            tmp_file = '%s.%s' % (target, uuid.uuid4().hex)
+            try:
+                os.link(resource, tmp_file)
+            except (AttributeError, OSError):
+                shutil.copy2(resource, tmp_file)
+            replace_file(tmp_file, target)
+            debug('%s: installed %s' % (self.__class__.__name__, target))
+
+        for path in stale:
+            if os.path.isfile(os.path.join(module_dir, path)):
+                os.remove(os.path.join(module_dir, path))
+
+        tmp_file = os.path.join(module_dir, 'module.xml.%s' % uuid.uuid4().hex)
+        with open(tmp_file, 'w') as f:
+            f.write(module_xml)
+        replace_file(tmp_file, os.path.join(module_dir, 'module.xml'))
+
+    @staticmethod
+    def uninstall(module_dir, layer_dir):
+        """
+        Remove a module slot directory and the module directories that are left empty.
+
+        :param module_dir: {str} - the module slot directory
+        :param layer_dir: {str} - the directory of the module layer, it is never removed
+        """
+        shutil.rmtree(module_dir)
+        parent = os.path.dirname(module_dir)
+        while parent != layer_dir and parent.startswith(layer_dir) and len(os.listdir(parent)) == 0:
+            os.rmdir(parent)
+            parent = os.path.dirname(parent)
+
+    def _run(self, description, action, change):
+        plan = self.context.plan
+        if plan is not None:
+            plan.record_action(description, action, change)
+        else:
+            action()
+
+    @staticmethod
+    def _resources(mod):
+        resources = mod.get('resources')
+        if resources is None:
+            return []
+        if not isinstance(resources, list):
+            resources = resources.split(mod.get('resource-delimiter', File.pathSeparatorChar))
+        return resources
+
+    @staticmethod
+    def _same_content(resource, installed):
+        if not os.path.isfile(installed):
+            return False
+        if os.path.getsize(resource) != os.path.getsize(installed):
+            return False
+        if os.path.samefile(resource, installed):
+            return True
+        index = ContentHashIndex.instance()
+        return index.hash(resource) == index.hash(installed)
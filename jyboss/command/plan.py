@@ -0,0 +1,501 @@
+"""
+Planning of module instructions. The modules are run against a snapshot of the management model that is read up front
+in a single composite operation. Write operations are recorded in a plan and applied to the snapshot instead of the
+server, so reads that follow a planned write see its effect. The plan can be reported (check mode) or submitted to the
+server in composite batches.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from jyboss.exceptions import CommandError
+from jyboss.logging import debug
+from jyboss.command.core import CommandHandler, ModelCache, dmr_address, address_to_path, convert_dmr_to_python
+
+__metaclass__ = type
+
+DEFAULT_BATCH_SIZE = 100
+
+# parameters of an add operation that are not attributes of the added resource
+_OPERATION_PARAMETERS = ['operation', 'address', 'operation-headers', 'add-index']
+
+# operations that cannot be a step of a composite operation
+_STANDALONE_OPERATIONS = ['reload', 'shutdown', 'composite']
+
+_READ_OPERATIONS = ['read-resource', 'read-attribute', 'read-children-names', 'read-children-resources']
+
+
+class _PlanFailure(Exception):
+    pass
+
+
+def _not_found(address):
+    return _PlanFailure("WFLYCTL0216: Management resource '%s' not found" % address_to_path(address))
+
+
+class PlannedOperation(object):
+    """
+    a write operation recorded by a plan
+    """
+
+    def __init__(self, cmd, request=None, change=None, action=None):
+        """
+        :param cmd: {str} - the cli command, or the description of a local action
+        :param request: {ModelNode} - the parsed request, None for cli commands that are not management operations
+        :param change: {dict} - the change record of the module that queued the operation
+        :param action: {callable} - a local action to run instead of a cli command, e.g. writing module files
+        """
+        self.cmd = cmd
+        self.request = request
+        self.change = change
+        self.action = action
+
+    def is_composable(self):
+        return self.action is None and self.request is not None and \
+               self.request.get('operation').asString() not in _STANDALONE_OPERATIONS
+
+    def root(self):
+        address = dmr_address(self.request) if self.request is not None else ()
+        return address[0] if len(address) > 0 else None
+
+
+class Plan(object):
+    """
+    the write operations module instructions would execute, computed against a snapshot of the management model
+    """
+
+    def __init__(self, cli):
+        """
+        :param cli: {Cli} - the connected cli used to parse the commands and to read the snapshot
+        """
+        self.cli = cli
+        self.model = ModelCache()
+        self.operations = []
+        self._before = {}
+        self._complete_types = set()
+
+    def prefetch(self, paths):
+        """
+        Read the top level resources of the given resource paths in a single composite operation. A path whose top
+        level name is a format placeholder or missing reads all resources of the type.
+
+        :param paths: {list(str)} - absolute resource paths, e.g. /subsystem=datasources or /interface=%s
+        """
+        cmds = []
+        for path in paths:
+            if path is None or not path.startswith('/'):
+                continue
+            segment = path[1:].split('/')[0]
+            child_type, _, name = segment.partition('=')
+            if child_type == '':
+                continue
+            if name == '' or '%' in name or '{' in name or name == '*':
+                if child_type in self._complete_types:
+                    continue
+                cmd = '/%s=*:read-resource(recursive=true)' % child_type
+            elif (child_type, name) in self.model:
+                continue
+            else:
+                cmd = '/%s=%s:read-resource(recursive=true)' % (child_type, name)
+            if cmd not in cmds:
+                cmds.append(cmd)
+
+        if len(cmds) == 0:
+            return
+
+        debug('%s.prefetch: read %d resources' % (self.__class__.__name__, len(cmds)))
+        response = self.cli.cmd_composite(cmds).getResponse()
+        steps = response.get('result')
+        for i, cmd in enumerate(cmds):
+            step_key = 'step-%d' % (i + 1)
+            if not steps.isDefined() or not steps.has(step_key):
+                continue
+            self._store_read(cmd, steps.get(step_key))
+
+    def _store_read(self, cmd, step):
+        request = self.cli.build_request(cmd)
+        address = dmr_address(request)
+        if step.get('outcome').asString() != 'success':
+            errm = step.get('failure-description').asString() if step.has('failure-description') else ''
+            if errm.find('WFLYCTL0216') != -1 and address[0][1] != '*':
+                self._store(address[0], None)
+            # anything else is read when the modules need it
+            return
+        if address[0][1] != '*':
+            self._store(address[0], step.get('result'))
+            return
+        for item in step.get('result').asList():
+            root = dmr_address(item)[0]
+            # resources read before may already carry planned writes
+            if item.get('outcome').asString() == 'success' and root not in self.model:
+                self._store(root, item.get('result'))
+        self._complete_types.add(address[0][0])
+
+    def _store(self, root, node):
+        self.model.store(root, node)
+        self._before[root] = None if node is None else node.clone()
+
+    def _load(self, root):
+        if root in self.model:
+            return
+        if root[0] in self._complete_types:
+            self._store(root, None)
+            return
+        result = self.cli.cmd('%s:read-resource(recursive=true)' % address_to_path([root]))
+        if result.isSuccess():
+            self._store(root, result.getResponse().get('result'))
+        else:
+            self._store(root, None)
+
+    def _node(self, address):
+        """
+        :return: {ModelNode} - the node of the resource in the snapshot, None if it does not exist
+        """
+        self._load(address[0])
+        node = self.model.snapshot(address[0])
+        for t, n in address[1:]:
+            if node is None:
+                return None
+            if node.has(t) and node.get(t).isDefined() and node.get(t).has(n) and node.get(t).get(n).isDefined():
+                node = node.get(t).get(n)
+            else:
+                node = None
+        return node
+
+    def _require(self, address):
+        node = self._node(address)
+        if node is None:
+            raise _not_found(address)
+        return node
+
+    def execute(self, cli, cmd, change=None):
+        """
+        Plan a cli command, reads are served from the snapshot and writes are recorded and applied to the snapshot.
+
+        :param cli: {Cli} - the connected cli
+        :param cmd: {str} - the cli command
+        :param change: {dict} - the change record of the module that queued the operation
+        :return: {Result} - the simulated result
+        """
+        # noinspection PyUnresolvedReferences
+        from jyboss.cli import Result
+
+        command = cmd.strip()
+        if command == 'ls' or command.startswith('ls '):
+            return Result(cmd, response=self._ls(command[2:].strip()))
+        elif command == 'cd' or command.startswith('cd '):
+            return cli.cmd(cmd)
+
+        try:
+            request = cli.build_request(cmd)
+        except CommandError:
+            # a cli command that is not a management operation, e.g. module add, cannot be simulated
+            debug('%s.execute: plan cli command %s' % (self.__class__.__name__, cmd))
+            self.operations.append(PlannedOperation(cmd, change=change))
+            return Result(cmd, exit_code=0)
+
+        operation = request.get('operation').asString()
+        address = dmr_address(request)
+        if len(address) == 0 and operation not in _STANDALONE_OPERATIONS:
+            # the root resource is not part of the snapshot
+            if operation.startswith('read-') or operation in ModelCache.READ_OPERATIONS:
+                return cli.cmd(cmd)
+        elif operation.startswith('read-') or operation in ModelCache.READ_OPERATIONS:
+            if operation not in _READ_OPERATIONS:
+                return cli.cmd(cmd)
+            try:
+                return Result(cmd, request=request, response=self._success(self._read(operation, address, request)))
+            except _PlanFailure as pf:
+                return Result(cmd, request=request, response=self._failure(pf.args[0]))
+
+        try:
+            self._write(operation, address, request)
+        except _PlanFailure as pf:
+            return Result(cmd, request=request, response=self._failure(pf.args[0]))
+        debug('%s.execute: plan %s' % (self.__class__.__name__, cmd))
+        self.operations.append(PlannedOperation(cmd, request, change))
+        return Result(cmd, request=request, response=self._success())
+
+    @staticmethod
+    def _success(result=None):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        response = ModelNode()
+        response.get('outcome').set('success')
+        if result is not None:
+            response.get('result').set(result)
+        return response
+
+    @staticmethod
+    def _failure(message):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        response = ModelNode()
+        response.get('outcome').set('failed')
+        response.get('failure-description').set(message)
+        response.get('rolled-back').set(True)
+        return response
+
+    def _read(self, operation, address, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        if '*' in [n for _, n in address]:
+            return self._read_wildcard(operation, address, request)
+        node = self._require(address)
+        if operation == 'read-resource':
+            return node.clone()
+        elif operation == 'read-attribute':
+            name = request.get('name').asString()
+            if not node.has(name):
+                raise _PlanFailure("WFLYCTL0201: Unknown attribute '%s'" % name)
+            return node.get(name).clone()
+
+        child_type = request.get('child-type').asString()
+        children = node.get(child_type) if node.has(child_type) and node.get(child_type).isDefined() else None
+        result = ModelNode()
+        if operation == 'read-children-names':
+            result.setEmptyList()
+            if children is not None:
+                for name in children.keys():
+                    result.add(name)
+        else:
+            result.setEmptyObject()
+            if children is not None:
+                for name in children.keys():
+                    result.get(name).set(children.get(name).clone())
+        return result
+
+    def _read_wildcard(self, operation, address, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        child_type, name = address[0]
+        if name != '*' or '*' in [n for _, n in address[1:]]:
+            raise _PlanFailure('%s: only wildcard reads of top level resources can be planned' %
+                               address_to_path(address))
+        self.prefetch(['/%s=*' % child_type])
+        result = ModelNode()
+        result.setEmptyList()
+        for root in self.model.roots():
+            if root[0] != child_type or self.model.snapshot(root) is None:
+                continue
+            resource_address = (root,) + tuple(address[1:])
+            try:
+                value = self._read(operation, resource_address, request)
+            except _PlanFailure:
+                continue
+            item = ModelNode()
+            for t, n in resource_address:
+                item.get('address').add(t, n)
+            item.get('outcome').set('success')
+            item.get('result').set(value)
+            result.add(item)
+        return result
+
+    def _write(self, operation, address, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        if operation in _STANDALONE_OPERATIONS or len(address) == 0:
+            return
+        elif operation == 'add':
+            if self._node(address) is not None:
+                raise _PlanFailure("WFLYCTL0212: Duplicate resource %s" % address_to_path(address))
+            node = ModelNode()
+            node.setEmptyObject()
+            for key in request.keys():
+                if key not in _OPERATION_PARAMETERS:
+                    node.get(key).set(request.get(key))
+            if len(address) == 1:
+                self.model.store(address[0], node)
+                self._before.setdefault(address[0], None)
+            else:
+                parent = self._require(address[:-1])
+                child_type, name = address[-1]
+                parent.get(child_type).get(name).set(node)
+            return
+        elif operation == 'remove':
+            self._require(address)
+            if len(address) == 1:
+                self.model.store(address[0], None)
+            else:
+                child_type, name = address[-1]
+                children = self._node(address[:-1]).get(child_type)
+                children.remove(name)
+                if len(children.keys()) == 0:
+                    children.set(ModelNode())
+            return
+
+        node = self._require(address)
+        name = request.get('name').asString() if request.has('name') else None
+        if operation == 'write-attribute':
+            node.get(name).set(request.get('value') if request.has('value') else ModelNode())
+        elif operation == 'undefine-attribute':
+            node.get(name).set(ModelNode())
+        elif operation == 'list-add':
+            values = node.get(name)
+            if not values.isDefined():
+                values.setEmptyList()
+            if request.has('index') and request.get('index').isDefined():
+                values.insert(request.get('value'), request.get('index').asInt())
+            else:
+                values.add(request.get('value'))
+        elif operation in ['list-remove', 'list-clear']:
+            values = ModelNode()
+            values.setEmptyList()
+            if operation == 'list-remove' and node.get(name).isDefined():
+                index = request.get('index').asInt() if request.has('index') else None
+                for i, value in enumerate(node.get(name).asList()):
+                    if i != index and (index is not None or not value.equals(request.get('value'))):
+                        values.add(value)
+            node.get(name).set(values)
+        elif operation == 'map-put':
+            node.get(name).get(request.get('key').asString()).set(request.get('value'))
+        elif operation == 'map-remove':
+            if node.get(name).isDefined() and node.get(name).has(request.get('key').asString()):
+                node.get(name).remove(request.get('key').asString())
+        elif operation == 'map-clear':
+            node.get(name).setEmptyObject()
+        elif operation in ['deploy', 'undeploy']:
+            node.get('enabled').set(operation == 'deploy')
+        else:
+            debug('%s: %s is planned without changing the snapshot' % (self.__class__.__name__, operation))
+
+    def _ls(self, path):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        head, _, child_type = path.rstrip('/').rpartition('/')
+        try:
+            if child_type != '' and '=' not in child_type and child_type not in ['.', '..']:
+                request = self.cli.build_request('%s:read-children-names(child-type=%s)' % (head, child_type))
+                return self._success(self._read('read-children-names', dmr_address(request), request))
+
+            request = self.cli.build_request('%s:read-resource' % path)
+            if len(dmr_address(request)) == 0:
+                return self.cli.cmd('ls %s' % path).getResponse()
+            resource = self._read('read-resource', dmr_address(request), request)
+        except _PlanFailure as pf:
+            return self._failure(pf.args[0])
+
+        types = ModelNode()
+        types.setEmptyList()
+        attributes = ModelNode()
+        attributes.setEmptyObject()
+        for key in resource.keys():
+            if resource.get(key).getType() == resource.get(key).getType().OBJECT:
+                types.add(key)
+            else:
+                attributes.get(key).set(resource.get(key))
+        response = self._success()
+        response.get('result').get('step-1').get('result').set(types)
+        response.get('result').get('step-2').get('result').set(attributes)
+        return response
+
+    def record_action(self, description, action, change=None):
+        """
+        Record a local action that does not go through the cli, it is run in order with the planned operations.
+
+        :param description: {str} - describes the action in the plan commands
+        :param action: {callable} - the action, called without arguments
+        :param change: {dict} - the change record of the module that planned the action
+        """
+        debug('%s.record_action: plan %s' % (self.__class__.__name__, description))
+        self.operations.append(PlannedOperation(description, change=change, action=action))
+
+    def commands(self):
+        """
+        :return: {list(str)} - the cli commands of the planned write operations in execution order
+        """
+        return [op.cmd for op in self.operations]
+
+    def diff(self):
+        """
+        The before and after state of the top level resources the plan modifies, in the ansible diff format.
+
+        :return: {list(dict)} - one diff per modified top level resource
+        """
+        diffs = []
+        roots = []
+        for op in self.operations:
+            root = op.root()
+            if root is not None and root not in roots:
+                roots.append(root)
+        for root in roots:
+            path = address_to_path([root])
+            after = self.model.snapshot(root)
+            diffs.append({
+                'before_header': path,
+                'after_header': path,
+                'before': self._dump(self._before.get(root)),
+                'after': self._dump(after)
+            })
+        return diffs
+
+    @staticmethod
+    def _dump(node):
+        if node is None:
+            return ''
+        return json.dumps(convert_dmr_to_python(node), indent=4, sort_keys=True) + '\n'
+
+
+class Planner(object):
+    """
+    computes the plan of module instructions and optionally submits it to the server in composite batches
+    """
+
+    def __init__(self, context, change_processor):
+        """
+        :param context: {JyBossContext} - a connected context
+        :param change_processor: {ChangeObservable} - the processor with the modules registered
+        """
+        self.context = context
+        self.change_processor = change_processor
+        self.handler = CommandHandler(context)
+
+    def plan(self, instructions):
+        """
+        Run the modules against a snapshot of the management model without changing the server.
+
+        :param instructions: {dict} - the module instructions
+        :return: {tuple(dict, Plan)} - the change set the modules reported and the plan
+        """
+        if self.context.plan is not None:
+            raise CommandError('a plan is already being computed on this context')
+
+        plan = Plan(self.handler._cli())
+        plan.prefetch([getattr(o, 'path', None) for o in self.change_processor.observers_for(instructions)])
+
+        self.context.plan = plan
+        try:
+            changeset = self.change_processor.process_instructions(instructions)
+        finally:
+            self.context.plan = None
+        debug('%s.plan: %d operations planned' % (self.__class__.__name__, len(plan.operations)))
+        return changeset, plan
+
+    def execute(self, plan, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Submit the planned operations in order, consecutive operations are submitted as composite operations of up
+        to batch_size steps.
+
+        :param plan: {Plan} - the plan to execute
+        :param batch_size: {int} - the maximum number of steps of a composite operation
+        """
+        batch = []
+        for op in plan.operations:
+            if op.is_composable():
+                batch.append((op.cmd, op.change))
+                if len(batch) >= batch_size:
+                    self.handler.flush(batch)
+                    batch = []
+                continue
+            self.handler.flush(batch)
+            batch = []
+            if op.action is not None:
+                op.action()
+            else:
+                self.handler.cmd(op.cmd)
+        self.handler.flush(batch)
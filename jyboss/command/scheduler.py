@@ -0,0 +1,184 @@
+"""
+Reload of a server and the wait until it runs again. The writes of a run only mark the server as reload-required (from
+the process-state and operation-requires-reload response headers, see CommandHandler._track_process_state). While a
+run defers reloads, e.g. a run of jyboss.runner, a reload that is only required by these writes is requested and done
+once all instructions are processed, so however many writes need it the server is reloaded once at the end. An
+explicit reload is done right away. The scheduler polls the controller with a growing delay until the server runs
+again and reports how long it was down.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import time
+
+from jyboss.context import MODE_EMBEDDED, MODE_OFFLINE
+from jyboss.exceptions import OperationError
+from jyboss.logging import debug, warn
+
+__metaclass__ = type
+
+# seconds to wait for a reloaded server to run again
+DEFAULT_TIMEOUT = 300
+
+# reload modes of a run: always reload or only if a write left the server in reload-required state
+RELOAD_ALWAYS = 'always'
+RELOAD_REQUIRED = 'required'
+
+# server states of a server that is not reloading, a lost connection reads as None
+_SETTLED_STATES = ['running', 'reload-required', 'restart-required']
+
+
+class ReloadScheduler(object):
+    """
+    defers and coalesces the reloads of the current connection of a context
+    """
+
+    def __init__(self, context, timeout=DEFAULT_TIMEOUT, initial_delay=0.25, max_delay=5.0):
+        """
+        :param context: {JyBossContext} - the context of the connection to reload
+        :param timeout: {float} - seconds to wait for the reloaded server to run again
+        :param initial_delay: {float} - seconds before the controller is polled the first time
+        :param max_delay: {float} - the delay between polls doubles up to this many seconds
+        """
+        self.context = context
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+
+    def defer(self):
+        """
+        Defer the reloads required by the writes of a run until run() or cancel() is called at its end.
+        """
+        if self.context.connection is not None:
+            self.context.connection.reload_deferred = True
+
+    def deferred(self):
+        """
+        :return: {bool} - True if a run defers the reloads of the connection
+        """
+        return self.context.connection is not None and self.context.connection.reload_deferred
+
+    def request(self, mode=RELOAD_ALWAYS):
+        """
+        Request a reload at the end of the run.
+
+        :param mode: {str} - always or required, an always request is not weakened by a later required request
+        """
+        connection = self.context.connection
+        if connection is not None and connection.reload_requested != RELOAD_ALWAYS:
+            connection.reload_requested = mode
+
+    def cancel(self):
+        """
+        Drop the requested reload, e.g. in check mode where nothing was written.
+        """
+        if self.context.connection is not None:
+            self.context.connection.reload_requested = None
+            self.context.connection.reload_deferred = False
+
+    def run(self):
+        """
+        End the deferral of a run and reload the server if a reload was requested.
+
+        :return: {dict} - the reload report, see reload(), None if no reload was requested
+        """
+        connection = self.context.connection
+        if connection is None:
+            return None
+        connection.reload_deferred = False
+        if connection.reload_requested is None:
+            return None
+
+        mode = connection.reload_requested
+        connection.reload_requested = None
+        return self.reload(mode)
+
+    def reload(self, mode=RELOAD_ALWAYS):
+        """
+        Reload the server right away and wait until it runs again.
+
+        :param mode: {str} - always, or required to only reload if a write left the server in reload-required state
+        :return: {dict} - whether the server was reloaded, the seconds it was down, the number of polls and the
+                 process state of the server afterwards
+        """
+        connection = self.context.connection
+        report = {'reloaded': False, 'process_state': connection.process_state}
+
+        if mode == RELOAD_REQUIRED and connection.process_state != 'reload-required':
+            if connection.process_state == 'restart-required':
+                warn('%s: the server has to be restarted, a reload is not enough' % self.__class__.__name__)
+            return report
+
+        if connection.get_mode() == MODE_OFFLINE:
+            debug('%s: a reload has no effect in offline mode' % self.__class__.__name__)
+            return report
+
+        jcli = connection.jcli
+        start = time.time()
+        if connection.get_mode() == MODE_EMBEDDED:
+            # the embedded cli waits for the server itself, which must stay in admin only mode
+            jcli.reload(admin_only=True)
+            polls = 0
+            state = 'running'
+        else:
+            result = jcli.cmd(':reload')
+            if not result.isSuccess():
+                report['msg'] = 'reload failed: %s' % result.getResponse()
+                return report
+            polls, state = self._wait(jcli, start)
+        downtime = time.time() - start
+
+        # nothing read before the reload is valid any more
+        connection.model_cache = None
+        connection.process_state = None if state == 'running' else state
+        debug('%s: server reloaded in %.3fs after %d polls' % (self.__class__.__name__, downtime, polls))
+
+        report.update({
+            'reloaded': True,
+            'downtime_seconds': round(downtime, 3),
+            'polls': polls,
+            'process_state': connection.process_state
+        })
+        return report
+
+    def _wait(self, jcli, start):
+        """
+        Poll the controller until the reloaded server runs again. Like the reload command of the jboss cli it first
+        waits for the reload to begin, the controller keeps answering with the state from before the reload until
+        it closes the connection.
+
+        :param jcli: {Cli} - the cli of the connection
+        :param start: {float} - the time the reload was issued
+        :return: {tuple(int, str)} - the number of polls and the server state
+        """
+        delay = self.initial_delay
+        polls = 0
+        stopped = False
+        while True:
+            time.sleep(delay)
+            polls += 1
+            state = self._server_state(jcli)
+            if not stopped:
+                stopped = state not in _SETTLED_STATES
+            elif state in ['running', 'restart-required']:
+                # a reload does not bring a server out of restart-required
+                return polls, state
+            if time.time() - start > self.timeout:
+                raise OperationError('%s: server did not run again within %ds of the reload, last state %s' % (
+                    self.__class__.__name__, self.timeout, state))
+            delay = min(delay * 2, self.max_delay)
+
+    def _server_state(self, jcli):
+        try:
+            result = jcli.cmd(':read-attribute(name=server-state)')
+            if result.isSuccess():
+                return result.getResponse().get('result').asString()
+        except Exception as e:
+            # the controller closes the connection while it reloads
+            debug('%s: controller not available: %s' % (self.__class__.__name__, getattr(e, 'message', e)))
+            try:
+                jcli.reconnect()
+            except Exception as e:
+                debug('%s: reconnect failed: %s' % (self.__class__.__name__, getattr(e, 'message', e)))
+        return None
@@ -0,0 +1,469 @@
+"""
+Structural diff of a resource tree. A module declares the shape of the resources it manages as a ResourceSchema, the
+diff walks the desired document and the recursive read of the resource side by side once and produces the operations
+that bring the resource in line: removes of child resources first within a resource, then attribute writes, then adds
+of child resources, a new resource is added before its children.
+
+The desired document of a resource is a dict of attributes and child types. A child type maps either child names to
+child documents or is a list of child documents carrying their name in the key of the schema, e.g.
+
+    {
+        'enabled': True,
+        'xa-datasource-properties': {'URL': 'jdbc:h2:mem:test'}
+    }
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import hashlib
+import collections
+
+from jyboss.exceptions import ParameterError
+from jyboss.command.core import clean_python_value, convert_to_dmr_params, convert_type
+from jyboss.logging import debug
+
+__metaclass__ = type
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+try:
+    # Python 2
+    unicode
+except NameError:
+    # Python 3
+    unicode = str
+    basestring = str
+    long = int
+
+try:
+    dict.iteritems
+except AttributeError:
+    # Python 3
+    def iteritems(d):
+        return d.items()
+else:
+    # Python 2
+    def iteritems(d):
+        return d.iteritems()
+
+# the python types of the dmr attribute types of a resource description
+_DMR_TYPES = {
+    'BOOLEAN': bool,
+    'INT': int,
+    'LONG': long,
+    'DOUBLE': float,
+    'BIG_DECIMAL': float,
+    'BIG_INTEGER': long,
+    'STRING': unicode
+}
+
+# keys of a desired document that select the resource rather than describe it
+_SELECTORS = ['name', 'state']
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return dict((unicode(k), _canonical(v)) for k, v in iteritems(value))
+    elif isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    elif isinstance(value, bool):
+        return unicode(value).lower()
+    elif value is None:
+        return None
+    else:
+        return unicode(value)
+
+
+def digest(value):
+    """
+    A digest of a python value that does not depend on the key order of dicts or whether a scalar is a string, so a
+    value read from the server compares equal to the same value in a desired document.
+
+    :param value: {object} - the value
+    :return: {str} - the hex digest of the value
+    """
+    return hashlib.sha1(json.dumps(_canonical(value), sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _digest_key(value):
+    """
+    :return: {object} - a hashable key of a value that compares like its digest, scalars are not hashed
+    """
+    if isinstance(value, (list, tuple, dict)):
+        return digest(value)
+    return _canonical(value)
+
+
+def same_value(old_value, new_value):
+    """
+    :return: {bool} - True if the values are equal, lists are compared without regard to the order of their items
+    """
+    if isinstance(old_value, list) and isinstance(new_value, list):
+        return collections.Counter(digest(v) for v in old_value) == collections.Counter(digest(v) for v in new_value)
+    elif isinstance(old_value, (list, dict)) or isinstance(new_value, (list, dict)):
+        return digest(old_value) == digest(new_value)
+    else:
+        return old_value == new_value
+
+
+def _description_type(description):
+    dmr_type = description.get('type') if description is not None else None
+    if isinstance(dmr_type, dict):
+        dmr_type = dmr_type.get('TYPE_MODEL_VALUE')
+    return _DMR_TYPES.get(dmr_type)
+
+
+def coerce_value(value, old_value=None, description=None):
+    """
+    Coerce a value of a desired document to the type of the attribute it is compared with.
+
+    :param value: {object} - the desired value
+    :param old_value: {object} - the current value of the attribute
+    :param description: {dict} - the description of the attribute, used when the attribute is not set
+    :return: {object} - the coerced value
+    """
+    value = clean_python_value(value)
+    if value is None or isinstance(value, (list, dict)):
+        return value
+
+    if old_value is not None and not isinstance(old_value, (list, dict)):
+        hint = type(old_value)
+    else:
+        hint = _description_type(description)
+
+    if hint is None or isinstance(value, hint):
+        return value
+    elif isinstance(value, basestring) and '${' in value:
+        # an expression is resolved by the server
+        return value
+    elif hint is bool and isinstance(value, basestring):
+        return value.lower() == 'true'
+    try:
+        return hint(value)
+    except ValueError:
+        return value
+
+
+class ResourceSchema(object):
+    """
+    the attributes and child resources of a resource that a module manages
+    """
+
+    def __init__(self, attributes=None, immutable=None, children=None, value=None, recreate=False, prune=False,
+                 key='name'):
+        """
+        :param attributes: {list(str)} - the attributes that can be set, all read-write attributes of the resource
+                           description if not set
+        :param immutable: {list(str)} - the attributes that can only be set when the resource is added
+        :param children: {dict(str, ResourceSchema)} - the schema of each child type, all child types of the resource
+                         description with a default schema if not set
+        :param value: {str} - the single attribute of a child that is given as a plain value in the document of its
+                      parent, e.g. the value of a property, a child given as None is removed
+        :param recreate: {bool} - the resource cannot be updated and is removed and added again when it differs
+        :param prune: {bool} - remove children of this type that are not in the desired document of the parent
+        :param key: {str} - the key of a child document that holds its name if the children are given as a list
+        """
+        if value is not None:
+            # a plain value child has nothing but its value
+            attributes = [value] if attributes is None else attributes
+            children = {} if children is None else children
+        self.attributes = attributes
+        self.immutable = [] if immutable is None else immutable
+        self.children = children
+        self.value = value
+        self.recreate = recreate
+        self.prune = prune
+        self.key = key
+
+    def needs_description(self):
+        """
+        :return: {bool} - True if the schema relies on the resource description for attributes or child types
+        """
+        if self.attributes is None or self.children is None:
+            return True
+        return any(child.needs_description() for child in self.children.values())
+
+
+class TreeDiff(object):
+    """
+    compares a desired document with the recursive read of a resource
+    """
+
+    def __init__(self, description=None):
+        """
+        :param description: {dict} - the recursive resource description of the resource, needed for schemas that do
+                            not declare their attributes and child types, otherwise it leaves out the declared
+                            attributes the server does not have and keeps read-only attributes from being written
+        """
+        self.description = description
+        # whether the subtree of each existing child resource matches its desired document, keyed by path
+        self._unchanged = {}
+
+    def diff(self, path, schema, target_state, current):
+        """
+        Compute the operations that bring a resource in line with its desired document.
+
+        :param path: {str} - the path of the resource
+        :param schema: {ResourceSchema} - the schema of the resource
+        :param target_state: {dict} - the desired document of the resource
+        :param current: {dict} - the recursive read of the resource as python value, None if it does not exist
+        :return: {tuple(list(tuple(str, dict)), dict)} - the cli operations with their change records and the change
+                 of the resource, None if the resource is in sync
+        """
+        operations = []
+        self._unchanged = {}
+        if current is not None:
+            desired_digest, current_digest = self._digests(path, schema, target_state, current, self.description)
+            if desired_digest == current_digest:
+                return operations, None
+        change = self._diff(operations, path, schema, target_state, current, self.description)
+        return operations, change
+
+    def _digests(self, path, schema, target_state, current, description):
+        """
+        Compute the digest of a desired document and of the part of the current resource it describes bottom up in
+        one pass, the digest of a resource is the hash of its attribute values and of the digests of its children.
+        The diff does not descend into the children whose digests match, so an unchanged subtree is visited once
+        however deep it is.
+
+        Values that are equal as text have the same digest, e.g. 3 and '3' or True and 'true'. A value that only
+        compares equal once it is coerced to the type of the attribute, e.g. 'True', makes the digests differ and the
+        subtree is diffed.
+
+        :return: {tuple(int, int)} - the digest of the desired document and of the current resource
+        """
+        attributes, children = self._split(path, schema, target_state, description)
+        desired = [(name, _digest_key(value)) for name, value in iteritems(attributes)]
+        found = [(name, _digest_key(current.get(name))) for name in attributes]
+
+        for child_type, (child_schema, child_docs) in iteritems(children):
+            existing = current.get(child_type) or {}
+            for child_name, child_doc in child_docs:
+                key = '%s=%s' % (child_type, child_name)
+                if self._is_absent(child_schema, child_doc):
+                    if child_name in existing:
+                        found.append((key, None))
+                    continue
+                if child_name not in existing:
+                    desired.append((key, None))
+                    continue
+
+                child_path = '%s/%s' % (path, key)
+                child_desired, child_found = self._digests(
+                    child_path, child_schema, self._as_document(child_schema, child_doc),
+                    existing.get(child_name) or {}, self._child_description(description, child_type, child_name))
+                self._unchanged[child_path] = child_desired == child_found
+                desired.append((key, child_desired))
+                found.append((key, child_found))
+
+            if child_schema.prune:
+                wanted = set(name for name, _ in child_docs)
+                found += [('%s=%s' % (child_type, name), None) for name in existing if name not in wanted]
+
+        return hash(tuple(sorted(desired))), hash(tuple(sorted(found)))
+
+    def _diff(self, operations, path, schema, target_state, current, description):
+        attributes, children = self._split(path, schema, target_state, description)
+
+        if current is None:
+            return self._add(operations, path, schema, attributes, children, description)
+
+        attribute_changes = self._diff_attributes(path, schema, attributes, current, description)
+        if len(attribute_changes) > 0 and schema.recreate:
+            # the resource is replaced including its children, they are added again from the desired document
+            operations.append(('%s:remove()' % path, None))
+            change = self._add(operations, path, schema, attributes, children, description)
+            change['action'] = 'update'
+            change['changes'] = [c for _, c in attribute_changes]
+            return change
+
+        change = {'action': None, 'changes': []}
+        removes = []
+        writes = [(cmd, c) for cmd, c in attribute_changes]
+        change['changes'] += [c for _, c in attribute_changes]
+        child_operations = []
+
+        for child_type, (child_schema, child_docs) in iteritems(children):
+            existing = current.get(child_type) or {}
+            for child_name, child_doc in child_docs:
+                child_path = '%s/%s=%s' % (path, child_type, child_name)
+                child_description = self._child_description(description, child_type, child_name)
+                child_current = existing.get(child_name) if child_name in existing else None
+                if child_current is None and child_name in existing:
+                    # listed by a non recursive read, the child exists without known attributes
+                    child_current = {}
+
+                if self._is_absent(child_schema, child_doc):
+                    if child_name in existing:
+                        record = self._child_record(child_schema, child_type, child_name, 'delete', child_current)
+                        removes.append(('%s:remove()' % child_path, record))
+                        change['changes'].append(record)
+                    continue
+                elif self._unchanged.get(child_path):
+                    continue
+
+                child_change = self._diff(child_operations, child_path, child_schema,
+                                          self._as_document(child_schema, child_doc), child_current, child_description)
+                if child_change is not None:
+                    change['changes'].append(self._child_change(child_schema, child_type, child_name, child_change,
+                                                                child_current, child_doc))
+
+            if child_schema.prune:
+                wanted = set(name for name, _ in child_docs)
+                for child_name in existing:
+                    if child_name not in wanted:
+                        record = self._child_record(child_schema, child_type, child_name, 'delete',
+                                                    existing.get(child_name))
+                        removes.append(('%s/%s=%s:remove()' % (path, child_type, child_name), record))
+                        change['changes'].append(record)
+
+        operations += removes + writes + child_operations
+
+        if len(change['changes']) == 0:
+            return None
+        change['action'] = 'update'
+        return change
+
+    def _add(self, operations, path, schema, attributes, children, description):
+        params = dict((k, v) for k, v in iteritems(attributes) if v is not None)
+        dmr_params = convert_to_dmr_params(params, list(params.keys()))
+        change = {'action': 'add', 'changes': []}
+        if len(dmr_params) > 0:
+            change['params'] = dmr_params
+        operations.append(('%s:add(%s)' % (path, dmr_params), change))
+
+        for child_type, (child_schema, child_docs) in iteritems(children):
+            for child_name, child_doc in child_docs:
+                if self._is_absent(child_schema, child_doc):
+                    continue
+                child_path = '%s/%s=%s' % (path, child_type, child_name)
+                child_change = self._diff(operations, child_path, child_schema,
+                                          self._as_document(child_schema, child_doc), None,
+                                          self._child_description(description, child_type, child_name))
+                change['changes'].append(self._child_change(child_schema, child_type, child_name, child_change, None,
+                                                            child_doc))
+
+        return change
+
+    def _diff_attributes(self, path, schema, attributes, current, description):
+        attribute_descriptions = (description or {}).get('attributes') or {}
+        writes = []
+        for name, new_value in iteritems(attributes):
+            read_only = not schema.recreate and \
+                attribute_descriptions.get(name, {}).get('access-type', 'read-write') != 'read-write'
+            if name in schema.immutable or read_only:
+                debug('TreeDiff: attribute %s of %s can only be set when the resource is added' % (name, path))
+                continue
+            old_value = current.get(name)
+            new_value = coerce_value(new_value, old_value, attribute_descriptions.get(name))
+            if same_value(old_value, new_value):
+                continue
+
+            if new_value is None:
+                record = {'attribute': name, 'action': 'delete', 'old_value': old_value}
+                writes.append(('%s:undefine-attribute(name=%s)' % (path, name), record))
+            else:
+                record = {
+                    'attribute': name,
+                    'action': 'add' if old_value is None else 'update',
+                    'old_value': old_value,
+                    'new_value': new_value
+                }
+                writes.append(('%s:write-attribute(name=%s, value=%s)' % (path, name, convert_type(new_value)),
+                               record))
+        return writes
+
+    def _split(self, path, schema, target_state, description):
+        """
+        Split a desired document into its attributes and its children by child type.
+
+        :return: {tuple(dict, dict(str, tuple(ResourceSchema, list(tuple(str, object)))))} - the attributes and the
+                 schema and named child documents of each child type
+        """
+        described = (description or {}).get('attributes')
+        attribute_names = schema.attributes
+        if attribute_names is None:
+            attribute_names = [k for k, a in iteritems(described or {}) if
+                               a.get('access-type', 'read-write') == 'read-write']
+        elif described is not None:
+            # attributes a module declares but the server release does not have are left out unless they are set
+            unknown = [k for k in attribute_names if k not in described and target_state.get(k) is not None]
+            if len(unknown) > 0:
+                raise ParameterError('TreeDiff: the server does not know the attributes %s of %s' % (
+                    ', '.join(sorted(unknown)), path))
+            attribute_names = [k for k in attribute_names if k in described]
+
+        child_types = schema.children
+        if child_types is None:
+            child_types = dict((t, ResourceSchema()) for t in ((description or {}).get('children') or {}))
+
+        attributes = {}
+        children = collections.OrderedDict()
+        for k, v in iteritems(target_state):
+            if k in child_types:
+                children[k] = (child_types[k], self._named(child_types[k], k, v))
+            elif k in attribute_names:
+                attributes[k] = v
+            elif k not in _SELECTORS:
+                debug('TreeDiff: %s is neither an attribute nor a child type of %s and is ignored' % (k, path))
+        return attributes, children
+
+    @staticmethod
+    def _named(schema, child_type, docs):
+        if docs is None:
+            return []
+        elif isinstance(docs, dict):
+            return list(iteritems(docs))
+        elif isinstance(docs, list) and schema.value is None:
+            named = []
+            for doc in docs:
+                if not isinstance(doc, dict) or schema.key not in doc:
+                    raise ParameterError('TreeDiff: every %s must have a %s' % (child_type, schema.key))
+                named.append((doc[schema.key], doc))
+            return named
+        raise ParameterError('TreeDiff: %s must be a list or a dict of named resources: %r' % (child_type, docs))
+
+    @staticmethod
+    def _is_absent(schema, doc):
+        if schema.value is not None:
+            return doc is None
+        return isinstance(doc, dict) and doc.get('state') == 'absent'
+
+    @staticmethod
+    def _as_document(schema, doc):
+        if schema.value is not None:
+            return {schema.value: doc}
+        return {} if doc is None else doc
+
+    @staticmethod
+    def _child_description(description, child_type, child_name):
+        if description is None:
+            return None
+        models = ((description.get('children') or {}).get(child_type) or {}).get('model-description') or {}
+        return models.get(child_name) or models.get('*')
+
+    @staticmethod
+    def _child_record(schema, child_type, child_name, action, current):
+        if schema.value is not None:
+            record = {'attribute': child_name, 'action': action}
+            if current is not None:
+                record['old_value'] = current.get(schema.value)
+            return record
+        return {'resource': '%s=%s' % (child_type, child_name), 'action': action}
+
+    @staticmethod
+    def _child_change(schema, child_type, child_name, change, current, doc):
+        if schema.value is None:
+            record = {'resource': '%s=%s' % (child_type, child_name)}
+            record.update(change)
+            return record
+
+        # a plain value child is reported like an attribute of its parent
+        record = {'attribute': child_name, 'action': change['action'], 'new_value': doc}
+        if current is not None:
+            record['old_value'] = current.get(schema.value)
+        return record
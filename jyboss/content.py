@@ -0,0 +1,148 @@
+"""
+Hashes of the artifacts jyboss transfers to a server, deployment archives and module resources. The server identifies
+deployment content by its SHA-1 hash, comparing hashes tells if an artifact has to be transferred at all. Hashing a
+large archive takes a while, so the hashes are kept in an index in the jyboss home and only computed again once the
+size or modification time of a file changes. The index is written once at the end of a run or on exit, see flush().
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import uuid
+import atexit
+import hashlib
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from synchronize import make_synchronized
+from jyboss.context import get_jyboss_home, replace_file
+from jyboss.logging import debug, warn
+
+__metaclass__ = type
+
+DEFAULT_INDEX_FILE = 'content-hashes.json'
+
+# block size the files are read with to compute their hash
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def content_hash(path):
+    """
+    :param path: {str} - the file to hash
+    :return: {str} - the hex SHA-1 of the file, the hash the server identifies deployment content by
+    """
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        block = f.read(HASH_BLOCK_SIZE)
+        while len(block) > 0:
+            sha1.update(block)
+            block = f.read(HASH_BLOCK_SIZE)
+    return sha1.hexdigest()
+
+
+class ContentHashIndex(object):
+    """
+    SHA-1 hashes of local files keyed by their absolute path, size and modification time
+    """
+    _DEFAULT_INSTANCE = None
+
+    def __init__(self, index_file=None):
+        """
+        :param index_file: {str} - the file to persist the index in, defaults to content-hashes.json in the jyboss home
+        """
+        self.index_file = os.path.join(get_jyboss_home(), DEFAULT_INDEX_FILE) if index_file is None else index_file
+        self._entries = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def instance():
+        if ContentHashIndex._DEFAULT_INSTANCE is None:
+            ContentHashIndex._DEFAULT_INSTANCE = ContentHashIndex()
+            # scripts and tests do not run through the runner, the hashes they computed are written on exit
+            atexit.register(ContentHashIndex.flush_instance)
+        return ContentHashIndex._DEFAULT_INSTANCE
+
+    @staticmethod
+    def flush_instance():
+        """
+        Write the shared index if it is in use and changed, called at the end of a run and when the process exits.
+        """
+        if ContentHashIndex._DEFAULT_INSTANCE is not None:
+            ContentHashIndex._DEFAULT_INSTANCE.flush()
+
+    @make_synchronized
+    def hash(self, path):
+        """
+        Get the hash of a file from the index, the file is only hashed if it is not indexed or changed since.
+
+        :param path: {str} - the file to hash
+        :return: {str} - the hex SHA-1 of the file
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        entries = self._load()
+        entry = entries.get(path)
+        if entry is not None and entry.get('size') == st.st_size and entry.get('mtime') == st.st_mtime:
+            self.hits += 1
+            return entry['sha1']
+
+        self.misses += 1
+        sha1 = content_hash(path)
+        entries[path] = {'size': st.st_size, 'mtime': st.st_mtime, 'sha1': sha1}
+        self._dirty = True
+        return sha1
+
+    @make_synchronized
+    def invalidate(self, path=None):
+        """
+        Drop the hash of a file or of all files from the index.
+
+        :param path: {str} - the file to drop, all files if not set
+        """
+        entries = self._load()
+        if path is None:
+            entries.clear()
+        else:
+            entries.pop(os.path.abspath(path), None)
+        self._dirty = True
+
+    @make_synchronized
+    def flush(self):
+        """
+        Write the index if a hash was added or dropped since it was last written.
+        """
+        if self._dirty:
+            self._save()
+            self._dirty = False
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if os.path.isfile(self.index_file):
+                try:
+                    with open(self.index_file) as f:
+                        entries = json.load(f)
+                    # forget files that no longer exist so the index does not grow forever
+                    self._entries = dict((k, v) for k, v in entries.items() if os.path.isfile(k))
+                except (IOError, ValueError) as e:
+                    warn('%s: ignoring unreadable hash index %s: %s' % (self.__class__.__name__, self.index_file, e))
+        return self._entries
+
+    def _save(self):
+        tmp_file = '%s.%s' % (self.index_file, uuid.uuid4().hex)
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(self._entries, f)
+            replace_file(tmp_file, self.index_file)
+            debug('%s: saved %d hashes to %s' % (self.__class__.__name__, len(self._entries), self.index_file))
+        except (IOError, OSError) as e:
+            # the index only saves time, a run must not fail because it cannot be written
+            warn('%s: failed to save hash index %s: %s' % (self.__class__.__name__, self.index_file, e))
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
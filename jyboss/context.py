@@ -2,6 +2,7 @@
 from __future__ import (absolute_import, division, print_function)
 
 import time
+import atexit
 from functools import wraps
 import collections
 import os
@@ -10,11 +11,13 @@ from synchronize import make_synchronized
 
 from jyboss.exceptions import ContextError, ConnectionError
 from jyboss.logging import debug, warn, SyslogOutputStream
+from jyboss.startup import StartupProfile
 
 try:
     from java.lang import IllegalStateException, IllegalArgumentException, System, ClassLoader, Thread
     from java.io import PrintStream, File
     from java.net import URL, URLClassLoader
+    from java.nio.file import Files, Paths, StandardCopyOption
     from jarray import array
 except ImportError as jpe:
     raise ContextError('Java packages are not available, please run this module with jython.', jpe)
@@ -28,6 +31,8 @@ MODE_EMBEDDED = 'embedded'
 
 MODE_STANDALONE = 'standalone'
 
+MODE_OFFLINE = 'offline'
+
 streams = collections.namedtuple('streams', ['out', 'err'])
 
 
@@ -36,6 +41,32 @@ def normalize_dirpath(dirpath):
     return dirpath[:-1] if dirpath[-1] in ['/', '\\'] else dirpath
 
 
+def get_jyboss_home():
+    """
+    The directory jyboss keeps its local state in, JYBOSS_HOME or ~/.jyboss if not set. Created if it does not exist.
+    :return: {str} - the jyboss home directory
+    """
+    jyboss_home = os.environ.get('JYBOSS_HOME', os.path.join(os.path.expanduser('~'), '.jyboss'))
+    if not os.path.isdir(jyboss_home):
+        os.makedirs(jyboss_home, 0o700)
+    return jyboss_home
+
+
+def replace_file(src, dst):
+    """
+    Move a file over another one in a single step, os.rename cannot replace an existing file on windows.
+
+    :param src: {str} - the file to move, usually a temporary file next to the destination
+    :param dst: {str} - the file to replace
+    """
+    # noinspection PyUnresolvedReferences
+    from java.io import IOException
+    try:
+        Files.move(Paths.get(src), Paths.get(dst), StandardCopyOption.REPLACE_EXISTING, StandardCopyOption.ATOMIC_MOVE)
+    except IOException as e:
+        raise OSError('cannot move %s to %s: %s' % (src, dst, e))
+
+
 def retry(exceptions=None, tries=None, delay=2, backoff=2):
     if exceptions:
         exceptions = tuple(exceptions)
@@ -75,7 +106,7 @@ class ConfigurationChangeHandler(object):
 
 
 class ConnectionResource(object):
-    def __init__(self, mode, context=None):
+    def __init__(self, mode, context=None, **connection_args):
         if mode is None:
             ContextError('%s cannot be created without a connection mode' % self.__class__.__name__)
 
@@ -86,14 +117,23 @@ class ConnectionResource(object):
         else:
             self.context = context
 
+        # protocol, controller_host, controller_port, admin_username and admin_password of a server connection
+        self.connection_args = connection_args
+
         self.connection = None  # type: Connection
 
     def __enter__(self):
 
-        if self.mode == MODE_EMBEDDED:
+        if self.mode == MODE_EMBEDDED and self.context.reuse_embedded:
+            self.connection = ReusableEmbeddedConnection(self.context)
+        elif self.mode == MODE_EMBEDDED:
             self.connection = EmbeddedConnection(self.context)
         elif self.mode == MODE_STANDALONE:
-            self.connection = ServerConnection(self.context)
+            self.connection = ServerConnection(context=self.context, **self.connection_args)
+        elif self.mode == MODE_OFFLINE:
+            # the offline connection needs the command modules, which import this module
+            from jyboss.offline import OfflineConnection
+            self.connection = OfflineConnection(self.context)
 
         self.connection.connect()
 
@@ -126,6 +166,17 @@ class Connection(ConfigurationChangeHandler):
         self.context.register_change_handler(self)
         self.context.connection = self
         self.jcli = None
+        # snapshot cache of the management model read through this connection, see jyboss.command.core.ModelCache
+        self.model_cache = None
+        # reload-required or restart-required once a command left the server in that state
+        self.process_state = None
+        # always or required once a reload was requested, it is done at the end of a run by
+        # jyboss.command.scheduler.ReloadScheduler
+        self.reload_requested = None
+        # set while a run defers the reloads its writes require to its end
+        self.reload_deferred = False
+        # resource descriptions of the server release, False if the server has none, see jyboss.command.metadata
+        self.metadata = None
 
     @abstractmethod
     def _connect(self, cli):
@@ -152,7 +203,8 @@ class Connection(ConfigurationChangeHandler):
 
         debug("%s.connect: try to connect, current cli: %s" % (self.__class__.__name__, jcli))
         try:
-            self._connect(jcli)
+            with StartupProfile.instance().phase('connect'):
+                self._connect(jcli)
             debug("%s.connect: connected to server" % self.__class__.__name__)
         except Exception as e:
             if e.message.startswith('Already connected to server'):
@@ -165,6 +217,7 @@ class Connection(ConfigurationChangeHandler):
                 raise e
 
         self.jcli = jcli
+        self.jcli.stats = self.context.stats
 
     def disconnect(self):
         debug("Session.disconnect: try to disconnect %s cli state %s" % (self.get_mode(), self.jcli))
@@ -176,12 +229,16 @@ class Connection(ConfigurationChangeHandler):
                 pass
             finally:
                 self.jcli = None
+                self.model_cache = None
+                self.metadata = None
                 self.context.unregister_change_handler(self)
 
     def configuration_changed(self, change):
         if 'interactive' in change and self.jcli is not None:
             debug('%s handled: %r' % (self.__class__.__name__, change))
             # TODO self.jcli.silent = change['interactive']['new_value']
+        if 'stats' in change and self.jcli is not None:
+            self.jcli.stats = change['stats']['new_value']
 
 
 class EmbeddedConnection(Connection):
@@ -195,12 +252,163 @@ class EmbeddedConnection(Connection):
     def _connect(self, cli):
         config_file = self.context.config_file if self.context.config_file is not None else 'standalone.xml'
 
+        self.context.configure_log_manager()
         cli.embedded(self.context.get_jboss_home(), config_file)
 
     def get_mode(self):
         return 'embedded'
 
 
+class ReusableEmbeddedConnection(EmbeddedConnection):
+    """
+    an embedded connection that leaves the embedded server running on disconnect so the next connection with the
+    same jboss home and configuration file does not have to boot it again
+    """
+
+    def __init__(self, context=None):
+        super(ReusableEmbeddedConnection, self).__init__(context=context)
+        self.session = None
+
+    def connect(self):
+        self.context.register_change_handler(self)
+
+        if self.jcli is not None and self.jcli.is_connected():
+            raise ContextError('%s.connect: this resource is already connected' % self.__class__.__name__)
+
+        config_file = self.context.config_file if self.context.config_file is not None else 'standalone.xml'
+        with StartupProfile.instance().phase('connect'):
+            self.session = EmbeddedSession.acquire(self.context, self.context.get_jboss_home(), config_file)
+        self.jcli = self.session.jcli
+        self.jcli.stats = self.context.stats
+        self.process_state = None
+
+    def disconnect(self):
+        debug('%s.disconnect: release embedded server in state %s' % (self.__class__.__name__, self.process_state))
+        if self.session is not None:
+            try:
+                # the cli outlives this connection and must not record into the stats of this context any longer
+                self.jcli.stats = None
+                self.session.release(self.process_state)
+            finally:
+                self.session = None
+                self.jcli = None
+                self.model_cache = None
+                self.context.unregister_change_handler(self)
+
+
+class EmbeddedSession(object):
+    """
+    the embedded server kept running by reusable embedded connections, a jvm can only host one embedded server
+    """
+    _CURRENT = None
+
+    _STATS = dict(boots=0, boot_seconds=0.0, reuses=0, reloads=0, reload_seconds=0.0)
+
+    def __init__(self, jboss_home, config_file, jcli):
+        self.jboss_home = jboss_home
+        self.config_file = config_file
+        self.jcli = jcli
+        self.in_use = False
+        self.process_state = None
+
+    @staticmethod
+    def acquire(context, jboss_home, config_file):
+        """
+        Get the running embedded server for the configuration, it is booted if it is not running yet and reloaded if
+        the previous connection left it in reload-required state.
+
+        :param context: {JyBossContext} - the context to create the cli with
+        :param jboss_home: {str} - the jboss home of the embedded server
+        :param config_file: {str} - the server configuration file
+        :return: {EmbeddedSession} - the session, must be released when the connection is done with it
+        """
+        session = EmbeddedSession._CURRENT
+        stats = EmbeddedSession._STATS
+
+        if session is not None and session.in_use:
+            raise ContextError('the embedded server is already in use by another connection')
+
+        if session is not None and (session.jboss_home != jboss_home or session.config_file != config_file or
+                                    not session.jcli.is_connected() or session.process_state == 'restart-required'):
+            EmbeddedSession.shutdown()
+            session = None
+
+        if session is None:
+            start = time.time()
+            jcli = context.create_cli()
+            context.configure_log_manager()
+            jcli.embedded(jboss_home, config_file)
+            elapsed = time.time() - start
+            stats['boots'] += 1
+            stats['boot_seconds'] += elapsed
+            debug('EmbeddedSession.acquire: booted embedded server with %s in %.3fs' % (config_file, elapsed))
+            session = EmbeddedSession(jboss_home, config_file, jcli)
+            if stats['boots'] == 1:
+                atexit.register(EmbeddedSession.shutdown)
+            EmbeddedSession._CURRENT = session
+        else:
+            if session.process_state == 'reload-required':
+                start = time.time()
+                session.jcli.reload(admin_only=True)
+                elapsed = time.time() - start
+                stats['reloads'] += 1
+                stats['reload_seconds'] += elapsed
+                debug('EmbeddedSession.acquire: reloaded embedded server in %.3fs' % elapsed)
+            stats['reuses'] += 1
+            debug('EmbeddedSession.acquire: reused embedded server, %.3fs boot time saved so far' %
+                  EmbeddedSession.stats()['saved_seconds'])
+
+        session.process_state = None
+        session.in_use = True
+        return session
+
+    def release(self, process_state=None):
+        """
+        Hand the session back once the connection is done with it.
+
+        :param process_state: {str} - reload-required or restart-required if the server has to be reset before reuse
+        """
+        self.in_use = False
+        if process_state is not None:
+            self.process_state = process_state
+        if self.jcli.is_connected():
+            # the next connection must not inherit the current node or an unfinished batch
+            self.jcli.get_command_context().getCurrentNodePath().reset()
+            self.jcli.batch_reset()
+
+    @staticmethod
+    def invalidate():
+        """
+        Request a reload of the embedded server before it is used again, eg. after its configuration file was replaced.
+        """
+        session = EmbeddedSession._CURRENT
+        if session is not None and session.process_state is None:
+            session.process_state = 'reload-required'
+
+    @staticmethod
+    def shutdown():
+        """
+        Stop the embedded server that is kept running, if any.
+        """
+        session = EmbeddedSession._CURRENT
+        EmbeddedSession._CURRENT = None
+        if session is not None:
+            try:
+                session.jcli.disconnect()
+            except Exception as e:
+                warn('failed to stop embedded server: %s' % getattr(e, 'message', e))
+
+    @staticmethod
+    def stats():
+        """
+        :return: {dict} - number of boots, reuses and reloads, the time spent on them and the boot time saved by reuse
+        """
+        stats = dict(EmbeddedSession._STATS)
+        average_boot = stats['boot_seconds'] / stats['boots'] if stats['boots'] > 0 else 0.0
+        stats['saved_seconds'] = max(0.0, stats['reuses'] * average_boot - stats['reload_seconds'])
+        return stats
+
+
 class ServerConnection(Connection):
     """
     a cli object that can interact with jboss server
@@ -281,22 +489,50 @@ class JyBossContext(ConfigurationChangeHandler):
 
     _CliType = None
 
+    # the class loader the jboss client jars were added to, threads other than the loading thread need it as well
+    _CliClassLoader = None
+
+    # set once the JUL log manager was replaced with the jboss log manager, see configure_log_manager
+    _LogManagerConfigured = False
+
     _EXCLUDE_FROM_OBSERVATION = [
         'change_observer',
         'original_streams',
         'silent_streams',
+        'manage_streams',
+        'operation_queue',
+        'plan',
+        'cli_version',
         '_jboss_home_classpath'
     ]
 
-    def __init__(self, jboss_home=None, config_file=None, interactive=True):
+    def __init__(self, jboss_home=None, config_file=None, interactive=True, composite=False, cache=False,
+                 reuse_embedded=False):
         self.jboss_home = jboss_home
         self.config_file = config_file
         self.original_streams = streams(System.out, System.err)
         self.silent_streams = None
+        # if cleared, the context leaves the jvm output streams alone, e.g. for contexts that run side by side
+        self.manage_streams = True
         self.interactive = interactive
+        # if set, module writes are queued and submitted to the server as composite operations
+        self.composite = composite
+        # if set, resource reads are served from a per connection snapshot of the management model
+        self.cache = cache
+        # if set, embedded servers are kept running between connections, see EmbeddedSession
+        self.reuse_embedded = reuse_embedded
+        # if set, the management operations of the connections are recorded, see jyboss.stats.OperationStats
+        self.stats = None
+        self.operation_queue = None
+        # while a plan is computed the module commands are planned against a model snapshot, see jyboss.command.plan
+        self.plan = None
         self.connection = None
         # TODO save original streams before nuking them
         self._jboss_home_classpath = None
+        # a file listing the jboss client jars to use instead of the ones of the jboss home, see jyboss.classpath
+        self.classpath_manifest = os.environ.get('JYBOSS_CLASSPATH_MANIFEST')
+        # the version of the jboss cli client once the class path is configured from a jboss home
+        self.cli_version = None
         # add myself to the list of handlers so context can handle some of the updates to itself
         change_observer = ConfigurationChangeObserver()
         change_observer.register(self)
@@ -330,14 +566,21 @@ class JyBossContext(ConfigurationChangeHandler):
     def create_cli(self):
         # make sure we only ever load this once
         if JyBossContext._CliType is None:
-            JyBossContext._CliType = self._load_cli()
+            with StartupProfile.instance().phase('cli_init'):
+                JyBossContext._CliType = self._load_cli()
+
+        cli_class_loader = JyBossContext._CliClassLoader
+        if cli_class_loader is not None and Thread.currentThread().getContextClassLoader() is not cli_class_loader:
+            Thread.currentThread().setContextClassLoader(cli_class_loader)
 
         return JyBossContext._CliType()
 
     @make_synchronized
     def _set_interactive(self, interactive):
         # deactivate all handlers
-        if not interactive:
+        if not self.manage_streams:
+            debug("leave JVM output streams to the owner of the process")
+        elif not interactive:
             debug("disable default JVM output streams")
             if self.silent_streams is None:
                 self.silent_streams = streams(SyslogOutputStream(), SyslogOutputStream(SyslogOutputStream.ERR))
@@ -390,33 +633,53 @@ class JyBossContext(ConfigurationChangeHandler):
             raise ContextError("no session in progress")
 
     def _load_cli(self):
+        # with a manifest or a cached classpath there is no need to probe the class path with a failing import first
+        if self._classpath_known() or not self._cli_on_classpath():
+            self._configure_classpath()
+            if not self._cli_on_classpath():
+                raise ContextError(
+                    "jboss cli libraries are not on the classpath, either start jython with jboss-cli-client.jar on the classpath, set JBOSS_HOME environment variable or create a context with a specific jboss_home path")
+
+        # now it's safe to load the cli
+        from .cli import Cli as _Cli
+        return _Cli
+
+    @staticmethod
+    def _cli_on_classpath():
         try:
             # @formatter:off
             # noinspection PyUnresolvedReferences
-            from org.jboss.logmanager import LogManager as JBossLogManager
             from org.jboss.as.cli import CommandContextFactory
-            from org.jboss.as.cli import CliInitializationException
-            from org.jboss.as.cli import CommandLineException
             # @formatter:on
+            return True
         except ImportError:
-            self._configure_classpath()
-            try:
-                # @formatter:off
-                # noinspection PyUnresolvedReferences
-                from org.jboss.logmanager import LogManager as JBossLogManager
-                from org.jboss.as.cli import CommandContextFactory
-                from org.jboss.as.cli import CliInitializationException
-                from org.jboss.as.cli import CommandLineException
-                # @formatter:on
-            except ImportError:
-                raise ContextError(
-                    "jboss cli libraries are not on the classpath, either start jython with jboss-cli-client.jar on the classpath, set JBOSS_HOME environment variable or create a context with a specific jboss_home path")
+            return False
+
+    def _classpath_known(self):
+        if self.classpath_manifest is not None:
+            return True
+        jboss_home = self.jboss_home or System.getProperty('jboss.home.dir') or os.environ.get('JBOSS_HOME')
+        if jboss_home is None:
+            return False
+        from jyboss.classpath import ClasspathCache
+        return ClasspathCache.instance().lookup(normalize_dirpath(jboss_home)) is not None
+
+    @make_synchronized
+    def configure_log_manager(self):
+        """
+        Replace the JUL log manager with the jboss log manager, the embedded server fails to boot without it. Only
+        embedded connections need it, so it is done on the first embedded connect rather than when the cli is loaded.
+        """
+        if JyBossContext._LogManagerConfigured:
+            return
 
         # if the log manager is JUL we need to hack it as it has been initialised prior we got a change to do so,
         # embedded mode will fail if this is not setup properly
         try:
             from java.util.logging import LogManager as JulLogManager
             from java.lang.reflect import Modifier
+            # noinspection PyUnresolvedReferences
+            from org.jboss.logmanager import LogManager as JBossLogManager
         except ImportError as jpe:
             raise ContextError('Java packages are not available, please run this module with jython.', jpe)
 
@@ -430,34 +693,44 @@ class JyBossContext(ConfigurationChangeHandler):
             modifiersField.setInt(field, field.getModifiers() & ~Modifier.FINAL)
             field.set(None, JBossLogManager())
 
-        # now it's safe to load the cli
-        from .cli import Cli as _Cli
-        return _Cli
+        JyBossContext._LogManagerConfigured = True
 
     def _configure_classpath(self):
         """
         jboss CLI does something dodgy and can't just append the cli.jar to the system path
         sys.path.append(jboss_home + "/bin/client/jboss-cli-client.jar")
         instead we are going to add a URL classloader into the loader hierarchy of
-        the current thread context
+        the current thread context. The jars are taken from the classpath manifest if one is set, else from the
+        classpath cache of the jboss home, see jyboss.classpath.
         """
-        jboss_home_str = normalize_dirpath(self.get_jboss_home())
-        jboss_home = File(jboss_home_str)
-        if not jboss_home.isDirectory():
-            raise ContextError("jboss_home %s is not a directory or does not exist" % jboss_home_str)
+        with StartupProfile.instance().phase('classpath'):
+            self._add_client_jars()
+
+    def _add_client_jars(self):
+        from jyboss.classpath import ClasspathCache, read_manifest
+
+        if self.classpath_manifest is not None:
+            source = self.classpath_manifest
+            jar_paths = read_manifest(self.classpath_manifest)
+        else:
+            source = normalize_dirpath(self.get_jboss_home())
+            if not File(source).isDirectory():
+                raise ContextError("jboss_home %s is not a directory or does not exist" % source)
+            jar_paths, self.cli_version = ClasspathCache.instance().resolve(source)
 
         # should work but does not
         # sys.path.insert(0, os.path.join(jboss_home_str, 'bin', 'client', 'jboss-cli-client.jar'))
         # sys.path.insert(0, os.path.join(jboss_home_str, 'jboss-modules.jar'))
 
         jars = array([], URL)
-        jars.append(File(os.path.join(jboss_home_str, 'bin', 'client', 'jboss-cli-client.jar')).toURL())
-        jars.append(File(os.path.join(jboss_home_str, 'jboss-modules.jar')).toURL())
+        for jar_path in jar_paths:
+            jars.append(File(jar_path).toURL())
         current_thread_classloader = Thread.currentThread().getContextClassLoader()
-        Thread.currentThread().setContextClassLoader(URLClassLoader(jars, current_thread_classloader))
+        JyBossContext._CliClassLoader = URLClassLoader(jars, current_thread_classloader)
+        Thread.currentThread().setContextClassLoader(JyBossContext._CliClassLoader)
 
-        debug('Added jboss client jars from %s to context class loader' % jboss_home_str)
-        self._jboss_home_classpath = jboss_home_str
+        debug('Added jboss client jars from %s to context class loader, cli version %s' % (source, self.cli_version))
+        self._jboss_home_classpath = source
 
     def register_change_handler(self, handler):
         self.change_observer.register(handler)
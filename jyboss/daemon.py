@@ -0,0 +1,335 @@
+"""
+A long lived jyboss process that keeps cli sessions to server controllers open between ansible tasks. The ansible
+module hands its parameters to the daemon with the DaemonClient and gets the module result back, which saves the jvm
+startup, cli bootstrap and controller authentication of every task.
+
+The daemon listens on the loopback interface only, jython cannot open unix domain sockets. Clients authenticate with a
+random token that is written together with the port to a state file in the jyboss home which only the owner can read.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import sys
+import time
+import uuid
+import socket
+import subprocess
+import threading
+import SocketServer
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from jyboss.context import JyBossContext, get_jyboss_home, replace_file
+from jyboss.logging import debug, warn
+from jyboss.exceptions import ContextError, ProcessingError
+from jyboss.runner import configure_context, execute_instructions, create_change_processor, CONNECTION_PARAMS
+
+__metaclass__ = type
+
+DEFAULT_IDLE_TIMEOUT = 600
+
+DEFAULT_STATE_FILE = 'daemon.json'
+
+
+def daemon_state_file():
+    return os.path.join(get_jyboss_home(), DEFAULT_STATE_FILE)
+
+
+class _Session(object):
+    """
+    an open cli session to one controller, requests for the same controller are serialised on the session lock
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.lock = threading.Lock()
+        self.context = JyBossContext()
+        self.resource = None
+        self.change_processor = create_change_processor(self.context)
+
+    def is_connected(self):
+        return self.resource is not None and self.context.is_connected()
+
+    def execute(self, params):
+        # the runtime flags are set per request, a session must not inherit them from the previous task
+        self.context.composite = False
+        self.context.cache = False
+        resource = configure_context(self.context, params)
+        if not self.is_connected():
+            debug('jyboss daemon: connecting session %r' % (self.key,))
+            resource.connect()
+            self.resource = resource
+        else:
+            # another tool may have changed the model since the last task
+            self.context.connection.model_cache = None
+        return execute_instructions(self.context, params, self.change_processor)
+
+    def close(self):
+        if self.is_connected():
+            self.resource.disconnect()
+        self.resource = None
+
+
+class JyBossDaemon(object):
+    """
+    server that executes instruction payloads received from a DaemonClient on pooled controller sessions
+    """
+
+    def __init__(self, state_file=None, idle_timeout=DEFAULT_IDLE_TIMEOUT, port=0):
+        """
+        :param state_file: {str} - file the daemon publishes its port and token in, defaults to daemon.json in the jyboss home
+        :param idle_timeout: {int} - seconds without a request after which the daemon shuts down, 0 to never shut down
+        :param port: {int} - the loopback port to listen on, 0 picks a free port
+        """
+        self.state_file = daemon_state_file() if state_file is None else state_file
+        self.idle_timeout = idle_timeout
+        self.token = uuid.uuid4().hex
+        self.sessions = {}
+        self._sessions_lock = threading.Lock()
+        self.last_activity = time.time()
+        self.active_requests = 0
+        self.server = _DaemonServer(('127.0.0.1', port), _DaemonRequestHandler)
+        self.server.jyboss_daemon = self
+
+    def serve_forever(self):
+        self._publish_state()
+        if self.idle_timeout > 0:
+            watchdog = threading.Thread(target=self._watch_idle, name='jyboss-daemon-idle')
+            watchdog.daemon = True
+            watchdog.start()
+        debug('jyboss daemon: listening on port %d' % self.server.server_address[1])
+        try:
+            self.server.serve_forever()
+        finally:
+            self._close_sessions()
+            self._remove_state()
+
+    def shutdown(self):
+        # must not be called from the thread running serve_forever
+        threading.Thread(target=self.server.shutdown, name='jyboss-daemon-shutdown').start()
+
+    def handle(self, request):
+        """
+        :param request: {dict} - the decoded request, must carry the daemon token
+        :return: {dict} - the response with status ok or error
+        """
+        self.last_activity = time.time()
+        if request.get('token') != self.token:
+            return {'status': 'error', 'msg': 'invalid jyboss daemon token'}
+
+        action = request.get('action', 'execute')
+        if action == 'ping':
+            return {'status': 'ok', 'sessions': len(self.sessions)}
+        elif action == 'shutdown':
+            self.shutdown()
+            return {'status': 'ok'}
+        elif action == 'execute':
+            params = request.get('params', {})
+            with self._sessions_lock:
+                self.active_requests += 1
+            try:
+                return {'status': 'ok', 'result': self._execute(params)}
+            except Exception as e:
+                return {'status': 'error', 'msg': getattr(e, 'message', None) or str(e)}
+            finally:
+                with self._sessions_lock:
+                    self.active_requests -= 1
+                self.last_activity = time.time()
+        else:
+            return {'status': 'error', 'msg': 'unknown jyboss daemon action %s' % action}
+
+    def _execute(self, params):
+        if params.get('embedded_mode', False):
+            raise ProcessingError('embedded_mode cannot be used with the jyboss daemon')
+        if params.get('offline_mode', False):
+            raise ProcessingError('offline_mode cannot be used with the jyboss daemon')
+
+        session = self._session(params)
+        with session.lock:
+            try:
+                return session.execute(params)
+            finally:
+                # a reload or a broken controller connection invalidates the session
+                if not session.is_connected():
+                    self._drop_session(session)
+
+    def _session(self, params):
+        key = (params.get('jboss_home'),) + tuple(params.get(k) for k in CONNECTION_PARAMS)
+        with self._sessions_lock:
+            session = self.sessions.get(key)
+            if session is None:
+                session = _Session(key)
+                self.sessions[key] = session
+            return session
+
+    def _drop_session(self, session):
+        with self._sessions_lock:
+            if self.sessions.get(session.key) is session:
+                del self.sessions[session.key]
+        try:
+            session.close()
+        except Exception as e:
+            warn('jyboss daemon: failed to close session: %s' % getattr(e, 'message', e))
+
+    def _close_sessions(self):
+        for session in list(self.sessions.values()):
+            self._drop_session(session)
+
+    def _watch_idle(self):
+        while True:
+            time.sleep(min(self.idle_timeout, 5))
+            if self.active_requests == 0 and time.time() - self.last_activity > self.idle_timeout:
+                debug('jyboss daemon: idle for %d seconds, shutting down' % self.idle_timeout)
+                self.server.shutdown()
+                return
+
+    def _publish_state(self):
+        state = {'pid': os.getpid(), 'port': self.server.server_address[1], 'token': self.token}
+        tmp_file = '%s.%s' % (self.state_file, self.token)
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+        replace_file(tmp_file, self.state_file)
+
+    def _remove_state(self):
+        try:
+            with open(self.state_file) as f:
+                if json.load(f).get('token') != self.token:
+                    return
+            os.remove(self.state_file)
+        except (IOError, OSError, ValueError):
+            pass
+
+
+class _DaemonServer(SocketServer.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _DaemonRequestHandler(SocketServer.StreamRequestHandler):
+    """
+    one json document per line in each direction
+    """
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {'status': 'error', 'msg': 'jyboss daemon request is not valid json'}
+        else:
+            response = self.server.jyboss_daemon.handle(request)
+        self.wfile.write(json.dumps(response) + '\n')
+        self.wfile.flush()
+
+
+class DaemonClient(object):
+    """
+    thin client that hands instruction payloads to a running jyboss daemon
+    """
+
+    def __init__(self, state_file=None, timeout=None):
+        """
+        :param state_file: {str} - the state file published by the daemon, defaults to daemon.json in the jyboss home
+        :param timeout: {float} - socket timeout in seconds, None waits for as long as the instructions take
+        """
+        self.state_file = daemon_state_file() if state_file is None else state_file
+        self.timeout = timeout
+
+    def _state(self):
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError) as e:
+            raise ContextError('jyboss daemon is not running, no state in %s' % self.state_file, e)
+
+    def _request(self, action, timeout=None, **kwargs):
+        state = self._state()
+        request = dict(kwargs)
+        request['action'] = action
+        request['token'] = state['token']
+        try:
+            sock = socket.create_connection(('127.0.0.1', state['port']), timeout)
+        except socket.error as e:
+            raise ContextError('jyboss daemon is not reachable on port %s' % state['port'], e)
+        try:
+            f = sock.makefile('rw')
+            f.write(json.dumps(request) + '\n')
+            f.flush()
+            line = f.readline()
+            f.close()
+        finally:
+            sock.close()
+        if not line:
+            raise ContextError('jyboss daemon closed the connection without a response')
+        response = json.loads(line)
+        if response.get('status') != 'ok':
+            raise ProcessingError(response.get('msg'))
+        return response
+
+    def is_available(self):
+        """
+        :return: {bool} - True if a daemon is running and accepts our token
+        """
+        try:
+            self._request('ping', timeout=5)
+            return True
+        except (ContextError, ProcessingError, socket.error):
+            return False
+
+    def execute(self, params):
+        """
+        Process module instructions in the daemon.
+
+        :param params: {dict} - the instruction parameters as passed to the ansible module
+        :return: {dict} - the module result
+        """
+        return self._request('execute', timeout=self.timeout, params=params)['result']
+
+    def shutdown(self):
+        self._request('shutdown', timeout=5)
+
+
+def start_daemon(state_file=None, idle_timeout=DEFAULT_IDLE_TIMEOUT, wait=30):
+    """
+    Start a detached daemon process with the current jython interpreter and wait until it accepts requests.
+
+    :param state_file: {str} - the state file the daemon should publish to
+    :param idle_timeout: {int} - seconds without a request after which the daemon shuts down
+    :param wait: {int} - seconds to wait for the daemon to become available
+    :return: {DaemonClient} - a client for the started daemon
+    """
+    client = DaemonClient(state_file=state_file)
+    args = [sys.executable, '-m', 'jyboss.daemon', '--idle-timeout', str(idle_timeout)]
+    if state_file is not None:
+        args += ['--state-file', state_file]
+    with open(os.devnull, 'r+') as devnull:
+        subprocess.Popen(args, stdin=devnull, stdout=devnull, stderr=devnull, close_fds=True)
+    deadline = time.time() + wait
+    while time.time() < deadline:
+        if client.is_available():
+            return client
+        time.sleep(0.5)
+    raise ContextError('jyboss daemon did not start within %d seconds' % wait)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Keep jboss cli sessions open for the jyboss ansible module.')
+    parser.add_argument('--state-file', default=None, help='file to publish the daemon port and token in')
+    parser.add_argument('--idle-timeout', type=int, default=DEFAULT_IDLE_TIMEOUT,
+                        help='seconds without a request after which the daemon exits, 0 to run forever')
+    parser.add_argument('--port', type=int, default=0, help='loopback port to listen on, default picks a free port')
+    args = parser.parse_args()
+    JyBossDaemon(state_file=args.state_file, idle_timeout=args.idle_timeout, port=args.port).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
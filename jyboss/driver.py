@@ -0,0 +1,211 @@
+"""
+Apply one instruction document to many server controllers in parallel. Every host gets its own context and server
+connection, the jyboss modules are processed on a thread pool and the per host results are aggregated.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import time
+from copy import deepcopy
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from jyboss.context import JyBossContext
+from jyboss.logging import debug, warn
+from jyboss.exceptions import ContextError, ParameterError
+from jyboss.runner import configure_context, execute_instructions
+
+try:
+    from java.lang import Long, System, Thread
+    from java.util.concurrent import Callable, Executors, ThreadFactory, ExecutionException, TimeUnit
+    from java.util.concurrent.atomic import AtomicInteger
+except ImportError as jpe:
+    raise ContextError('Java packages are not available, please run this module with jython.', jpe)
+
+__metaclass__ = type
+
+
+class _HostThreadFactory(ThreadFactory):
+    """
+    named daemon threads so a hanging controller cannot keep the jvm alive
+    """
+
+    def __init__(self):
+        self.counter = AtomicInteger()
+
+    def newThread(self, runnable):
+        thread = Thread(runnable, 'jyboss-host-%d' % self.counter.incrementAndGet())
+        thread.setDaemon(True)
+        return thread
+
+
+class _HostTask(Callable):
+    def __init__(self, name, params):
+        self.name = name
+        self.params = params
+
+    def call(self):
+        start = time.time()
+        try:
+            context = JyBossContext()
+            # the jvm output streams are global, the driver silences them once for all hosts
+            context.manage_streams = False
+            resource = configure_context(context, self.params)
+            debug('%s: apply instructions to %s' % (self.__class__.__name__, self.name))
+            with resource:
+                result = execute_instructions(context, self.params)
+        except Exception as e:
+            # python exceptions lose their message when wrapped into an ExecutionException
+            warn('%s: failed to apply instructions to %s: %s' % (self.__class__.__name__, self.name, e))
+            result = dict(failed=True, msg=getattr(e, 'message', None) or str(e))
+        result['elapsed'] = round(time.time() - start, 3)
+        return result
+
+
+class MultiHostDriver(object):
+    """
+    runs the jyboss modules against an inventory of server controllers concurrently
+    """
+
+    def __init__(self, inventory, max_workers=8, timeout=None):
+        """
+        :param inventory: {dict|list} - host name to connection parameters, or a list of connection parameters with a name
+        :param max_workers: {int} - the maximum number of hosts configured at the same time
+        :param timeout: {int} - seconds to wait for all hosts to finish, None waits forever
+        """
+        self.inventory = self._normalize_inventory(inventory)
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    @staticmethod
+    def _normalize_inventory(inventory):
+        if isinstance(inventory, dict):
+            hosts = []
+            for name, params in inventory.items():
+                host = dict(params) if params is not None else {}
+                host.setdefault('name', name)
+                hosts.append(host)
+            inventory = hosts
+        elif not isinstance(inventory, list):
+            raise ParameterError('inventory must be a dict or list of controllers')
+
+        names = set()
+        for host in inventory:
+            if not isinstance(host, dict):
+                raise ParameterError('inventory entry must be a dict of connection parameters: %r' % host)
+            name = host.setdefault('name', host.get('controller_host'))
+            if name is None:
+                raise ParameterError('inventory entry needs a name or controller_host: %r' % host)
+            if name in names:
+                raise ParameterError('inventory host %s is defined more than once' % name)
+            names.add(name)
+        return inventory
+
+    def _host_params(self, host, instructions):
+        params = deepcopy(instructions)
+        for k, v in host.items():
+            if k != 'name':
+                params[k] = v
+        if params.get('embedded_mode', False):
+            raise ParameterError('embedded_mode cannot be used to configure multiple hosts')
+        if params.get('offline_mode', False):
+            raise ParameterError('offline_mode cannot be used to configure multiple hosts')
+        return params
+
+    def apply(self, instructions):
+        """
+        Process the instructions on every host of the inventory.
+
+        :param instructions: {dict} - the instruction document, same format as the ansible module parameters
+        :return: {dict} - changed flag, the results per host in hosts and the error message per host in failed
+        """
+        result = dict(changed=False, hosts={}, failed={})
+        if len(self.inventory) == 0:
+            return result
+
+        out, err = System.out, System.err
+        try:
+            # load the cli once up front, the workers would otherwise race on the class path and log manager setup,
+            # the bootstrap context also silences the jvm output streams while the hosts are configured
+            bootstrap = JyBossContext()
+            configure_context(bootstrap, self._host_params(self.inventory[0], instructions))
+            bootstrap.create_cli()
+
+            tasks = [_HostTask(host['name'], self._host_params(host, instructions)) for host in self.inventory]
+            return self._run(tasks)
+        finally:
+            System.out.flush()
+            System.err.flush()
+            System.setOut(out)
+            System.setErr(err)
+
+    def _run(self, tasks):
+        """
+        Execute the host tasks on the thread pool and aggregate their results.
+
+        :param tasks: {list(Callable)} - the tasks to execute, each with the name of its host
+        :return: {dict} - changed flag, the results per host in hosts and the error message per host in failed
+        """
+        result = dict(changed=False, hosts={}, failed={})
+        executor = Executors.newFixedThreadPool(min(self.max_workers, len(tasks)), _HostThreadFactory())
+        try:
+            futures = [(task.name, executor.submit(task)) for task in tasks]
+            executor.shutdown()
+            if self.timeout is None:
+                executor.awaitTermination(Long.MAX_VALUE, TimeUnit.SECONDS)
+            elif not executor.awaitTermination(self.timeout, TimeUnit.SECONDS):
+                warn('%s: not all hosts finished within %d seconds' % (self.__class__.__name__, self.timeout))
+                executor.shutdownNow()
+
+            for name, future in futures:
+                if not future.isDone():
+                    future.cancel(True)
+                    if self.timeout is None:
+                        result['failed'][name] = 'host did not finish'
+                    else:
+                        result['failed'][name] = 'host did not finish within %d seconds' % self.timeout
+                    continue
+                try:
+                    host_result = future.get()
+                except ExecutionException as ee:
+                    result['failed'][name] = str(ee.getCause())
+                    continue
+                if host_result.pop('failed', False):
+                    result['failed'][name] = host_result['msg']
+                    continue
+                result['hosts'][name] = host_result
+                if host_result.get('changed', False):
+                    result['changed'] = True
+        finally:
+            executor.shutdownNow()
+
+        return result
+
+
+def main():
+    import argparse
+    import yaml
+    parser = argparse.ArgumentParser(description='Apply jyboss instructions to many controllers in parallel.')
+    parser.add_argument('inventory', help='yaml file with the controllers to configure')
+    parser.add_argument('instructions', help='yaml file with the jyboss module instructions')
+    parser.add_argument('--workers', type=int, default=8, help='number of hosts configured concurrently')
+    parser.add_argument('--timeout', type=int, default=None, help='seconds to wait for all hosts to finish')
+    args = parser.parse_args()
+
+    with open(args.inventory) as f:
+        inventory = yaml.safe_load(f)
+    with open(args.instructions) as f:
+        instructions = yaml.safe_load(f)
+
+    result = MultiHostDriver(inventory, max_workers=args.workers, timeout=args.timeout).apply(instructions)
+    print(json.dumps(result, indent=2))
+    return 1 if len(result['failed']) > 0 else 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
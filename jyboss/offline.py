@@ -0,0 +1,1028 @@
+"""
+Offline backend that applies the module operations to the server configuration file instead of a running or
+embedded server. The cli operations are parsed with a disconnected jboss command context and executed against the
+xml of the supported resources: interfaces, socket bindings and the datasources, undertow, jgroups and infinispan
+subsystems. Anything else in the file is left untouched. The file is written back atomically when the connection
+is closed.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import re
+import stat
+import tempfile
+import time
+
+from jyboss.context import Connection, MODE_OFFLINE, replace_file
+from jyboss.exceptions import ContextError, CommandError
+from jyboss.logging import debug
+from jyboss.startup import StartupProfile
+from jyboss.command.core import dmr_address, address_to_path
+from jyboss.command.datasources import DatasourcesModule
+from jyboss.command.interface import InterfaceModule
+from jyboss.command.binding import SocketBindingModule
+from jyboss.command.undertow import UndertowHttpListenerModule, UndertowAjpListenerModule
+from jyboss.command.jgroups import JGroupsModule, JGroupsStackModule, JGroupsChannelModule
+from jyboss.command.infinispan import CacheContainerModule, TransportModule
+
+try:
+    from java.lang import IllegalStateException
+    from java.io import File, FileOutputStream, OutputStreamWriter
+    from javax.xml.parsers import DocumentBuilderFactory
+    from javax.xml.transform import TransformerFactory, OutputKeys
+    from javax.xml.transform.dom import DOMSource
+    from javax.xml.transform.stream import StreamResult
+    from org.w3c.dom import Node
+except ImportError as jpe:
+    raise ContextError('Java packages are not available, please run this module with jython.', jpe)
+
+__metaclass__ = type
+
+
+class XmlResource(object):
+    """
+    maps a management resource type onto the elements of the server configuration file
+    """
+
+    def __init__(self, type, element=None, container=None, name_attr='name', names=None, attributes=None,
+                 locations=None, lists=None, text=None, strict=False, children=None):
+        """
+        :param type: {str} - the management resource type
+        :param element: {str} - local name of the xml element, defaults to the type
+        :param container: {str} - path of wrapper elements between the parent element and the resource elements
+        :param name_attr: {str} - xml attribute that holds the resource name
+        :param names: {dict} - resource name to element name of singleton resources which are identified by element
+        :param attributes: {list(str)} - the resource attributes, absent ones are reported as undefined
+        :param locations: {dict} - attribute to xml location, @attr, elem/elem, elem@attr or elem? for presence flags,
+                          attributes without a location are xml attributes of the resource element
+        :param lists: {dict} - list attribute to the separator used in the xml attribute
+        :param text: {str} - attribute that is stored as the text of the resource element
+        :param strict: {bool} - only attributes with a location or in the attribute list can be managed
+        :param children: {list(XmlResource)} - the child resource types
+        """
+        self.type = type
+        self.element = type if element is None else element
+        self.container = [] if container is None else container.split('/')
+        self.name_attr = None if names is not None else name_attr
+        self.names = names
+        self.attributes = [] if attributes is None else list(attributes)
+        self.locations = {} if locations is None else locations
+        self.lists = {} if lists is None else lists
+        self.text = text
+        self.strict = strict
+        self.children = dict((c.type, c) for c in ([] if children is None else children))
+
+    def element_name(self, name):
+        if self.names is None:
+            return self.element
+        return self.names.get(name)
+
+    def is_attribute(self, name):
+        return not self.strict or name in self.attributes or name in self.locations or name == self.text
+
+    def location(self, name):
+        if name == self.text:
+            return [], None, False
+        loc = self.locations.get(name, '@' + name)
+        flag = loc.endswith('?')
+        if flag:
+            loc = loc[:-1]
+        path, _, attr = loc.partition('@')
+        return [p for p in path.split('/') if p], attr if attr else None, flag
+
+
+_PROPERTY = XmlResource('property', text='value', attributes=['value'], strict=True)
+
+_DATASOURCE_LOCATIONS = {
+    'connection-url': 'connection-url',
+    'driver-class': 'driver-class',
+    'datasource-class': 'datasource-class',
+    'driver-name': 'driver',
+    'url-delimiter': 'url-delimiter',
+    'url-selector-strategy-class-name': 'url-selector-strategy-class-name',
+    'new-connection-sql': 'new-connection-sql',
+    'transaction-isolation': 'transaction-isolation',
+    'min-pool-size': 'pool/min-pool-size',
+    'initial-pool-size': 'pool/initial-pool-size',
+    'max-pool-size': 'pool/max-pool-size',
+    'pool-prefill': 'pool/prefill',
+    'pool-fair': 'pool/fair',
+    'pool-use-strict-min': 'pool/use-strict-min',
+    'flush-strategy': 'pool/flush-strategy',
+    'allow-multiple-users': 'pool/allow-multiple-users?',
+    'user-name': 'security/user-name',
+    'password': 'security/password',
+    'security-domain': 'security/security-domain',
+    'reauth-plugin-class-name': 'security/reauth-plugin@class-name',
+    'valid-connection-checker-class-name': 'validation/valid-connection-checker@class-name',
+    'check-valid-connection-sql': 'validation/check-valid-connection-sql',
+    'validate-on-match': 'validation/validate-on-match',
+    'background-validation': 'validation/background-validation',
+    'background-validation-millis': 'validation/background-validation-millis',
+    'use-fast-fail': 'validation/use-fast-fail',
+    'stale-connection-checker-class-name': 'validation/stale-connection-checker@class-name',
+    'exception-sorter-class-name': 'validation/exception-sorter@class-name',
+    'set-tx-query-timeout': 'timeout/set-tx-query-timeout?',
+    'blocking-timeout-wait-millis': 'timeout/blocking-timeout-millis',
+    'idle-timeout-minutes': 'timeout/idle-timeout-minutes',
+    'query-timeout': 'timeout/query-timeout',
+    'use-try-lock': 'timeout/use-try-lock',
+    'allocation-retry': 'timeout/allocation-retry',
+    'allocation-retry-wait-millis': 'timeout/allocation-retry-wait-millis',
+    'xa-resource-timeout': 'timeout/xa-resource-timeout',
+    'track-statements': 'statement/track-statements',
+    'prepared-statements-cache-size': 'statement/prepared-statement-cache-size',
+    'share-prepared-statements': 'statement/share-prepared-statements?',
+    'recovery-username': 'recovery/recover-credential/user-name',
+    'recovery-password': 'recovery/recover-credential/password',
+    'recovery-security-domain': 'recovery/recover-credential/security-domain',
+    'recovery-plugin-class-name': 'recovery/recover-plugin@class-name',
+    'no-recovery': 'recovery@no-recovery',
+    'jndi-name': '@jndi-name',
+    'pool-name': '@pool-name',
+    'enabled': '@enabled',
+    'use-java-context': '@use-java-context',
+    'spy': '@spy',
+    'use-ccm': '@use-ccm',
+    'jta': '@jta',
+    'connectable': '@connectable',
+    'tracking': '@tracking',
+    'statistics-enabled': '@statistics-enabled',
+    'enlistment-trace': '@enlistment-trace',
+    'mcp': '@mcp'
+}
+
+# xa datasources keep the pool settings in an xa-pool element together with the xa specific settings
+_XA_DATASOURCE_LOCATIONS = dict(
+    [(k, v.replace('pool/', 'xa-pool/', 1) if v.startswith('pool/') else v) for k, v in _DATASOURCE_LOCATIONS.items()
+     if k not in ['connection-url', 'driver-class', 'datasource-class', 'jta']] + [
+        ('xa-datasource-class', 'xa-datasource-class'),
+        ('same-rm-override', 'xa-pool/is-same-rm-override'),
+        ('interleaving', 'xa-pool/interleaving?'),
+        ('pad-xid', 'xa-pool/pad-xid'),
+        ('wrap-xa-resource', 'xa-pool/wrap-xa-resource'),
+        ('no-tx-separate-pool', 'xa-pool/no-tx-separate-pools?')
+    ])
+
+_DATASOURCES = XmlResource('subsystem', strict=True, children=[
+    XmlResource('data-source', element='datasource', container='datasources', name_attr='pool-name',
+                attributes=DatasourcesModule.DATASOURCE_PARAMS, locations=_DATASOURCE_LOCATIONS, strict=True,
+                children=[XmlResource('connection-properties', element='connection-property', text='value',
+                                      attributes=['value'], strict=True)]),
+    XmlResource('xa-data-source', element='xa-datasource', container='datasources', name_attr='pool-name',
+                attributes=DatasourcesModule.DATASOURCE_PARAMS, locations=_XA_DATASOURCE_LOCATIONS, strict=True,
+                children=[XmlResource('xa-datasource-properties', element='xa-datasource-property', text='value',
+                                      attributes=['value'], strict=True)]),
+    XmlResource('jdbc-driver', element='driver', container='datasources/drivers',
+                attributes=DatasourcesModule.JDBC_DRIVER_PARAMS, strict=True, locations={
+                    'driver-name': '@name',
+                    'driver-module-name': '@module',
+                    'module-slot': '@slot',
+                    'driver-major-version': '@major-version',
+                    'driver-minor-version': '@minor-version',
+                    'driver-class-name': 'driver-class',
+                    'driver-datasource-class-name': 'datasource-class',
+                    'driver-xa-datasource-class-name': 'xa-datasource-class',
+                    'xa-datasource-class': 'xa-datasource-class'
+                })
+])
+
+_UNDERTOW = XmlResource('subsystem', strict=True, children=[
+    XmlResource('server', attributes=['default-host', 'servlet-container'], children=[
+        XmlResource('http-listener', attributes=UndertowHttpListenerModule.LISTENER_PARAMS),
+        XmlResource('https-listener', attributes=UndertowHttpListenerModule.LISTENER_PARAMS + ['security-realm']),
+        XmlResource('ajp-listener', attributes=UndertowAjpListenerModule.LISTENER_PARAMS),
+        XmlResource('host', attributes=['alias', 'default-web-module', 'default-response-code'], lists={'alias': ','},
+                    children=[XmlResource('filter-ref', attributes=['priority', 'predicate']),
+                              XmlResource('location', attributes=['handler'])])
+    ])
+])
+
+_JGROUPS = XmlResource('subsystem', attributes=JGroupsModule.JGROUPS_PARAMS, strict=True, locations={
+    'default-channel': 'channels@default',
+    'default-stack': 'stacks@default'
+}, children=[
+    XmlResource('channel', container='channels', attributes=JGroupsChannelModule.CHANNEL_PARAMS),
+    XmlResource('stack', container='stacks', attributes=['statistics-enabled'], children=[
+        XmlResource('transport', name_attr='type', attributes=JGroupsStackModule.TRANSPORT_PARAMS,
+                    children=[_PROPERTY]),
+        XmlResource('protocol', name_attr='type', attributes=JGroupsStackModule.PROTOCOL_PARAMS,
+                    children=[_PROPERTY])
+    ])
+])
+
+_CACHE_COMPONENTS = ['locking', 'transaction', 'eviction', 'expiration', 'partition-handling', 'state-transfer']
+
+_CACHE_ATTRIBUTES = ['jndi-name', 'module', 'statistics-enabled', 'mode', 'queue-size', 'queue-flush-interval',
+                     'remote-timeout', 'owners', 'segments', 'l1-lifespan', 'capacity-factor',
+                     'consistent-hash-strategy']
+
+_INFINISPAN = XmlResource('subsystem', strict=True, children=[
+    XmlResource('cache-container', attributes=CacheContainerModule.CONTAINER_PARAMS, lists={'aliases': ' '},
+                children=[XmlResource('transport', names={'TRANSPORT': 'transport'},
+                                      attributes=TransportModule.TRANSPORT_PARAMS)] + [
+                    XmlResource(cache_type, attributes=_CACHE_ATTRIBUTES, children=[
+                        XmlResource('component', names=dict((c, c) for c in _CACHE_COMPONENTS))])
+                    for cache_type in ['local-cache', 'invalidation-cache', 'replicated-cache', 'distributed-cache']])
+])
+
+_SUBSYSTEMS = {
+    'datasources': _DATASOURCES,
+    'undertow': _UNDERTOW,
+    'jgroups': _JGROUPS,
+    'infinispan': _INFINISPAN
+}
+
+_ROOT = XmlResource('server', strict=True, children=[
+    XmlResource('interface', container='interfaces', attributes=InterfaceModule.INTERFACE_PARAMS, strict=True,
+                locations={
+                    'inet-address': 'inet-address@value',
+                    'loopback-address': 'loopback-address@value',
+                    'nic': 'nic@name',
+                    'nic-match': 'nic-match@pattern',
+                    'subnet-match': 'subnet-match@value',
+                    'any-address': 'any-address?',
+                    'link-local-address': 'link-local-address?',
+                    'loopback': 'loopback?',
+                    'multicast': 'multicast?',
+                    'point-to-point': 'point-to-point?',
+                    'public-address': 'public-address?',
+                    'site-local-address': 'site-local-address?',
+                    'up': 'up?',
+                    'virtual': 'virtual?'
+                }),
+    XmlResource('socket-binding-group', attributes=['default-interface', 'port-offset'], children=[
+        XmlResource('socket-binding',
+                    attributes=SocketBindingModule.BINDING_PARAMS + ['fixed-port', 'multicast-address',
+                                                                    'multicast-port'])
+    ])
+])
+
+# schema order of child elements by parent element, new elements are inserted at their position in this order
+_ELEMENT_ORDER = {
+    'server': ['extensions', 'system-properties', 'management', 'profile', 'interfaces', 'socket-binding-group',
+               'deployments'],
+    'subsystem': ['channels', 'stacks', 'datasources', 'buffer-cache', 'server', 'servlet-container', 'handlers',
+                  'filters', 'cache-container'],
+    'datasources': ['datasource', 'xa-datasource', 'drivers'],
+    'datasource': ['connection-url', 'driver-class', 'datasource-class', 'connection-property', 'driver',
+                   'url-delimiter', 'url-selector-strategy-class-name', 'new-connection-sql', 'transaction-isolation',
+                   'pool', 'security', 'validation', 'timeout', 'statement'],
+    'xa-datasource': ['xa-datasource-property', 'xa-datasource-class', 'driver', 'url-delimiter',
+                      'url-selector-strategy-class-name', 'new-connection-sql', 'transaction-isolation', 'xa-pool',
+                      'security', 'validation', 'timeout', 'statement', 'recovery'],
+    'pool': ['min-pool-size', 'initial-pool-size', 'max-pool-size', 'prefill', 'fair', 'use-strict-min',
+             'flush-strategy', 'allow-multiple-users'],
+    'xa-pool': ['min-pool-size', 'initial-pool-size', 'max-pool-size', 'prefill', 'fair', 'use-strict-min',
+                'flush-strategy', 'allow-multiple-users', 'is-same-rm-override', 'interleaving',
+                'no-tx-separate-pools', 'pad-xid', 'wrap-xa-resource'],
+    'security': ['user-name', 'password', 'security-domain', 'reauth-plugin'],
+    'validation': ['valid-connection-checker', 'check-valid-connection-sql', 'validate-on-match',
+                   'background-validation', 'background-validation-millis', 'use-fast-fail',
+                   'stale-connection-checker', 'exception-sorter'],
+    'timeout': ['set-tx-query-timeout', 'blocking-timeout-millis', 'idle-timeout-minutes', 'query-timeout',
+                'use-try-lock', 'allocation-retry', 'allocation-retry-wait-millis', 'xa-resource-timeout'],
+    'statement': ['track-statements', 'prepared-statement-cache-size', 'share-prepared-statements'],
+    'recovery': ['recover-credential', 'recover-plugin'],
+    'driver': ['driver-class', 'datasource-class', 'xa-datasource-class'],
+    'server-undertow': ['http-listener', 'https-listener', 'ajp-listener', 'host'],
+    'socket-binding-group': ['socket-binding', 'outbound-socket-binding'],
+    'stack': ['transport', 'protocol'],
+    'cache-container': ['transport'],
+    'interface': ['inet-address', 'loopback-address', 'nic', 'nic-match', 'subnet-match', 'any-address',
+                  'link-local-address', 'loopback', 'multicast', 'point-to-point', 'public-address',
+                  'site-local-address', 'up', 'virtual'],
+    'cache': ['locking', 'transaction', 'eviction', 'expiration', 'partition-handling', 'state-transfer']
+}
+
+_SUBSYSTEM_NAMESPACE = re.compile('^urn:jboss:domain:([^:]+):')
+
+_INTEGER = re.compile('^-?[0-9]+$')
+
+_IGNORED_PARAMETERS = ['operation', 'address', 'operation-headers', 'add-index']
+
+
+class _OperationFailure(Exception):
+    pass
+
+
+def _not_found(address):
+    return _OperationFailure("WFLYCTL0216: Management resource '%s' not found" % address_to_path(address))
+
+
+def _elements(parent, local_name=None):
+    nodes = parent.getChildNodes()
+    return [nodes.item(i) for i in range(nodes.getLength())
+            if nodes.item(i).getNodeType() == Node.ELEMENT_NODE and
+            (local_name is None or nodes.item(i).getLocalName() == local_name)]
+
+
+def _is_whitespace(node):
+    return node is not None and node.getNodeType() == Node.TEXT_NODE and node.getNodeValue().strip() == ''
+
+
+def _indent_of(node):
+    prev = node.getPreviousSibling()
+    if _is_whitespace(prev):
+        text = prev.getNodeValue()
+        return text[text.rfind('\n') + 1:]
+    return ''
+
+
+def _order_key(parent):
+    name = parent.getLocalName()
+    if name == 'server' and parent.getParentNode().getNodeType() != Node.DOCUMENT_NODE:
+        return 'server-undertow'
+    if name in ['local-cache', 'invalidation-cache', 'replicated-cache', 'distributed-cache']:
+        return 'cache'
+    return name
+
+
+def _insert(parent, child, add_index=None):
+    """
+    insert an element at its schema position and indent it like its siblings
+    """
+    doc = parent.getOwnerDocument()
+    tag = child.getLocalName()
+    children = _elements(parent)
+    same = [c for c in children if c.getLocalName() == tag]
+    order = _ELEMENT_ORDER.get(_order_key(parent), [])
+
+    before = None
+    if add_index is not None and add_index < len(same):
+        before = same[add_index]
+    elif len(same) > 0:
+        i = children.index(same[-1])
+        before = children[i + 1] if i + 1 < len(children) else None
+    elif tag in order:
+        position = order.index(tag)
+        for c in children:
+            c_position = order.index(c.getLocalName()) if c.getLocalName() in order else len(order)
+            if c_position > position:
+                before = c
+                break
+
+    indent = _indent_of(children[0]) if len(children) > 0 else _indent_of(parent) + '    '
+    if before is not None:
+        parent.insertBefore(child, before)
+        parent.insertBefore(doc.createTextNode('\n' + indent), before)
+    else:
+        last = parent.getLastChild()
+        if _is_whitespace(last):
+            parent.insertBefore(doc.createTextNode('\n' + indent), last)
+            parent.insertBefore(child, last)
+        else:
+            parent.appendChild(doc.createTextNode('\n' + indent))
+            parent.appendChild(child)
+            parent.appendChild(doc.createTextNode('\n' + _indent_of(parent)))
+
+
+def _remove(element):
+    parent = element.getParentNode()
+    prev = element.getPreviousSibling()
+    if _is_whitespace(prev):
+        parent.removeChild(prev)
+    parent.removeChild(element)
+
+
+def _is_empty(element):
+    return element.getAttributes().getLength() == 0 and len(_elements(element)) == 0 \
+           and element.getTextContent().strip() == ''
+
+
+def _child(parent, local_name, create=False):
+    found = _elements(parent, local_name)
+    if len(found) > 0:
+        return found[0]
+    if not create:
+        return None
+    element = parent.getOwnerDocument().createElementNS(parent.getNamespaceURI(), local_name)
+    _insert(parent, element)
+    return element
+
+
+def _to_dmr(node, value, separator=None):
+    """
+    set the xml string value on a dmr node, xml has no types so booleans and numbers are recognised by their format
+    """
+    if separator is not None:
+        node.setEmptyList()
+        for item in [v.strip() for v in value.split(separator) if v.strip() != '']:
+            node.add(item)
+    elif '${' in value:
+        node.setExpression(value)
+    elif value in ['true', 'false']:
+        node.set(value == 'true')
+    elif _INTEGER.match(value) and -2147483648 <= long(value) <= 2147483647:
+        node.set(int(value))
+    else:
+        node.set(value)
+
+
+def _from_dmr(node, separator=None):
+    t = node.getType()
+    if t == t.UNDEFINED:
+        return None
+    elif t == t.LIST:
+        if separator is None:
+            raise _OperationFailure('list values can only be written to list attributes in offline mode')
+        return separator.join(item.asString() for item in node.asList())
+    elif t in [t.OBJECT, t.PROPERTY]:
+        raise _OperationFailure('complex attribute values are not supported in offline mode')
+    else:
+        return node.asString()
+
+
+class XmlModel(object):
+    """
+    executes management operations on the dom of a server configuration file
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.dirty = False
+
+    @staticmethod
+    def load(config_path):
+        factory = DocumentBuilderFactory.newInstance()
+        factory.setNamespaceAware(True)
+        document = factory.newDocumentBuilder().parse(File(config_path))
+        return XmlModel(document)
+
+    def save(self, config_path):
+        """
+        Write the model to a temporary file next to the configuration and move it in place.
+        """
+        fd, tmp_path = tempfile.mkstemp(prefix='.%s.' % os.path.basename(config_path),
+                                        dir=os.path.dirname(os.path.abspath(config_path)))
+        os.close(fd)
+        try:
+            writer = OutputStreamWriter(FileOutputStream(tmp_path), 'UTF-8')
+            try:
+                writer.write("<?xml version='1.0' encoding='UTF-8'?>\n\n")
+                transformer = TransformerFactory.newInstance().newTransformer()
+                transformer.setOutputProperty(OutputKeys.OMIT_XML_DECLARATION, 'yes')
+                transformer.setOutputProperty(OutputKeys.ENCODING, 'UTF-8')
+                transformer.transform(DOMSource(self.document), StreamResult(writer))
+            finally:
+                writer.close()
+            if os.path.exists(config_path):
+                os.chmod(tmp_path, stat.S_IMODE(os.stat(config_path).st_mode))
+            replace_file(tmp_path, config_path)
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.dirty = False
+
+    # region address resolution
+    def _subsystem(self, server, name):
+        profile = _child(server, 'profile')
+        if profile is None:
+            return None
+        for element in _elements(profile, 'subsystem'):
+            m = _SUBSYSTEM_NAMESPACE.match(element.getNamespaceURI() or '')
+            if m is not None and m.group(1) == name:
+                return element
+        return None
+
+    def _container(self, parent, spec, create=False):
+        for local_name in spec.container:
+            parent = _child(parent, local_name, create=create)
+            if parent is None:
+                return None
+        return parent
+
+    def _find(self, parent, spec, name):
+        container = self._container(parent, spec)
+        if container is None:
+            return None
+        element_name = spec.element_name(name)
+        if element_name is None:
+            return None
+        for element in _elements(container, element_name):
+            if spec.name_attr is None or element.getAttribute(spec.name_attr) == name:
+                return element
+        return None
+
+    def _child_names(self, parent, spec):
+        container = self._container(parent, spec)
+        if container is None:
+            return []
+        if spec.names is not None:
+            return [n for n, e in spec.names.items() if len(_elements(container, e)) > 0]
+        return [e.getAttribute(spec.name_attr) for e in _elements(container, spec.element)]
+
+    def _child_spec(self, spec, address, child_type, name=None):
+        if spec is _ROOT and child_type == 'subsystem':
+            if name is None or name not in _SUBSYSTEMS:
+                raise _OperationFailure('WFLYCTL0030: No resource definition is registered for address %s, only the '
+                                        '%s subsystems can be managed in offline mode' %
+                                        (address_to_path(address), ', '.join(sorted(_SUBSYSTEMS.keys()))))
+            return _SUBSYSTEMS[name]
+        if child_type not in spec.children:
+            raise _OperationFailure('WFLYCTL0030: No resource definition is registered for address %s in offline mode'
+                                    % address_to_path(address))
+        return spec.children[child_type]
+
+    def _resolve(self, address):
+        """
+        :return: {tuple} - the resource spec and element of the address
+        """
+        spec = _ROOT
+        element = self.document.getDocumentElement()
+        for i, (child_type, name) in enumerate(address):
+            child_spec = self._child_spec(spec, address[:i + 1], child_type, name)
+            if spec is _ROOT and child_type == 'subsystem':
+                child = self._subsystem(element, name)
+            else:
+                child = self._find(element, child_spec, name)
+            if child is None:
+                raise _not_found(address[:i + 1])
+            spec, element = child_spec, child
+        return spec, element
+
+    # endregion
+
+    # region attribute access
+    def _attribute_names(self, spec, element):
+        names = list(spec.attributes)
+        if not spec.strict:
+            attrs = element.getAttributes()
+            for i in range(attrs.getLength()):
+                name = attrs.item(i).getName()
+                if name != spec.name_attr and not name.startswith('xmlns') and name not in names:
+                    names.append(name)
+        return names
+
+    def _read_attribute(self, spec, element, name, node):
+        path, attr, flag = spec.location(name)
+        for local_name in path:
+            element = _child(element, local_name)
+            if element is None:
+                return
+        if flag:
+            node.set(True)
+        elif attr is not None:
+            if element.hasAttribute(attr):
+                _to_dmr(node, element.getAttribute(attr), spec.lists.get(name))
+        else:
+            _to_dmr(node, element.getTextContent().strip())
+
+    def _write_attribute(self, spec, element, name, value):
+        if not spec.is_attribute(name):
+            raise _OperationFailure("WFLYCTL0201: Unknown attribute '%s', it cannot be managed in offline mode" % name)
+        path, attr, flag = spec.location(name)
+        xml_value = _from_dmr(value, spec.lists.get(name))
+
+        if flag:
+            xml_value = None if xml_value is None or xml_value == 'false' else xml_value
+
+        if xml_value is None:
+            self._undefine_attribute(element, path, attr, flag)
+            return
+
+        if attr is not None and len(path) == 0 and attr == spec.name_attr:
+            if xml_value != element.getAttribute(attr):
+                raise _OperationFailure('attribute %s is the resource name and cannot be changed' % name)
+            return
+
+        for local_name in path:
+            element = _child(element, local_name, create=True)
+        if flag:
+            pass
+        elif attr is not None:
+            element.setAttribute(attr, xml_value)
+        else:
+            element.setTextContent(xml_value)
+        self.dirty = True
+
+    def _undefine_attribute(self, element, path, attr, flag):
+        trail = [element]
+        for local_name in path:
+            element = _child(element, local_name)
+            if element is None:
+                return
+            trail.append(element)
+        if flag or (attr is None and len(path) > 0):
+            _remove(trail.pop())
+        elif attr is not None and element.hasAttribute(attr):
+            element.removeAttribute(attr)
+        elif attr is None:
+            element.setTextContent('')
+        # remove wrapper elements that were only there to hold the attribute
+        while len(trail) > 1 and _is_empty(trail[-1]):
+            _remove(trail.pop())
+        self.dirty = True
+
+    # endregion
+
+    def _read_resource(self, spec, element, recursive, attributes_only=False):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        node = ModelNode()
+        node.setEmptyObject()
+        for name in self._attribute_names(spec, element):
+            self._read_attribute(spec, element, name, node.get(name))
+        if attributes_only:
+            return node
+        if spec is _ROOT:
+            subsystems = node.get('subsystem')
+            for name in sorted(_SUBSYSTEMS.keys()):
+                child = self._subsystem(element, name)
+                if child is not None:
+                    if recursive:
+                        subsystems.get(name).set(self._read_resource(_SUBSYSTEMS[name], child, recursive))
+                    else:
+                        subsystems.get(name)
+        for child_type, child_spec in spec.children.items():
+            children = node.get(child_type)
+            for name in self._child_names(element, child_spec):
+                if recursive:
+                    children.get(name).set(
+                        self._read_resource(child_spec, self._find(element, child_spec, name), recursive))
+                else:
+                    children.get(name)
+        return node
+
+    def execute(self, request):
+        """
+        Execute a management operation.
+
+        :param request: {ModelNode} - the operation request
+        :return: {ModelNode} - the operation response with outcome and result or failure-description
+        """
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        response = ModelNode()
+        operation = request.get('operation').asString()
+        if operation == 'composite':
+            return self._composite(request)
+        try:
+            result = self._execute(operation, dmr_address(request), request)
+            response.get('outcome').set('success')
+            if result is not None:
+                response.get('result').set(result)
+        except _OperationFailure as e:
+            response.get('outcome').set('failed')
+            response.get('failure-description').set(e.message)
+            response.get('rolled-back').set(True)
+        return response
+
+    def _composite(self, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        response = ModelNode()
+        snapshot = self.document.cloneNode(True)
+        dirty = self.dirty
+        failed = []
+        steps = request.get('steps').asList()
+        for i in range(steps.size()):
+            step_response = self.execute(steps.get(i))
+            response.get('result').get('step-%d' % (i + 1)).set(step_response)
+            if step_response.get('outcome').asString() != 'success':
+                failed.append('step-%d: %s' % (i + 1, step_response.get('failure-description').asString()))
+                break
+        if len(failed) > 0:
+            # roll back all steps of the composite
+            self.document = snapshot
+            self.dirty = dirty
+            response.get('outcome').set('failed')
+            response.get('failure-description').set(
+                'WFLYCTL0062: Composite operation failed and was rolled back. Steps that failed: %s' % failed[0])
+            response.get('rolled-back').set(True)
+        else:
+            response.get('outcome').set('success')
+        return response
+
+    def _execute(self, operation, address, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+
+        if operation in ['reload', 'shutdown'] and len(address) == 0:
+            debug('%s: %s has no effect in offline mode' % (self.__class__.__name__, operation))
+            return None
+
+        if operation == 'add':
+            return self._add(address, request)
+
+        spec, element = self._resolve(address)
+
+        if operation == 'read-resource':
+            recursive = request.get('recursive').asBoolean(False) if request.has('recursive') else False
+            attributes_only = request.get('attributes-only').asBoolean(False) \
+                if request.has('attributes-only') else False
+            return self._read_resource(spec, element, recursive, attributes_only)
+
+        elif operation == 'read-attribute':
+            name = request.get('name').asString()
+            if name not in self._attribute_names(spec, element) and not spec.is_attribute(name):
+                raise _OperationFailure("WFLYCTL0201: Unknown attribute '%s'" % name)
+            node = ModelNode()
+            self._read_attribute(spec, element, name, node)
+            return node
+
+        elif operation == 'write-attribute':
+            self._write_attribute(spec, element, request.get('name').asString(),
+                                  request.get('value') if request.has('value') else ModelNode())
+            return None
+
+        elif operation == 'undefine-attribute':
+            self._write_attribute(spec, element, request.get('name').asString(), ModelNode())
+            return None
+
+        elif operation == 'remove':
+            if len(address) == 0 or spec is _ROOT or (len(address) == 1 and address[0][0] == 'subsystem'):
+                raise _OperationFailure('%s cannot be removed in offline mode' % address_to_path(address))
+            _remove(element)
+            self.dirty = True
+            return None
+
+        elif operation == 'read-children-names':
+            child_type = request.get('child-type').asString()
+            result = ModelNode()
+            result.setEmptyList()
+            if spec is _ROOT and child_type == 'subsystem':
+                names = [n for n in sorted(_SUBSYSTEMS.keys()) if self._subsystem(element, n) is not None]
+            else:
+                names = self._child_names(element, self._child_spec(spec, address, child_type))
+            for name in names:
+                result.add(name)
+            return result
+
+        elif operation == 'read-children-types':
+            result = ModelNode()
+            result.setEmptyList()
+            for child_type in sorted(list(spec.children.keys()) + (['subsystem'] if spec is _ROOT else [])):
+                result.add(child_type)
+            return result
+
+        elif operation in ['list-add', 'list-remove', 'list-clear']:
+            return self._list_operation(operation, spec, element, request)
+
+        else:
+            raise _OperationFailure("WFLYCTL0031: No operation named '%s' exists at address %s in offline mode" %
+                                    (operation, address_to_path(address)))
+
+    def _add(self, address, request):
+        if len(address) == 0:
+            raise _OperationFailure('WFLYCTL0212: Duplicate resource %s' % address_to_path(address))
+        parent_spec, parent = self._resolve(address[:-1])
+        child_type, name = address[-1]
+        spec = self._child_spec(parent_spec, address, child_type, name)
+        if parent_spec is _ROOT and child_type == 'subsystem':
+            if self._subsystem(parent, name) is not None:
+                raise _OperationFailure('WFLYCTL0212: Duplicate resource %s' % address_to_path(address))
+            raise _OperationFailure('subsystem %s cannot be added in offline mode' % name)
+        if self._find(parent, spec, name) is not None:
+            raise _OperationFailure('WFLYCTL0212: Duplicate resource %s' % address_to_path(address))
+        element_name = spec.element_name(name)
+        if element_name is None:
+            raise _OperationFailure('WFLYCTL0030: No resource definition is registered for address %s in offline mode'
+                                    % address_to_path(address))
+
+        container = self._container(parent, spec, create=True)
+        element = self.document.createElementNS(container.getNamespaceURI(), element_name)
+        if spec.name_attr is not None:
+            element.setAttribute(spec.name_attr, name)
+        add_index = request.get('add-index').asInt() if request.has('add-index') else None
+        _insert(container, element, add_index)
+        for key in request.keys():
+            if key not in _IGNORED_PARAMETERS and request.get(key).isDefined():
+                self._write_attribute(spec, element, key, request.get(key))
+        self.dirty = True
+        return None
+
+    def _list_operation(self, operation, spec, element, request):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        name = request.get('name').asString()
+        if name not in spec.lists:
+            raise _OperationFailure('%s is only supported on list attributes in offline mode' % operation)
+        current = ModelNode()
+        self._read_attribute(spec, element, name, current)
+        items = [] if not current.isDefined() else [item.asString() for item in current.asList()]
+        if operation == 'list-clear':
+            items = []
+        elif operation == 'list-add':
+            value = request.get('value').asString()
+            index = request.get('index').asInt() if request.has('index') else len(items)
+            items.insert(index, value)
+        elif request.has('index'):
+            del items[request.get('index').asInt()]
+        else:
+            items = [item for item in items if item != request.get('value').asString()]
+        value = ModelNode()
+        if len(items) > 0:
+            for item in items:
+                value.add(item)
+        self._write_attribute(spec, element, name, value)
+        return None
+
+
+class OfflineCli(object):
+    """
+    a drop in for the jyboss Cli that executes the operations on a server configuration file
+    """
+
+    def __init__(self, config_path):
+        self.config_path = config_path
+        self.ctx = None
+        self.model = None
+        # records the management operations if set, see jyboss.stats.OperationStats
+        self.stats = None
+
+    def is_silent(self):
+        return True
+
+    def set_silent(self, flag=True):
+        pass
+
+    def is_connected(self):
+        return self.model is not None
+
+    def check_not_connected(self):
+        if self.model is None:
+            raise IllegalStateException("Not connected to configuration file.")
+
+    def get_command_context(self):
+        return self.ctx
+
+    def connect(self):
+        if self.model is not None:
+            raise IllegalStateException("Already connected to configuration file.")
+        if not os.path.isfile(self.config_path):
+            raise ContextError('server configuration %s does not exist' % self.config_path)
+        # noinspection PyUnresolvedReferences
+        from org.jboss.as.cli import CommandContextFactory
+        # a command context that is never connected is only used to parse the cli operations
+        self.ctx = CommandContextFactory.getInstance().newCommandContext()
+        self.model = XmlModel.load(self.config_path)
+        debug('%s: loaded %s' % (self.__class__.__name__, self.config_path))
+
+    def save(self):
+        """
+        Write the configuration file if an operation changed the model.
+        """
+        self.check_not_connected()
+        if self.model.dirty:
+            self.model.save(self.config_path)
+            debug('%s: saved %s' % (self.__class__.__name__, self.config_path))
+
+    def disconnect(self):
+        try:
+            self.check_not_connected()
+        finally:
+            if self.ctx is not None:
+                self.ctx.terminateSession()
+            self.ctx = None
+            self.model = None
+
+    def build_request(self, cli_command):
+        self.check_not_connected()
+        # noinspection PyUnresolvedReferences
+        from org.jboss.as.cli import CommandFormatException
+        try:
+            return self.ctx.buildRequest(cli_command)
+        except CommandFormatException as cfe:
+            raise CommandError("Command is not a management operation: %s" % cli_command, cfe)
+
+    def _execute(self, request):
+        start = time.time()
+        response = self.model.execute(request)
+        if self.stats is not None:
+            self.stats.record(request, response, time.time() - start)
+        return response
+
+    def cmd(self, cli_command):
+        self.check_not_connected()
+        from jyboss.cli import Result
+        command = cli_command.strip()
+        if command == 'ls' or command.startswith('ls '):
+            return Result(cli_command, response=self._ls(command[2:].strip()))
+        elif command == 'cd' or command.startswith('cd '):
+            return self._cd(cli_command, command[2:].strip())
+        request = self.build_request(cli_command)
+        return Result(cli_command, request=request, response=self._execute(request))
+
+    def cmd_composite(self, cli_commands):
+        self.check_not_connected()
+        from jyboss.cli import Result
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        request = ModelNode()
+        request.get('operation').set('composite')
+        request.get('address').setEmptyList()
+        steps = request.get('steps')
+        steps.setEmptyList()
+        for cli_command in cli_commands:
+            steps.add(self.build_request(cli_command))
+        return Result(cli_commands, request=request, response=self._execute(request))
+
+    def cmd_async(self, cli_command):
+        from jyboss.cli import PendingResult
+        # nothing to overlap on a local file, the operation is executed as it is submitted
+        return PendingResult(cli_command, result=self.cmd(cli_command))
+
+    def cmd_upload(self, request, paths, description=None):
+        raise CommandError('content cannot be uploaded in offline mode')
+
+    def _ls(self, path):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        head, _, child_type = path.rstrip('/').rpartition('/')
+        if child_type != '' and '=' not in child_type and child_type not in ['.', '..']:
+            # listing the names of a child type, an empty address is the current node
+            parent = head if head != '' else ('/' if path.startswith('/') else '')
+            request = self.build_request('%s:read-children-names(child-type=%s)' % (parent, child_type))
+            return self.model.execute(request)
+
+        request = self.build_request('%s:read-resource' % path)
+        resource = self.model.execute(request)
+        if resource.get('outcome').asString() != 'success':
+            return resource
+        types = ModelNode()
+        types.setEmptyList()
+        attributes = ModelNode()
+        attributes.setEmptyObject()
+        for key in resource.get('result').keys():
+            if resource.get('result').get(key).getType() == resource.get('result').get(key).getType().OBJECT:
+                types.add(key)
+            else:
+                attributes.get(key).set(resource.get('result').get(key))
+        response = ModelNode()
+        response.get('outcome').set('success')
+        response.get('result').get('step-1').get('result').set(types)
+        response.get('result').get('step-2').get('result').set(attributes)
+        return response
+
+    def _cd(self, cli_command, path):
+        from jyboss.cli import Result
+        request = self.build_request('%s:read-resource' % ('/' if path == '' else path))
+        response = self.model.execute(request)
+        if response.get('outcome').asString() != 'success':
+            return Result(cli_command, request=request, response=response)
+        node_path = self.ctx.getCurrentNodePath()
+        node_path.reset()
+        for child_type, name in dmr_address(request):
+            node_path.toNode(child_type, name)
+        return Result(cli_command, exit_code=0)
+
+    def batch_start(self):
+        raise CommandError('batch mode is not supported in offline mode, use composite operations')
+
+    def batch_reset(self):
+        raise CommandError('batch mode is not supported in offline mode, use composite operations')
+
+    def batch_is_active(self):
+        return False
+
+    def batch_add_cmd(self, batch_command):
+        raise CommandError('batch mode is not supported in offline mode, use composite operations')
+
+
+class OfflineConnection(Connection):
+    """
+    a connection that manages the server configuration file directly without booting a server
+    """
+
+    def __init__(self, context=None):
+        super(OfflineConnection, self).__init__(context=context)
+
+    def get_config_path(self):
+        config_file = self.context.config_file if self.context.config_file is not None else 'standalone.xml'
+        if os.path.isabs(config_file):
+            return config_file
+        return os.path.join(self.context.get_jboss_home(), 'standalone', 'configuration', config_file)
+
+    def connect(self):
+        self.context.register_change_handler(self)
+
+        if self.jcli is not None and self.jcli.is_connected():
+            raise ContextError('%s.connect: this resource is already connected' % self.__class__.__name__)
+
+        # the jboss client libraries are needed to parse the cli operations and to build the dmr results
+        self.context.create_cli()
+        jcli = OfflineCli(self.get_config_path())
+        with StartupProfile.instance().phase('connect'):
+            jcli.connect()
+        jcli.stats = self.context.stats
+        self.jcli = jcli
+        debug('%s.connect: opened %s' % (self.__class__.__name__, jcli.config_path))
+
+    def disconnect(self):
+        # the changes only reach the configuration file here, a failed save must fail the run and not only be logged
+        # like the disconnect errors of a server connection
+        try:
+            if self.jcli is not None:
+                self.jcli.save()
+        finally:
+            super(OfflineConnection, self).disconnect()
+
+    def _connect(self, cli):
+        pass
+
+    def get_mode(self):
+        return MODE_OFFLINE
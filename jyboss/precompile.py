@@ -0,0 +1,123 @@
+"""
+Precompiled copy of the jyboss package. Jython compiles a module to a $py.class file next to its source on the first
+import, if the installation directory is not writable the module is compiled again in every process. The warm-up
+command copies the package into a cache directory in the jyboss home and compiles it there, the ansible module puts
+the cache on the path as long as the stamp of the sources it was compiled from still matches the installed package.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import sys
+import shutil
+import argparse
+import compileall
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from jyboss.context import get_jyboss_home
+
+__metaclass__ = type
+
+DEFAULT_CACHE_DIR = 'pycache'
+
+STAMP_FILE = 'stamp.json'
+
+
+def default_cache_dir():
+    return os.path.join(get_jyboss_home(), DEFAULT_CACHE_DIR)
+
+
+def package_dir():
+    """
+    :return: {str} - the directory of the installed jyboss package
+    """
+    import jyboss
+    return os.path.dirname(os.path.abspath(jyboss.__file__))
+
+
+def source_stamp(source_dir):
+    """
+    :param source_dir: {str} - the package directory
+    :return: {dict} - size and modification time of every python source of the package by relative path
+    """
+    stamp = {}
+    for root, _, files in os.walk(source_dir):
+        for name in files:
+            if name.endswith('.py'):
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                stamp[os.path.relpath(path, source_dir)] = [st.st_size, st.st_mtime]
+    return stamp
+
+
+def is_current(cache_dir=None, source_dir=None):
+    """
+    :param cache_dir: {str} - the cache directory, pycache in the jyboss home if not set
+    :param source_dir: {str} - the package directory, the installed jyboss package if not set
+    :return: {bool} - True if the cache was compiled from the sources of the package as they are now
+    """
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    source_dir = package_dir() if source_dir is None else source_dir
+    try:
+        with open(os.path.join(cache_dir, STAMP_FILE)) as f:
+            stamp = json.load(f)
+    except (IOError, ValueError):
+        return False
+    return stamp.get('source') == source_dir and stamp.get('files') == source_stamp(source_dir)
+
+
+def precompile(cache_dir=None, source_dir=None):
+    """
+    Copy the jyboss package into the cache directory and compile all its modules.
+
+    :param cache_dir: {str} - the cache directory, pycache in the jyboss home if not set
+    :param source_dir: {str} - the package directory, the installed jyboss package if not set
+    :return: {list(str)} - the compiled class files
+    """
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    source_dir = package_dir() if source_dir is None else source_dir
+    target_dir = os.path.join(cache_dir, 'jyboss')
+
+    # a stale stamp must never outlive the copy it describes
+    stamp_file = os.path.join(cache_dir, STAMP_FILE)
+    if os.path.isfile(stamp_file):
+        os.remove(stamp_file)
+    if os.path.isdir(target_dir):
+        shutil.rmtree(target_dir)
+
+    stamp = source_stamp(source_dir)
+    shutil.copytree(source_dir, target_dir, ignore=shutil.ignore_patterns('*.pyc', '*$py.class', '__pycache__'))
+    if not compileall.compile_dir(target_dir, quiet=1, force=True):
+        raise RuntimeError('failed to compile the jyboss package in %s' % target_dir)
+
+    with open(stamp_file, 'w') as f:
+        json.dump({'source': source_dir, 'files': stamp}, f)
+
+    compiled = []
+    for root, _, files in os.walk(target_dir):
+        compiled += [os.path.join(root, name) for name in files if name.endswith('$py.class') or
+                     name.endswith('.pyc')]
+    return compiled
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Precompile the jyboss package into a cache directory.')
+    parser.add_argument('--cache-dir', default=None, help='the cache directory, pycache in the jyboss home if not set')
+    parser.add_argument('--check', action='store_true', help='only check if the cache is current')
+    args = parser.parse_args(args)
+    if args.check:
+        current = is_current(args.cache_dir)
+        print('current' if current else 'stale')
+        return 0 if current else 1
+    compiled = precompile(args.cache_dir)
+    print('compiled %d modules into %s' % (len(compiled), args.cache_dir or default_cache_dir()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Execution of a jyboss instruction document (the ansible module parameters) against a context. Shared by the ansible
+module and the jyboss daemon so both produce the exact same change result.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+from jyboss.context import ConnectionResource, EmbeddedSession, MODE_EMBEDDED, MODE_STANDALONE, MODE_OFFLINE
+from jyboss.logging import debug
+from jyboss.exceptions import NotFoundError, ParameterError
+from jyboss.stats import OperationStats
+from jyboss.startup import StartupProfile
+from jyboss.content import ContentHashIndex
+from jyboss.command import ChangeObservable, escape_keys, register_handlers
+from jyboss.command.core import CommandHandler
+from jyboss.command.plan import Planner, DEFAULT_BATCH_SIZE
+from jyboss.command.scheduler import ReloadScheduler, DEFAULT_TIMEOUT
+
+__metaclass__ = type
+
+# module parameters that configure the connection to a server controller
+CONNECTION_PARAMS = ['controller_protocol', 'controller_host', 'controller_port', 'admin_username', 'admin_password']
+
+
+def create_change_processor(context):
+    """
+    Create a change processor with all known jyboss modules registered against a context. A module is only imported
+    and created once an instruction for it is processed.
+
+    :param context: {JyBossContext} - the context the modules will operate on
+    :return: {ChangeObservable} - the processor, extensions not registered will simply be ignored
+    """
+    change_processor = ChangeObservable()
+    register_handlers(change_processor, context)
+    return change_processor
+
+
+def connection_args(params):
+    """
+    Extract the controller connection arguments from the instruction parameters.
+
+    :param params: {dict} - the instruction parameters
+    :return: {dict} - keyword arguments for a ServerConnection, only contains the parameters that are set
+    """
+    args = dict((k, params[k]) for k in CONNECTION_PARAMS if params.get(k) is not None)
+    if 'controller_protocol' in args:
+        args['protocol'] = args.pop('controller_protocol')
+    return args
+
+
+def configure_context(context, params):
+    """
+    Apply the instruction parameters that configure the jyboss runtime to a context.
+
+    :param context: {JyBossContext} - the context to configure
+    :param params: {dict} - the instruction parameters
+    :return: {ConnectionResource} - the connection resource to use with the configured context
+    """
+    # set a jboss home if it is not passed in as either ENV variable or set as system property
+    if params.get('jboss_home') is not None:
+        context.jboss_home = params['jboss_home']
+        debug('jboss_home set to %s' % context.jboss_home)
+
+    if params.get('classpath_manifest') is not None:
+        context.classpath_manifest = params['classpath_manifest']
+        debug('classpath_manifest set to %s' % context.classpath_manifest)
+
+    if params.get('config_file') is not None:
+        context.config_file = params['config_file']
+        debug('config_file set to %s' % context.config_file)
+
+    if params.get('domain_mode', False):
+        debug('interact in domain mode')
+    else:
+        debug('interact in standalone mode')
+
+    if params.get('composite', False):
+        context.composite = True
+        debug('submit module writes as composite operations')
+
+    if params.get('cache', False):
+        context.cache = True
+        debug('serve resource reads from the model cache')
+
+    # a fresh recorder for every run so a reused context does not report the operations of earlier runs
+    context.stats = OperationStats() if params.get('jyboss_stats', False) else None
+
+    context.interactive = False
+
+    if params.get('offline_mode', False):
+        debug('offline connect mode')
+        return ConnectionResource(MODE_OFFLINE, context)
+    elif params.get('embedded_mode', False):
+        debug('embedded connect mode')
+        return ConnectionResource(MODE_EMBEDDED, context)
+    else:
+        debug('server connect mode')
+        return ConnectionResource(MODE_STANDALONE, context, **connection_args(params))
+
+
+def collect_facts(context, facter):
+    """
+    Read the management model of a connected context as ansible facts.
+
+    :param context: {JyBossContext} - a connected context
+    :param facter: {bool|dict} - the facts instruction, can configure path, name and recursive
+    :return: {dict} - the facts keyed by fact name, empty if the fact path does not exist
+    """
+    fact_path = '/'
+    fact_name = 'jboss'
+    fact_recursive = True
+    if isinstance(facter, dict):
+        if 'path' in facter:
+            fact_path = facter['path']
+        if 'name' in facter:
+            fact_name = facter['name']
+        if 'recursive' in facter:
+            fact_recursive = bool(facter['recursive'])
+    try:
+        facts = CommandHandler(context).cmd('%s:read-resource(recursive=%s)' % (fact_path, str(fact_recursive).lower()))
+        return {fact_name: escape_keys(facts)}
+    except NotFoundError:
+        return {}
+
+
+def execute_instructions(context, params, change_processor=None):
+    """
+    Collect facts and process the module instructions on a connected context. In check mode or if the plan parameter
+    is set the instructions are planned first, see jyboss.command.plan. The recorded management operations are
+    added to the result as jyboss_stats if the context records them, the start phases of the process as
+    jyboss_profile if the jyboss_profile parameter is set. A reload the writes require is done once at the end and
+    reported as reload, see jyboss.command.scheduler.
+
+    :param context: {JyBossContext} - a connected context
+    :param params: {dict} - the instruction parameters
+    :param change_processor: {ChangeObservable} - optional processor to reuse, one is created if not supplied
+    :return: {dict} - the module result with the changed flag, change set and facts
+    """
+    result = dict(changed=False)
+
+    if change_processor is None:
+        change_processor = create_change_processor(context)
+
+    if params.get('facts', False):
+        debug('jyboss.ansible: collecting facts')
+        facts = collect_facts(context, params['facts'])
+        if len(facts) > 0:
+            result['ansible_facts'] = facts
+
+    # reloads required by the writes are deferred and done once after all instructions, see jyboss.command.scheduler
+    scheduler = ReloadScheduler(context, timeout=params.get('reload_timeout') or DEFAULT_TIMEOUT)
+    scheduler.defer()
+    try:
+        if params.get('_ansible_check_mode', False) or params.get('plan', False):
+            # read the model once and compute all writes up front, check mode reports the plan without executing it
+            planner = Planner(context, change_processor)
+            changeset, plan = planner.plan(params)
+            if params.get('_ansible_check_mode', False):
+                result['plan'] = plan.commands()
+                if params.get('_ansible_diff', False):
+                    result['diff'] = plan.diff()
+            else:
+                planner.execute(plan, batch_size=params.get('plan_batch_size') or DEFAULT_BATCH_SIZE)
+        else:
+            changeset = change_processor.process_instructions(params)
+    except:
+        scheduler.cancel()
+        raise
+
+    # the artifact hashes computed by the modules are written once per run
+    ContentHashIndex.flush_instance()
+
+    # nothing was written in check mode
+    if params.get('_ansible_check_mode', False):
+        scheduler.cancel()
+    else:
+        reload_report = scheduler.run()
+        if reload_report is not None:
+            result['reload'] = reload_report
+            if reload_report['reloaded']:
+                result['changed'] = True
+
+    if changeset.pop('changed', False):
+        result['changed'] = True
+        for key in changeset:
+            if key in result and isinstance(result[key], list) and isinstance(changeset[key], list):
+                # merge lists of the same key
+                result[key] += changeset[key]
+            elif key in result and isinstance(result[key], list):
+                # add to result list if the change set is not a list
+                result[key].append(changeset[key])
+            elif key in result and result[key] is not None:
+                raise ParameterError(
+                    'result key [%s] is already present and would otherwise be overridden: %r' %
+                    (key, result[key]))
+            else:
+                # we just transfer the value
+                result[key] = changeset[key]
+
+    if context.stats is not None:
+        result['jyboss_stats'] = context.stats.summary()
+        if context.reuse_embedded:
+            # the boots, reuses and reloads of the embedded server kept running by this process
+            result['jyboss_stats']['embedded_server'] = EmbeddedSession.stats()
+
+    if params.get('jyboss_profile', False):
+        result['jyboss_profile'] = StartupProfile.instance().summary()
+
+    return result
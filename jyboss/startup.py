@@ -0,0 +1,97 @@
+"""
+Where the start of a jyboss process spends its time. An ansible task pays for the jvm and jython start, the import of
+jyboss, the class path setup, the cli initialisation and the controller connect before it does any work. The phases
+are timed exclusively, a phase that runs within another one is not counted twice.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import time
+import threading
+from contextlib import contextmanager
+
+from synchronize import make_synchronized
+
+__metaclass__ = type
+
+# the phases of a start in the order they happen
+PHASES = ['jvm_boot', 'jython_import', 'classpath', 'cli_init', 'connect']
+
+
+def jvm_uptime(until=None):
+    """
+    :param until: {float} - the time to measure to, now if not set
+    :return: {float} - the seconds since the jvm was started
+    """
+    # noinspection PyUnresolvedReferences
+    from java.lang.management import ManagementFactory
+    until = time.time() if until is None else until
+    return until - ManagementFactory.getRuntimeMXBean().getStartTime() / 1000.0
+
+
+class StartupProfile(object):
+    """
+    the seconds spent in each start phase of this process
+    """
+    _DEFAULT_INSTANCE = None
+
+    def __init__(self):
+        self.seconds = {}
+        # the phases in progress per thread, hosts are connected in parallel by the driver
+        self._local = threading.local()
+
+    @staticmethod
+    def instance():
+        if StartupProfile._DEFAULT_INSTANCE is None:
+            StartupProfile._DEFAULT_INSTANCE = StartupProfile()
+        return StartupProfile._DEFAULT_INSTANCE
+
+    @make_synchronized
+    def record(self, name, seconds):
+        """
+        :param name: {str} - the phase
+        :param seconds: {float} - the time spent in the phase, added to the time already recorded
+        """
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def started(self, script_start, imported=None):
+        """
+        Record the jvm boot and the jyboss import of a script.
+
+        :param script_start: {float} - the time the script started, taken before it imports anything
+        :param imported: {float} - the time the script finished its imports, now if not set
+        """
+        imported = time.time() if imported is None else imported
+        self.record('jvm_boot', jvm_uptime(script_start))
+        self.record('jython_import', imported - script_start)
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a phase, the time of phases nested in it is only counted for the nested phase.
+
+        :param name: {str} - the phase
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [time.time(), 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            elapsed = time.time() - frame[0]
+            self.record(name, elapsed - frame[1])
+            if len(stack) > 0:
+                stack[-1][1] += elapsed
+
+    @make_synchronized
+    def summary(self):
+        """
+        :return: {dict} - the milliseconds of every recorded phase and their total
+        """
+        summary = dict((k, round(v * 1000, 3)) for k, v in self.seconds.items())
+        summary['total'] = round(sum(self.seconds.values()) * 1000, 3)
+        return summary
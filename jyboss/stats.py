@@ -0,0 +1,174 @@
+"""
+Instrumentation of the management operations a cli sends to the server. Every operation is recorded with its name,
+address, the size of the request and response in the DMR wire format, the time it took and the jyboss module that
+issued it. The records are aggregated into latency histograms by operation and by module.
+"""
+
+# Make coding more python3-ish
+from __future__ import (absolute_import, division, print_function)
+
+import sys
+
+from synchronize import make_synchronized
+from jyboss.exceptions import ContextError
+
+try:
+    from java.io import ByteArrayOutputStream
+except ImportError as jpe:
+    raise ContextError('Java packages are not available, please run this module with jython.', jpe)
+
+__metaclass__ = type
+
+# upper bounds in milliseconds of the latency histogram buckets, the last bucket takes everything slower
+LATENCY_BUCKETS = [1, 5, 10, 50, 100, 500, 1000, 5000]
+
+# number of the slowest operations that are kept with their address
+SLOWEST_OPERATIONS = 10
+
+
+def dmr_size(node):
+    """
+    :param node: {ModelNode} - a request or response
+    :return: {int} - the size of the node in bytes when it is sent over the wire, 0 for no node
+    """
+    if node is None:
+        return 0
+    out = ByteArrayOutputStream()
+    node.writeExternal(out)
+    return out.size()
+
+
+def calling_module():
+    """
+    :return: {str} - the class name of the innermost jyboss module on the call stack, None if no module is calling
+    """
+    from jyboss.command.core import CommandHandler
+    frame = sys._getframe(1)
+    while frame is not None:
+        caller = frame.f_locals.get('self')
+        if isinstance(caller, CommandHandler):
+            return caller.__class__.__name__
+        frame = frame.f_back
+    return None
+
+
+def _bucket_label(index):
+    if index < len(LATENCY_BUCKETS):
+        return '<=%dms' % LATENCY_BUCKETS[index]
+    return '>%dms' % LATENCY_BUCKETS[-1]
+
+
+class _Aggregate(object):
+    """
+    count, time, size and latency histogram of a group of operations
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.failed = 0
+        self.seconds = 0.0
+        self.min_seconds = None
+        self.max_seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, seconds, request_bytes, response_bytes, success):
+        self.count += 1
+        if not success:
+            self.failed += 1
+        self.seconds += seconds
+        self.min_seconds = seconds if self.min_seconds is None else min(self.min_seconds, seconds)
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        millis = seconds * 1000
+        index = 0
+        while index < len(LATENCY_BUCKETS) and millis > LATENCY_BUCKETS[index]:
+            index += 1
+        self.buckets[index] += 1
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'failed': self.failed,
+            'seconds': round(self.seconds, 3),
+            'min_ms': round((self.min_seconds or 0.0) * 1000, 3),
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'avg_ms': round(self.seconds * 1000 / self.count, 3) if self.count > 0 else 0.0,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'histogram': dict((_bucket_label(i), n) for i, n in enumerate(self.buckets) if n > 0)
+        }
+
+
+class OperationStats(object):
+    """
+    collects the management operations of a context, see JyBossContext.stats
+    """
+
+    def __init__(self):
+        self.total = _Aggregate()
+        self.by_operation = {}
+        self.by_module = {}
+        self.slowest = []
+
+    @make_synchronized
+    def record(self, request, response, seconds, command=None):
+        """
+        Record a management operation.
+
+        :param request: {ModelNode} - the operation request, None for a cli command that is not a management operation
+        :param response: {ModelNode} - the response of the server, None for a cli command
+        :param seconds: {float} - the time the operation took
+        :param command: {str} - the cli command if the request is None
+        """
+        from jyboss.command.core import dmr_address, address_to_path
+        if request is not None:
+            operation = request.get('operation').asString()
+            address = address_to_path(dmr_address(request))
+            if operation == 'composite':
+                operation = 'composite(%d)' % len(request.get('steps').asList())
+            success = response is not None and response.get('outcome').asString() == 'success'
+        else:
+            operation = command.strip().split(' ', 1)[0] if command is not None else 'unknown'
+            address = None
+            success = True
+        module = calling_module() or 'unknown'
+        request_bytes = dmr_size(request)
+        response_bytes = dmr_size(response)
+
+        self.total.add(seconds, request_bytes, response_bytes, success)
+        group = operation.split('(', 1)[0]
+        if group not in self.by_operation:
+            self.by_operation[group] = _Aggregate()
+        self.by_operation[group].add(seconds, request_bytes, response_bytes, success)
+        if module not in self.by_module:
+            self.by_module[module] = _Aggregate()
+        self.by_module[module].add(seconds, request_bytes, response_bytes, success)
+
+        if len(self.slowest) < SLOWEST_OPERATIONS or seconds > self.slowest[-1]['seconds']:
+            self.slowest.append({'operation': operation, 'address': address, 'module': module, 'seconds': seconds})
+            self.slowest.sort(key=lambda o: -o['seconds'])
+            del self.slowest[SLOWEST_OPERATIONS:]
+
+    @make_synchronized
+    def reset(self):
+        self.__init__()
+
+    @make_synchronized
+    def summary(self):
+        """
+        :return: {dict} - the aggregated operations, total and by operation and module as well as the slowest ones
+        """
+        summary = self.total.summary()
+        summary['by_operation'] = dict((k, v.summary()) for k, v in self.by_operation.items())
+        summary['by_module'] = dict((k, v.summary()) for k, v in self.by_module.items())
+        summary['slowest'] = [{
+            'operation': o['operation'],
+            'address': o['address'],
+            'module': o['module'],
+            'ms': round(o['seconds'] * 1000, 3)
+        } for o in self.slowest]
+        return summary
+
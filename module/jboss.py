@@ -14,14 +14,78 @@ module: jboss
 short_description: Manage jboss container via jboss-cli
 '''
 
+import os
 import sys
+import time
 
-from jyboss import jyboss, embedded, standalone
-from jyboss.command import *
-from jyboss.logging import debug
+_SCRIPT_START = time.time()
+
+
+def use_precompiled():
+    """
+    Put the precompiled jyboss package of `jython -m jyboss.precompile` on the path if it was compiled from the
+    installed sources, see jyboss.precompile. This has to be done before anything is imported from jyboss.
+    """
+    import imp
+    import json
+    jyboss_home = os.environ.get('JYBOSS_HOME', os.path.join(os.path.expanduser('~'), '.jyboss'))
+    cache_dir = os.path.join(jyboss_home, 'pycache')
+    try:
+        with open(os.path.join(cache_dir, 'stamp.json')) as f:
+            stamp = json.load(f)
+        source_dir = imp.find_module('jyboss')[1]
+        if stamp.get('source') != source_dir:
+            return False
+        files = {}
+        for root, _, names in os.walk(source_dir):
+            for name in names:
+                if name.endswith('.py'):
+                    st = os.stat(os.path.join(root, name))
+                    files[os.path.relpath(os.path.join(root, name), source_dir)] = [st.st_size, st.st_mtime]
+        if stamp.get('files') != files:
+            return False
+    except (IOError, OSError, ValueError, ImportError):
+        return False
+    sys.path.insert(0, cache_dir)
+    return True
+
+
+use_precompiled()
+
+from jyboss import jyboss
+from jyboss.logging import debug, warn
 from jyboss.ansible import AnsibleModule
-from jyboss.command import escape_keys
-from jyboss.exceptions import NotFoundError, ParameterError
+from jyboss.runner import configure_context, execute_instructions
+from jyboss.startup import StartupProfile
+
+StartupProfile.instance().started(_SCRIPT_START)
+
+
+def execute_in_daemon(params):
+    """
+    Hand the module instructions to the jyboss daemon, the daemon is started if it is not running yet.
+    :return: the module result or None if the instructions have to be executed in this process
+    """
+    from jyboss.daemon import DaemonClient, start_daemon
+
+    if params.get('embedded_mode', False):
+        warn('jyboss daemon cannot manage embedded servers, processing instructions in the module')
+        return None
+
+    if params.get('offline_mode', False):
+        warn('jyboss daemon cannot manage offline configurations, processing instructions in the module')
+        return None
+
+    client = DaemonClient()
+    if not client.is_available():
+        try:
+            client = start_daemon(idle_timeout=params.get('daemon_idle_timeout'))
+        except Exception as e:
+            warn('jyboss daemon not available, processing instructions in the module: %s' % e)
+            return None
+
+    debug('hand instructions to the jyboss daemon')
+    return client.execute(params)
 
 
 def main():
@@ -34,92 +98,42 @@ def main():
             argument_spec=dict(
                 jboss_home=dict(required=True),
                 config_file=dict(required=False, type='str'),
+                classpath_manifest=dict(required=False, type='str'),
                 embedded_mode=dict(default=False, type='bool'),
-                domain_mode=dict(default=False, type='bool')
+                offline_mode=dict(default=False, type='bool'),
+                domain_mode=dict(default=False, type='bool'),
+                composite=dict(default=False, type='bool'),
+                cache=dict(default=False, type='bool'),
+                controller_protocol=dict(required=False, type='str'),
+                controller_host=dict(required=False, type='str'),
+                controller_port=dict(required=False, type='int'),
+                admin_username=dict(required=False, type='str'),
+                admin_password=dict(required=False, type='str', no_log=True),
+                daemon=dict(default=False, type='bool'),
+                daemon_idle_timeout=dict(default=600, type='int'),
+                plan=dict(default=False, type='bool'),
+                plan_batch_size=dict(default=100, type='int'),
+                reload_timeout=dict(default=300, type='int'),
+                jyboss_stats=dict(default=False, type='bool'),
+                jyboss_profile=dict(default=False, type='bool')
             ),
+            supports_check_mode=True
         )
+        # endregion
 
-        # set a jboss home if it is not passed in as either ENV variable or set as system property
-        if 'jboss_home' in ansible.params:
-            jyboss.jboss_home = ansible.params['jboss_home']
-            debug('jboss_home set to %s' % jyboss.jboss_home)
-
-        if 'config_file' in ansible.params:
-            jyboss.config_file = ansible.params['config_file']
-            debug('config_file set to %s' % jyboss.config_file)
-
-        if ansible.params.get('domain_mode', False):
-            debug('interact in domain mode')
-        else:
-            debug('interact in standalone mode')
+        daemon_result = None
+        if ansible.params.get('daemon', False):
+            daemon_result = execute_in_daemon(ansible.params)
 
-        if ansible.params.get('embedded_mode', False):
-            conn = embedded
-            debug('embedded connect mode')
+        if daemon_result is not None:
+            result = daemon_result
+            if ansible.params.get('jyboss_profile', False):
+                # the daemon was started long ago, only the start of this process counts
+                result['jyboss_profile'] = StartupProfile.instance().summary()
         else:
-            conn = standalone
-            debug('server connect mode')
-
-        jyboss.interactive = False
-
-        change_processor = ChangeObservable()
-        # register all modules needed for processing, extensions not registered will simply be ignored
-        change_processor.register(ExtensionModule(jyboss))
-        change_processor.register(UndertowModule(jyboss))
-        change_processor.register(SocketBindingModule(jyboss))
-        change_processor.register(SecurityModule(jyboss))
-        change_processor.register(KeycloakAdapterModule(jyboss))
-        change_processor.register(KeycloakServerModule(jyboss))
-        change_processor.register(EEModule(jyboss))
-        change_processor.register(WeldModule(jyboss))
-        change_processor.register(ModClusterModule(jyboss))
-        change_processor.register(ModuleModule(jyboss))
-        change_processor.register(DatasourcesModule(jyboss))
-        change_processor.register(DeploymentModule(jyboss))
-        change_processor.register(CliCmdHandler(jyboss))
-        change_processor.register(ReloadCommandHandler(jyboss))
-        change_processor.register(JGroupsModule(jyboss))
-        change_processor.register(InfinispanModule(jyboss))
-        change_processor.register(InterfaceModule(jyboss))
-        # endregion
-
-        with conn:
-            if ansible.params.get('facts', False):
-                debug('jyboss.ansible: collecting facts')
-                facter = ansible.params['facts']
-                fact_path = '/'
-                fact_name = 'jboss'
-                fact_recursive = True
-                if isinstance(facter, dict):
-                    if 'path' in facter:
-                        fact_path = facter['path']
-                    if 'name' in facter:
-                        fact_name = facter['name']
-                    if 'recursive' in facter:
-                        fact_recursive = bool(facter['recursive'])
-                try:
-                    facts = cmd('%s:read-resource(recursive=%s)' % (fact_path, str(fact_recursive).lower()))
-                    result.setdefault('ansible_facts', {})[fact_name] = escape_keys(facts)
-                except NotFoundError:
-                    pass
-
-            changeset = change_processor.process_instructions(ansible.params)
-            if changeset.pop('changed', False):
-                result['changed'] = True
-                for key in changeset:
-                    if key in result and isinstance(result[key], list) and isinstance(changeset[key], list):
-                        # merge lists of the same key
-                        result[key] += changeset[key]
-                    elif key in result and isinstance(result[key], list):
-                        # add to result list if the change set is not a list
-                        result[key].append(changeset[key])
-                    elif key in result and result[key] is not None:
-                        raise ParameterError(
-                            'result key [%s] is already present and would otherwise be overridden: %r' %
-                            (key, result[key]))
-                    else:
-                        # we just transfer the value
-                        result[key] = changeset[key]
+            conn = configure_context(jyboss, ansible.params)
+            with conn:
+                result = execute_instructions(jyboss, ansible.params)
 
         ansible.exit_json(**result)
     except Exception as err:
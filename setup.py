@@ -92,6 +92,15 @@ setup(
         'jyboss.cli',
         'jyboss.exceptions',
         'jyboss.logging',
+        'jyboss.runner',
+        'jyboss.daemon',
+        'jyboss.driver',
+        'jyboss.offline',
+        'jyboss.stats',
+        'jyboss.content',
+        'jyboss.classpath',
+        'jyboss.startup',
+        'jyboss.precompile',
         'jyboss.command.core',
         'jyboss.command.undertow',
         'jyboss.command.extension',
@@ -107,6 +116,10 @@ setup(
         'jyboss.command.infinispan',
         'jyboss.command.interface',
         'jyboss.command.binding',
+        'jyboss.command.plan',
+        'jyboss.command.tree',
+        'jyboss.command.metadata',
+        'jyboss.command.scheduler',
         'jyboss.ansible'
     ]
 
@@ -2,16 +2,20 @@
 from __future__ import (absolute_import, division, print_function)
 
 import unittest
+import atexit
 import os
 import sys
 import tempfile
 import shutil
+import filecmp
 from functools import wraps
 import yaml
 import simplejson as json
 
-from jyboss.context import ConnectionResource, JyBossContext, MODE_STANDALONE, MODE_EMBEDDED
+from jyboss.context import ConnectionResource, JyBossContext, EmbeddedSession, MODE_STANDALONE, MODE_EMBEDDED, \
+    MODE_OFFLINE
 from jyboss.exceptions import ParameterError
+from jyboss.logging import debug
 
 try:
     import ConfigParser as configparser
@@ -34,6 +38,16 @@ for list_file in os.listdir(test_lib_dir):
         extra_jar = os.path.join(test_lib_dir, list_file)
         sys.path.append(extra_jar)
 
+# embedded tests share one embedded server which runs on this configuration file, the file is reset for every test
+EMBEDDED_CONFIG_FILE = 'jyboss-test-embedded.xml'
+
+
+@atexit.register
+def _log_embedded_reuse():
+    stats = EmbeddedSession.stats()
+    if stats['boots'] > 0:
+        debug('embedded server reuse of the test suite: %r' % stats)
+
 
 def jboss_context(jboss_home=None, config_file=None, mode=MODE_EMBEDDED, interactive=True):
     """
@@ -41,7 +55,7 @@ def jboss_context(jboss_home=None, config_file=None, mode=MODE_EMBEDDED, interac
     :param jboss_home: The path to the JBOSS application server to use for the test execution
     :param config_file: The configuration file to copy to the sever home, if none supplied default/standalone.xml
            is used.
-    :param mode: The context mode can be embedded, standalone or in future domain
+    :param mode: The context mode can be embedded, standalone, offline or in future domain
     :param interactive: Flag if the test should be executed interactively logging data to the stdout/stderr.
     :return: Functional wrapper of the test function with a configured test context.
     """
@@ -83,20 +97,40 @@ def jboss_context(jboss_home=None, config_file=None, mode=MODE_EMBEDDED, interac
                 # every test will use a separate configuration file so we can go back and inspect actions
                 test.context.config_file = fun.__name__ + ".xml"
                 test.context.interactive = interactive
+                # unless disabled in the test properties all embedded tests run on the same embedded server
+                test.context.reuse_embedded = mode == MODE_EMBEDDED and \
+                    test.read_test_configuration('embedded.reuse') != 'false'
 
-                if mode in [MODE_EMBEDDED, MODE_STANDALONE]:
+                if mode in [MODE_EMBEDDED, MODE_STANDALONE, MODE_OFFLINE]:
                     test.mode = mode
-                    # copy / override the test config file
                     test.src_config_path = str(_server_config_path)
+                    if test.context.reuse_embedded:
+                        test.inspect_config_path = str(
+                            Path(_jboss_home, 'standalone', 'configuration', test.context.config_file))
+                        test.context.config_file = EMBEDDED_CONFIG_FILE
                     test.dst_config_path = str(
                         Path(_jboss_home, 'standalone', 'configuration', test.context.config_file))
-                    shutil.copy2(test.src_config_path, test.dst_config_path)
+                    if not test.context.reuse_embedded:
+                        # copy / override the test config file
+                        shutil.copy2(test.src_config_path, test.dst_config_path)
+                    elif not os.path.isfile(test.dst_config_path) or \
+                            not filecmp.cmp(test.src_config_path, test.dst_config_path, shallow=False):
+                        # the running embedded server has to pick up the reset configuration file
+                        shutil.copy2(test.src_config_path, test.dst_config_path)
+                        EmbeddedSession.invalidate()
                 else:
                     raise NotImplemented('Testing in %s mode is not supported.' % mode)
 
                 # add a connection object to the method
                 test.connection = ConnectionResource(mode=mode, context=test.context)
 
+                if test.context.reuse_embedded:
+                    try:
+                        return fun(*args, **kwargs)
+                    finally:
+                        # keep a copy of the configuration the test produced for inspection
+                        shutil.copy2(test.dst_config_path, test.inspect_config_path)
+
             return fun(*args, **kwargs)
 
         return configure_test  # decorator
@@ -189,5 +223,6 @@ class JBossTest(unittest.TestCase, ConfigurationReaderMixIn, YamlLoaderMixIn):
         self.prop_file_name = None
         self.src_config_path = None
         self.dst_config_path = None
+        self.inspect_config_path = None
         self.config_dir = None
         self.test_dir = os.path.dirname(__file__)
@@ -0,0 +1,48 @@
+from . import *
+
+from jyboss.command.core import CommandHandler
+from jyboss.exceptions import CommandError, NotFoundError
+
+
+class TestAsync(JBossTest):
+    def setUp(self):
+        super(TestAsync, self).setUp()
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_reads_gathered_in_order(self):
+        with self.connection:
+            handler = CommandHandler(self.context)
+            pending = [handler.cmd_async('/interface=%s:read-attribute(name=name)' % name)
+                       for name in ['public', 'management']]
+            results = handler.gather(pending)
+        self.assertEqual(['public', 'management'], results)
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_not_found_ignored(self):
+        with self.connection:
+            handler = CommandHandler(self.context)
+            pending = [handler.cmd_async('/interface=public:read-resource'),
+                       handler.cmd_async('/interface=doesnotexist:read-resource')]
+            results = handler.gather(pending, dmr=True, ignore_not_found=True)
+        self.assertTrue(results[0].has('inet-address'))
+        self.assertIsNone(results[1])
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_not_found_raised(self):
+        with self.connection:
+            handler = CommandHandler(self.context)
+            pending = [handler.cmd_async('/interface=doesnotexist:read-resource'),
+                       handler.cmd_async('/interface=public:read-resource')]
+            with self.assertRaises(NotFoundError):
+                handler.gather(pending)
+            # the read after the failed one has been collected as well
+            self.assertTrue(pending[1].isDone())
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_refused_in_composite(self):
+        with self.connection:
+            handler = CommandHandler(self.context)
+            with handler.composite(always=True):
+                handler.queue_cmd('/interface=public:write-attribute(name=inet-address, value=127.0.0.2)')
+                with self.assertRaises(CommandError):
+                    handler.cmd_async('/interface=public:read-resource')
@@ -0,0 +1,36 @@
+import inspect
+import unittest
+
+from jyboss.command import ChangeObservable, HANDLERS, handler_class
+
+
+class _EchoHandler(object):
+    def apply(self, echo=None, **kwargs):
+        return [echo]
+
+
+class TestChangeObservable(unittest.TestCase):
+    def test_lazy_observer_created_on_use(self):
+        created = []
+
+        def factory():
+            created.append(True)
+            return _EchoHandler()
+
+        change_processor = ChangeObservable()
+        change_processor.register_lazy('echo', factory)
+
+        change_processor.process_instructions({'other': 'value'})
+        self.assertEqual([], created)
+
+        result = change_processor.process_instructions({'echo': 'hello'})
+        self.assertTrue(result['changed'])
+        self.assertEqual(['hello'], result['changes'][0]['changes'])
+
+        change_processor.process_instructions({'echo': 'again'})
+        self.assertEqual(1, len(created))
+
+    def test_handler_keys(self):
+        # the instruction key of every handler is the first argument of its apply method
+        for key, name in HANDLERS:
+            self.assertEqual(key, inspect.getargspec(handler_class(name).apply).args[1])
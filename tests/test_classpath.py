@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from jyboss.classpath import ClasspathCache, read_manifest, write_manifest
+from jyboss.exceptions import ContextError
+
+
+class TestClasspathCache(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.work_dir, 'classpath.json')
+        self.jboss_home = os.path.join(self.work_dir, 'server')
+        os.makedirs(os.path.join(self.jboss_home, 'bin', 'client'))
+        self.cli_jar = os.path.join(self.jboss_home, 'bin', 'client', 'jboss-cli-client.jar')
+        self.write_jar(self.cli_jar, '2.2.0.Final')
+        self.write_jar(os.path.join(self.jboss_home, 'jboss-modules.jar'), '1.5.2.Final')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    @staticmethod
+    def write_jar(path, version, mtime=None):
+        with zipfile.ZipFile(path, 'w') as jar:
+            jar.writestr('META-INF/MANIFEST.MF', 'Manifest-Version: 1.0\nImplementation-Version: %s\n\n' % version)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_resolve_cached(self):
+        cache = ClasspathCache(self.cache_file)
+        jars, version = cache.resolve(self.jboss_home)
+        self.assertEqual(2, len(jars))
+        self.assertEqual('2.2.0.Final', version)
+        self.assertEqual(1, cache.misses)
+
+        # a new cache reads the classpath from disk
+        cache = ClasspathCache(self.cache_file)
+        self.assertEqual((jars, version), cache.resolve(self.jboss_home))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(0, cache.misses)
+
+    def test_changed_jar_resolved_again(self):
+        cache = ClasspathCache(self.cache_file)
+        self.write_jar(self.cli_jar, '2.2.0.Final', mtime=1000000000)
+        cache.resolve(self.jboss_home)
+        self.write_jar(self.cli_jar, '3.0.10.Final', mtime=1000000100)
+        self.assertIsNone(cache.lookup(self.jboss_home))
+        self.assertEqual('3.0.10.Final', cache.resolve(self.jboss_home)[1])
+        self.assertEqual(2, cache.misses)
+
+    def test_missing_cli_jar(self):
+        os.remove(self.cli_jar)
+        self.assertRaises(ContextError, ClasspathCache(self.cache_file).resolve, self.jboss_home)
+
+    def test_manifest(self):
+        manifest = os.path.join(self.work_dir, 'classpath.txt')
+        jars = write_manifest(self.jboss_home, manifest)
+        self.assertEqual([os.path.abspath(jar) for jar in jars], read_manifest(manifest))
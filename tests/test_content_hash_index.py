@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import unittest
+import hashlib
+
+from jyboss.content import ContentHashIndex
+
+
+class TestContentHashIndex(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.index_file = os.path.join(self.work_dir, 'index.json')
+        self.artifact = os.path.join(self.work_dir, 'artifact.jar')
+        self.write('first')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def write(self, text, mtime=None):
+        with open(self.artifact, 'w') as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(self.artifact, (mtime, mtime))
+
+    def test_hash_persisted(self):
+        index = ContentHashIndex(self.index_file)
+        self.assertEqual(hashlib.sha1(b'first').hexdigest(), index.hash(self.artifact))
+        self.assertEqual(1, index.misses)
+        self.assertFalse(os.path.isfile(self.index_file))
+        index.flush()
+
+        # a new index reads the hash of the unchanged file from disk
+        index = ContentHashIndex(self.index_file)
+        self.assertEqual(hashlib.sha1(b'first').hexdigest(), index.hash(self.artifact))
+        self.assertEqual(1, index.hits)
+        self.assertEqual(0, index.misses)
+
+    def test_changed_file_hashed_again(self):
+        index = ContentHashIndex(self.index_file)
+        self.write('first', mtime=1000000000)
+        index.hash(self.artifact)
+        self.write('second!', mtime=1000000100)
+        self.assertEqual(hashlib.sha1(b'second!').hexdigest(), index.hash(self.artifact))
+        self.assertEqual(2, index.misses)
+
+    def test_unreadable_index_ignored(self):
+        with open(self.index_file, 'w') as f:
+            f.write('not json')
+        index = ContentHashIndex(self.index_file)
+        self.assertEqual(hashlib.sha1(b'first').hexdigest(), index.hash(self.artifact))
@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from jyboss.daemon import JyBossDaemon, DaemonClient
+from jyboss.exceptions import ProcessingError
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.state_dir, 'daemon.json')
+        self.daemon = JyBossDaemon(state_file=self.state_file, idle_timeout=0)
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+        self.client = DaemonClient(state_file=self.state_file, timeout=10)
+        for _ in range(50):
+            if os.path.isfile(self.state_file):
+                break
+            threading.Event().wait(0.1)
+
+    def tearDown(self):
+        self.daemon.server.shutdown()
+        self.thread.join(10)
+        shutil.rmtree(self.state_dir)
+
+    def test_ping(self):
+        self.assertTrue(self.client.is_available())
+
+    def test_invalid_token_rejected(self):
+        response = self.daemon.handle({'token': 'invalid', 'action': 'ping'})
+        self.assertEqual('error', response['status'])
+
+    def test_embedded_mode_rejected(self):
+        with self.assertRaises(ProcessingError):
+            self.client.execute({'embedded_mode': True})
+
+    def test_state_file_removed_on_shutdown(self):
+        self.daemon.server.shutdown()
+        self.thread.join(10)
+        self.assertFalse(os.path.exists(self.state_file))
+        self.assertFalse(self.client.is_available())
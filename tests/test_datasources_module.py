@@ -57,6 +57,42 @@ class TestDatasourcesModule(JBossTest):
             self.assertEqual('update', change['action'])
             # TODO validate that the xml configuration written reflects these changes
 
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_datasource_updated_composite(self):
+        with self.connection:
+            args = self.load_yaml()
+            self.context.composite = True
+            try:
+                changes = DatasourcesModule(self.context).apply(**args)
+            finally:
+                self.context.composite = False
+            self.context.interactive = True
+            print('datasource.present(update composite): \n%s\n----\n' % json.dumps(changes, indent=2))
+            self.assertIsNotNone(changes)
+            self.assertEqual(1, len(changes))
+            change = changes[0]
+            self.assertEqual('update', change['action'])
+            ds = DatasourcesModule(self.context).read_resource('/subsystem=datasources/data-source=ExampleDS')
+            self.assertEqual('java:jboss/datasources/ExampleDS1', ds['jndi-name'])
+            self.assertEqual('secretnew', ds['password'])
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_datasource_updated_cached(self):
+        with self.connection:
+            args = self.load_yaml()
+            self.context.cache = True
+            try:
+                module = DatasourcesModule(self.context)
+                changes = module.apply(**args)
+                self.assertIsNotNone(changes)
+                # the update must have invalidated the cached datasources subsystem
+                ds = module.read_resource('/subsystem=datasources/data-source=ExampleDS')
+                self.assertEqual('java:jboss/datasources/ExampleDS1', ds['jndi-name'])
+                # a second apply is served from the cache and finds nothing to change
+                self.assertIsNone(module.apply(**args))
+            finally:
+                self.context.cache = False
+
     @jboss_context(config_file='test_xa_datasource_updated.xml', mode=MODE_EMBEDDED, interactive=False)
     def test_xa_datasource_updated(self):
         with self.connection:
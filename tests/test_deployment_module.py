@@ -0,0 +1,47 @@
+from . import *
+
+import shutil
+import tempfile
+import zipfile
+
+from jyboss.command import DeploymentModule
+from jyboss.command.core import CommandHandler
+
+
+class TestDeploymentModule(JBossTest):
+    def setUp(self):
+        super(TestDeploymentModule, self).setUp()
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def archive(self, name, text):
+        path = os.path.join(self.work_dir, name)
+        with zipfile.ZipFile(path, 'w') as jar:
+            jar.writestr('META-INF/MANIFEST.MF', 'Manifest-Version: 1.0\n')
+            jar.writestr('content.txt', text)
+        return path
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_content_uploaded_once(self):
+        path = self.archive('upload-test.jar', 'first')
+        args = {'deployment': [{'name': 'upload-test.jar', 'path': path, 'enabled': False}]}
+        with self.connection:
+            try:
+                changes = DeploymentModule(self.context).apply(**args)
+                self.context.interactive = True
+                print('deployment.content(add): %r' % changes)
+                self.assertEqual(1, len(changes))
+                self.assertEqual('add', changes[0]['action'])
+                self.assertEqual(os.path.getsize(path), changes[0]['bytes'])
+
+                # the same content is not uploaded again
+                self.assertIsNone(DeploymentModule(self.context).apply(**args))
+
+                # changed content replaces the deployment
+                self.archive('upload-test.jar', 'second')
+                changes = DeploymentModule(self.context).apply(**args)
+                self.assertEqual('replace', changes[0]['action'])
+            finally:
+                CommandHandler(self.context).cmd('/deployment=upload-test.jar:remove()')
@@ -0,0 +1,81 @@
+from . import *
+
+from jyboss.command.core import convert_dmr_to_python, expression_deserializer
+
+
+class TestDmrConversion(JBossTest):
+    def setUp(self):
+        super(TestDmrConversion, self).setUp()
+        # the dmr library is loaded together with the cli client classes
+        context = JyBossContext(jboss_home=self.read_test_configuration('jboss.home'))
+        context.create_cli()
+
+    def _json_route(self, node):
+        return json.loads(node.toJSONString(True), object_hook=expression_deserializer)
+
+    def test_simple_types(self):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode, ValueExpression
+        node = ModelNode()
+        node.get('string').set('value')
+        node.get('int').set(7)
+        node.get('long').set(ModelNode(7).asLong())
+        node.get('bool').set(True)
+        node.get('expression').set(ValueExpression('${jboss.bind.address:127.0.0.1}'))
+        node.get('undefined')
+        node.get('list').add('a').add('b')
+        node.get('object').get('nested').set('value')
+        result = convert_dmr_to_python(node)
+        self.assertEqual(self._json_route(node), result)
+        self.assertEqual('${jboss.bind.address:127.0.0.1}', result['expression'])
+        self.assertIsNone(result['undefined'])
+
+    def test_property_list(self):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        node = ModelNode()
+        node.get('props').add('key1', 'value1').add('key2', 2)
+        result = convert_dmr_to_python(node)
+        self.assertEqual(self._json_route(node), result)
+        self.assertEqual([{'key1': 'value1'}, {'key2': 2}], result['props'])
+
+    def test_bytes_and_type(self):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode, ModelType
+        from jarray import array
+        node = ModelNode()
+        node.get('bytes').set(array([1, 2, 3], 'b'))
+        node.get('type').set(ModelType.STRING)
+        result = convert_dmr_to_python(node)
+        self.assertEqual(self._json_route(node), result)
+
+    def test_depth_and_path_filter(self):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        node = ModelNode()
+        node.get('data-source', 'ExampleDS', 'jndi-name').set('java:jboss/datasources/ExampleDS')
+        node.get('data-source', 'ExampleDS', 'connection-properties', 'prop', 'value').set('x')
+        node.get('data-source', 'OtherDS', 'jndi-name').set('java:jboss/datasources/OtherDS')
+        node.get('jdbc-driver', 'h2', 'driver-name').set('h2')
+
+        result = convert_dmr_to_python(node, path=['data-source', 'ExampleDS'])
+        self.assertEqual(['data-source'], list(result.keys()))
+        self.assertEqual(['ExampleDS'], list(result['data-source'].keys()))
+        self.assertEqual('x', result['data-source']['ExampleDS']['connection-properties']['prop']['value'])
+
+        result = convert_dmr_to_python(node, max_depth=3)
+        self.assertEqual('java:jboss/datasources/OtherDS', result['data-source']['OtherDS']['jndi-name'])
+        self.assertEqual({'prop': None}, result['data-source']['ExampleDS']['connection-properties'])
+
+    def test_deep_tree(self):
+        # noinspection PyUnresolvedReferences
+        from org.jboss.dmr import ModelNode
+        node = ModelNode()
+        current = node
+        for i in range(5000):
+            current = current.get('child')
+        current.set('leaf')
+        result = convert_dmr_to_python(node)
+        for i in range(5000):
+            result = result['child']
+        self.assertEqual('leaf', result)
@@ -0,0 +1,58 @@
+import time
+import unittest
+
+from java.util.concurrent import Callable
+
+from jyboss.driver import MultiHostDriver
+from jyboss.exceptions import ParameterError
+
+
+class _SleepTask(Callable):
+    def __init__(self, name, seconds):
+        self.name = name
+        self.seconds = seconds
+
+    def call(self):
+        time.sleep(self.seconds)
+        return dict(changed=True)
+
+
+class TestMultiHostDriver(unittest.TestCase):
+    def test_inventory_from_dict(self):
+        driver = MultiHostDriver({
+            'node1': {'controller_host': '10.0.0.1'},
+            'node2': {'controller_host': '10.0.0.2', 'controller_port': 9990}
+        })
+        hosts = dict((h['name'], h) for h in driver.inventory)
+        self.assertEqual(['node1', 'node2'], sorted(hosts.keys()))
+        self.assertEqual(9990, hosts['node2']['controller_port'])
+
+    def test_inventory_from_list_named_by_host(self):
+        driver = MultiHostDriver([{'controller_host': '10.0.0.1'}, {'controller_host': '10.0.0.2'}])
+        self.assertEqual(['10.0.0.1', '10.0.0.2'], [h['name'] for h in driver.inventory])
+
+    def test_duplicate_host_rejected(self):
+        with self.assertRaises(ParameterError):
+            MultiHostDriver([{'controller_host': '10.0.0.1'}, {'controller_host': '10.0.0.1'}])
+
+    def test_host_params_override_instructions(self):
+        driver = MultiHostDriver({'node1': {'controller_host': '10.0.0.1'}})
+        params = driver._host_params(driver.inventory[0], {'controller_host': 'localhost', 'datasources': {}})
+        self.assertEqual('10.0.0.1', params['controller_host'])
+        self.assertNotIn('name', params)
+        self.assertIn('datasources', params)
+
+    def test_embedded_mode_rejected(self):
+        driver = MultiHostDriver({'node1': {'controller_host': '10.0.0.1'}})
+        with self.assertRaises(ParameterError):
+            driver.apply({'embedded_mode': True})
+
+    def test_empty_inventory(self):
+        self.assertEqual(dict(changed=False, hosts={}, failed={}), MultiHostDriver([]).apply({}))
+
+    def test_default_timeout_waits_for_all_hosts(self):
+        driver = MultiHostDriver([{'controller_host': '10.0.0.1'}, {'controller_host': '10.0.0.2'}], max_workers=1)
+        result = driver._run([_SleepTask('10.0.0.1', 0.2), _SleepTask('10.0.0.2', 0.2)])
+        self.assertEqual({}, result['failed'])
+        self.assertEqual(['10.0.0.1', '10.0.0.2'], sorted(result['hosts'].keys()))
+        self.assertTrue(result['changed'])
@@ -1,6 +1,7 @@
 from . import *
 
 from jyboss.command import InfinispanModule
+from jyboss.stats import OperationStats
 
 
 class TestInfinispanModule(JBossTest):
@@ -36,4 +37,17 @@ class TestInfinispanModule(JBossTest):
             self.assertTrue('action' in change)
             self.assertEquals('add', change['action'])
             self.assertTrue('changes' in change)
-            self.assertEquals(4, len(change['changes']))
\ No newline at end of file
+            self.assertEquals(4, len(change['changes']))
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_containers_from_one_read(self):
+        with self.connection:
+            args = self.load_yaml()
+            self.context.stats = OperationStats()
+            changes = InfinispanModule(self.context).apply(**args)
+            by_operation = self.context.stats.summary()['by_operation']
+            self.context.stats = None
+            self.assertIsNotNone(changes)
+            # the subsystem is read once, the container with its transport and caches is written in a single round trip
+            self.assertEqual(1, by_operation['read-resource']['count'])
+            self.assertEqual(1, by_operation['composite']['count'])
@@ -1,6 +1,7 @@
 from . import *
 
 from jyboss.command import JGroupsModule
+from jyboss.stats import OperationStats
 
 
 class TestJGroupsModule(JBossTest):
@@ -28,3 +29,15 @@ class TestJGroupsModule(JBossTest):
             self.assertIsNotNone(changes)
             self.assertEqual(1, len(changes))
             self.assertTrue('stack' in changes[0])
+
+    @jboss_context(config_file='test_update_tcpping_properties.xml', mode=MODE_EMBEDDED, interactive=False)
+    def test_protocol_writes_in_one_composite(self):
+        with self.connection:
+            args = self.load_yaml()
+            self.context.stats = OperationStats()
+            changes = JGroupsModule(self.context).apply(**args)
+            by_operation = self.context.stats.summary()['by_operation']
+            self.context.stats = None
+            self.assertIsNotNone(changes)
+            # the property updates of the stack are written in a single round trip
+            self.assertEqual(1, by_operation['composite']['count'])
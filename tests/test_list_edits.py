@@ -0,0 +1,50 @@
+import unittest
+
+from jyboss.command.core import list_edits
+
+
+def _apply(old_list, edits):
+    result = list(old_list)
+    for op, i, v in edits:
+        if op == 'remove':
+            del result[i]
+        else:
+            result.insert(i, v)
+    return result
+
+
+class TestListEdits(unittest.TestCase):
+    def test_single_change(self):
+        old = ['node%d:7600' % i for i in range(20)]
+        new = list(old)
+        new[10] = 'node99:7600'
+        edits = list_edits(old, new)
+        self.assertEqual([('remove', 10, 'node10:7600'), ('add', 10, 'node99:7600')], edits)
+        self.assertEqual(new, _apply(old, edits))
+
+    def test_append_and_remove(self):
+        old = ['a', 'b', 'c', 'd']
+        new = ['b', 'c', 'd', 'e']
+        edits = list_edits(old, new)
+        self.assertEqual([('remove', 0, 'a'), ('add', 3, 'e')], edits)
+        self.assertEqual(new, _apply(old, edits))
+
+    def test_removes_from_the_end(self):
+        old = ['a', 'x', 'b', 'y', 'c']
+        new = ['a', 'b', 'c']
+        edits = list_edits(old, new)
+        self.assertEqual([('remove', 3, 'y'), ('remove', 1, 'x')], edits)
+        self.assertEqual(new, _apply(old, edits))
+
+    def test_same_list(self):
+        self.assertEqual([], list_edits(['a', 'b'], ['a', 'b']))
+
+    def test_any_lists(self):
+        samples = [[], ['a'], ['a', 'b', 'a'], ['b', 'a', 'c', 'a'], ['c', 'c', 'b'], ['a', 'b', 'c', 'd', 'e']]
+        for old in samples:
+            for new in samples:
+                self.assertEqual(new, _apply(old, list_edits(old, new)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from jyboss.command.metadata import MetadataIndex, release_key
+
+_DATASOURCES = {
+    'attributes': {},
+    'children': {
+        'data-source': {
+            'model-description': {
+                '*': {
+                    'attributes': {
+                        'min-pool-size': {'type': {'TYPE_MODEL_VALUE': 'INT'}, 'access-type': 'read-write',
+                                          'restart-required': 'no-services'},
+                        'jndi-name': {'type': {'TYPE_MODEL_VALUE': 'STRING'}, 'access-type': 'read-write',
+                                      'restart-required': 'all-services'},
+                        'enabled': {'type': {'TYPE_MODEL_VALUE': 'BOOLEAN'}, 'access-type': 'read-only'}
+                    },
+                    'children': {
+                        'connection-properties': {'model-description': {'*': {'attributes': {}}}}
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_release_key(self):
+        self.assertEqual('WildFly_Full-10.1.0.Final-2.2.0.Final', release_key({
+            'product-name': 'WildFly Full',
+            'product-version': '10.1.0.Final',
+            'release-version': '2.2.0.Final'
+        }))
+
+    def test_resource_type(self):
+        index = MetadataIndex('test', self.cache_dir)
+        self.assertIsNone(index.root_key(('subsystem', 'datasources')))
+        index.store('/subsystem=datasources', _DATASOURCES)
+
+        key = index.root_key(('subsystem', 'datasources'))
+        ds = index.resource_type(key, (('subsystem', 'datasources'), ('data-source', 'ExampleDS')))
+        self.assertIs(int, ds.attribute_type('min-pool-size'))
+        self.assertEqual('all-services', ds.restart_required('jndi-name'))
+        self.assertTrue(ds.read_only('enabled'))
+        self.assertFalse(ds.read_only('jndi-name'))
+        self.assertEqual(['connection-properties'], ds.child_types)
+        self.assertEqual(['jndi-name', 'min-pool-size'], sorted(ds.writable_attributes()))
+        self.assertIsNone(index.resource_type(key, (('subsystem', 'datasources'), ('jdbc-driver', 'h2'))))
+
+    def test_persisted_per_release(self):
+        MetadataIndex('test', self.cache_dir).store('/subsystem=datasources', _DATASOURCES)
+        self.assertTrue(os.path.isfile(os.path.join(self.cache_dir, 'test.json')))
+
+        index = MetadataIndex('test', self.cache_dir)
+        self.assertEqual('/subsystem=datasources', index.root_key(('subsystem', 'datasources')))
+        self.assertIsNone(MetadataIndex('other', self.cache_dir).root_key(('subsystem', 'datasources')))
+
+    def test_wildcard_root(self):
+        index = MetadataIndex('test', self.cache_dir)
+        index.store('/interface=*', {'attributes': {'nic': {'type': {'TYPE_MODEL_VALUE': 'STRING'}}}})
+        key = index.root_key(('interface', 'public'))
+        self.assertEqual('/interface=*', key)
+        self.assertTrue(index.resource_type(key, (('interface', 'public'),)).has_attribute('nic'))
+
+    def test_no_subsystem_wildcard(self):
+        index = MetadataIndex('test', self.cache_dir)
+        self.assertRaises(ValueError, index.store, '/subsystem=*', _DATASOURCES)
+        # an index persisted with a wildcard by an older version does not serve it
+        index._load()['/subsystem=*'] = _DATASOURCES
+        self.assertIsNone(index.root_key(('subsystem', 'undertow')))
+
+
+if __name__ == '__main__':
+    unittest.main()
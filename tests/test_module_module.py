@@ -28,3 +28,33 @@ class TestModuleModule(JBossTest):
 
             del_change = changes[1]
             self.assertEqual('delete', del_change.get('action', None))
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_module_update(self):
+        with self.connection:
+            args = self.load_yaml()
+            resource_dir = os.path.join(self.test_dir, 'configurations', self.__class__.__name__)
+            module = args['module'][0]
+            module['resources'] = [
+                os.path.join(resource_dir, 'some-module.jar'),
+                os.path.join(resource_dir, 'some-module.properties')
+            ]
+
+            changes = ModuleModule(self.context).apply(**args)
+            self.assertEqual('add', changes[0].get('action', None))
+            self.assertEqual(['some-module.jar', 'some-module.properties'], changes[0].get('resources', None))
+
+            # nothing changed, nothing is copied
+            changes = ModuleModule(self.context).apply(**args)
+            self.assertIsNone(changes)
+
+            # dropping a resource updates the module in place
+            module['resources'] = [os.path.join(resource_dir, 'some-module.jar')]
+            changes = ModuleModule(self.context).apply(**args)
+            self.assertEqual('update', changes[0].get('action', None))
+            self.assertIsNone(changes[0].get('resources', None))
+            self.assertEqual(['some-module.properties'], changes[0].get('removed', None))
+
+            module['state'] = 'absent'
+            changes = ModuleModule(self.context).apply(**args)
+            self.assertEqual('delete', changes[0].get('action', None))
@@ -0,0 +1,72 @@
+from . import *
+
+from jyboss.command import DatasourcesModule, InterfaceModule, SocketBindingModule
+
+
+class TestOffline(JBossTest):
+    def setUp(self):
+        super(TestOffline, self).setUp()
+
+    def read_config(self):
+        with open(self.dst_config_path, 'r') as f:
+            return f.read()
+
+    @jboss_context(mode=MODE_OFFLINE, interactive=False)
+    def test_datasource_added(self):
+        args = self.load_yaml()
+        with self.connection:
+            changes = DatasourcesModule(self.context).apply(**args)
+        self.context.interactive = True
+        print('offline.datasources.present(add): %r' % changes)
+        self.assertEqual(1, len(changes))
+        self.assertEqual('add', changes[0]['action'])
+        config = self.read_config()
+        self.assertTrue('pool-name="OfflineDS"' in config)
+        self.assertTrue('<max-pool-size>20</max-pool-size>' in config)
+
+        # a second run against the written file must not find anything to change
+        with self.connection:
+            changes = DatasourcesModule(self.context).apply(**args)
+        self.assertEqual(0, len(changes))
+
+    @jboss_context(mode=MODE_OFFLINE, interactive=False)
+    def test_interface_added(self):
+        args = self.load_yaml()
+        with self.connection:
+            changes = InterfaceModule(self.context).apply(**args)
+        self.context.interactive = True
+        print('offline.interface.present(add): %r' % changes)
+        self.assertEqual(1, len(changes))
+        self.assertEqual('add', changes[0]['action'])
+        self.assertTrue('<interface name="offline">' in self.read_config())
+
+        with self.connection:
+            changes = InterfaceModule(self.context).apply(**args)
+        self.assertEqual(0, len(changes))
+
+    @jboss_context(mode=MODE_OFFLINE, interactive=False)
+    def test_binding_updated(self):
+        args = self.load_yaml()
+        with self.connection:
+            changes = SocketBindingModule(self.context).apply(**args)
+        self.context.interactive = True
+        print('offline.binding.present(update): %r' % changes)
+        self.assertEqual(1, len(changes))
+        self.assertEqual('update', changes[0]['action'])
+        self.assertTrue('<socket-binding name="http" port="8180"/>' in self.read_config())
+
+    @jboss_context(mode=MODE_OFFLINE, interactive=False)
+    def test_unchanged_file_not_written(self):
+        mtime = os.path.getmtime(self.dst_config_path)
+        with self.connection as conn:
+            conn.jcli.cmd('/interface=public:read-resource')
+        self.assertEqual(mtime, os.path.getmtime(self.dst_config_path))
+
+    @jboss_context(mode=MODE_OFFLINE, interactive=False)
+    def test_failed_save_raises(self):
+        with self.assertRaises(Exception):
+            with self.connection as conn:
+                conn.jcli.cmd('/interface=public:write-attribute(name=inet-address, value=127.0.0.2)')
+                # the configuration file cannot be written to a directory that does not exist
+                conn.jcli.config_path = os.path.join(self.dst_config_path + '.missing', 'standalone.xml')
+        self.assertFalse('127.0.0.2' in self.read_config())
@@ -0,0 +1,72 @@
+from . import *
+
+from jyboss.command import ChangeObservable, InterfaceModule, SocketBindingModule
+from jyboss.command.core import CommandHandler
+from jyboss.command.plan import Plan, Planner
+from jyboss.exceptions import NotFoundError
+
+
+class TestPlan(JBossTest):
+    def setUp(self):
+        super(TestPlan, self).setUp()
+
+    def planner(self):
+        change_processor = ChangeObservable()
+        change_processor.register(InterfaceModule(self.context))
+        change_processor.register(SocketBindingModule(self.context))
+        return Planner(self.context, change_processor)
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_plan_not_executed(self):
+        with self.connection:
+            args = self.load_yaml()
+            changeset, plan = self.planner().plan(args)
+            self.context.interactive = True
+            print('plan: \n%s\n----\n' % json.dumps(plan.commands(), indent=2))
+            self.assertTrue(changeset['changed'])
+            self.assertEqual(2, len(plan.operations))
+            self.assertTrue(plan.commands()[0].startswith('/interface=plantest:add('))
+            self.assertEqual(['/interface=plantest', '/socket-binding-group=standard-sockets'],
+                             [d['after_header'] for d in plan.diff()])
+            self.assertEqual('', plan.diff()[0]['before'])
+
+            handler = CommandHandler(self.context)
+            with self.assertRaises(NotFoundError):
+                handler.cmd_dmr('/interface=plantest:read-resource')
+            binding = handler.cmd_dmr('/socket-binding-group=standard-sockets/socket-binding=http:read-resource')
+            self.assertNotEqual('8180', binding.get('port').asString())
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_plan_executed(self):
+        with self.connection:
+            args = self.load_yaml()
+            planner = self.planner()
+            changeset, plan = planner.plan(args)
+            planner.execute(plan)
+
+            handler = CommandHandler(self.context)
+            iface = handler.cmd_dmr('/interface=plantest:read-resource')
+            self.assertEqual('10.0.0.1', iface.get('inet-address').asString())
+
+            # the plan of instructions that are already applied is empty
+            changeset, plan = planner.plan(args)
+            self.assertFalse(changeset['changed'])
+            self.assertEqual(0, len(plan.operations))
+
+    @jboss_context(mode=MODE_EMBEDDED, interactive=False)
+    def test_wildcard_read_planned(self):
+        with self.connection:
+            handler = CommandHandler(self.context)
+            expected = handler.cmd_dmr('/interface=*:read-attribute(name=inet-address)')
+            plan = Plan(handler._cli())
+            self.context.plan = plan
+            try:
+                handler.cmd('/interface=public:write-attribute(name=inet-address, value=10.0.0.2)')
+                items = handler.cmd_dmr('/interface=*:read-attribute(name=inet-address)')
+            finally:
+                self.context.plan = None
+            self.assertEqual(len(expected.asList()), len(items.asList()))
+            planned = dict((item.get('address').asList()[0].asProperty().getValue().asString(),
+                            item.get('result').asString()) for item in items.asList())
+            self.assertEqual('10.0.0.2', planned['public'])
+            self.assertEqual(1, len(plan.operations))
@@ -0,0 +1,139 @@
+import unittest
+
+from jyboss.command.scheduler import ReloadScheduler, RELOAD_REQUIRED
+from jyboss.exceptions import OperationError
+
+
+class _Value(object):
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, key):
+        return _Value(self.value)
+
+    def asString(self):
+        return self.value
+
+
+class _Result(object):
+    def __init__(self, state):
+        self.state = state
+
+    def isSuccess(self):
+        return True
+
+    def getResponse(self):
+        return _Value(self.state)
+
+
+class _Cli(object):
+    def __init__(self, states):
+        self.states = list(states)
+        self.commands = []
+        self.reconnects = 0
+
+    def cmd(self, cli_command):
+        self.commands.append(cli_command)
+        if cli_command == ':reload':
+            return _Result(None)
+        state = self.states.pop(0)
+        if state is None:
+            raise IOError('connection closed')
+        return _Result(state)
+
+    def reconnect(self):
+        self.reconnects += 1
+
+
+class _Connection(object):
+    def __init__(self, jcli, process_state=None):
+        self.jcli = jcli
+        self.process_state = process_state
+        self.reload_requested = None
+        self.reload_deferred = False
+        self.model_cache = object()
+
+    def get_mode(self):
+        return 'standalone'
+
+
+class _Context(object):
+    def __init__(self, connection):
+        self.connection = connection
+
+
+class TestReloadScheduler(unittest.TestCase):
+    def _scheduler(self, states, process_state=None, timeout=300):
+        self.jcli = _Cli(states)
+        self.connection = _Connection(self.jcli, process_state)
+        return ReloadScheduler(_Context(self.connection), timeout=timeout, initial_delay=0.001, max_delay=0.004)
+
+    def test_not_requested(self):
+        self.assertIsNone(self._scheduler([]).run())
+        self.assertEqual([], self.jcli.commands)
+
+    def test_one_reload_for_many_requests(self):
+        scheduler = self._scheduler([None, 'starting', 'running'])
+        for _ in range(5):
+            scheduler.request()
+        scheduler.request(RELOAD_REQUIRED)
+        report = scheduler.run()
+        self.assertTrue(report['reloaded'])
+        self.assertEqual(3, report['polls'])
+        self.assertIsNone(report['process_state'])
+        self.assertEqual(1, self.jcli.commands.count(':reload'))
+        self.assertEqual(1, self.jcli.reconnects)
+        self.assertIsNone(self.connection.model_cache)
+        self.assertIsNone(scheduler.run())
+
+    def test_waits_for_reload_to_begin(self):
+        scheduler = self._scheduler(['running', 'running', None, 'starting', 'running'])
+        scheduler.request()
+        report = scheduler.run()
+        self.assertTrue(report['reloaded'])
+        self.assertEqual(5, report['polls'])
+
+    def test_required_only_if_reload_required(self):
+        scheduler = self._scheduler(['running'])
+        scheduler.request(RELOAD_REQUIRED)
+        self.assertFalse(scheduler.run()['reloaded'])
+        self.assertEqual([], self.jcli.commands)
+
+        scheduler = self._scheduler(['reload-required', None, 'running'], process_state='reload-required')
+        scheduler.request(RELOAD_REQUIRED)
+        self.assertTrue(scheduler.run()['reloaded'])
+
+    def test_restart_required_not_reloaded(self):
+        scheduler = self._scheduler([], process_state='restart-required')
+        scheduler.request(RELOAD_REQUIRED)
+        report = scheduler.run()
+        self.assertFalse(report['reloaded'])
+        self.assertEqual('restart-required', report['process_state'])
+
+    def test_reload_right_away(self):
+        scheduler = self._scheduler([None, 'running'])
+        self.assertTrue(scheduler.reload()['reloaded'])
+        self.assertEqual(1, self.jcli.commands.count(':reload'))
+
+    def test_deferred_until_run(self):
+        scheduler = self._scheduler([None, 'running'], process_state='reload-required')
+        scheduler.defer()
+        self.assertTrue(scheduler.deferred())
+        scheduler.request(RELOAD_REQUIRED)
+        self.assertTrue(scheduler.run()['reloaded'])
+        self.assertFalse(scheduler.deferred())
+
+    def test_cancel(self):
+        scheduler = self._scheduler([])
+        scheduler.request()
+        scheduler.cancel()
+        self.assertIsNone(scheduler.run())
+
+    def test_timeout(self):
+        scheduler = self._scheduler(['reload-required'] * 100, timeout=0)
+        scheduler.request()
+        self.assertRaises(OperationError, scheduler.run)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from jyboss.startup import StartupProfile
+from jyboss.precompile import precompile, is_current
+
+
+class TestStartupProfile(unittest.TestCase):
+    def test_nested_phases_counted_once(self):
+        profile = StartupProfile()
+        with profile.phase('cli_init'):
+            time.sleep(0.05)
+            with profile.phase('classpath'):
+                time.sleep(0.1)
+        self.assertTrue(profile.seconds['classpath'] >= 0.1)
+        self.assertTrue(0.05 <= profile.seconds['cli_init'] < 0.1)
+        summary = profile.summary()
+        self.assertEqual(round(summary['cli_init'] + summary['classpath'], 3), summary['total'])
+
+
+class TestPrecompile(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.source_dir = os.path.join(self.work_dir, 'source', 'jyboss')
+        self.cache_dir = os.path.join(self.work_dir, 'cache')
+        os.makedirs(self.source_dir)
+        with open(os.path.join(self.source_dir, '__init__.py'), 'w') as f:
+            f.write('VALUE = 1\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_cache_stale_after_source_change(self):
+        self.assertFalse(is_current(self.cache_dir, self.source_dir))
+        compiled = precompile(self.cache_dir, self.source_dir)
+        self.assertEqual(1, len(compiled))
+        self.assertTrue(is_current(self.cache_dir, self.source_dir))
+
+        with open(os.path.join(self.source_dir, 'added.py'), 'w') as f:
+            f.write('VALUE = 2\n')
+        self.assertFalse(is_current(self.cache_dir, self.source_dir))
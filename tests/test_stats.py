@@ -0,0 +1,29 @@
+from . import *
+
+from jyboss.command import InterfaceModule
+from jyboss.stats import OperationStats
+
+
+class TestStats(JBossTest):
+    def setUp(self):
+        super(TestStats, self).setUp()
+
+    @jboss_context(mode=MODE_OFFLINE, interactive=False)
+    def test_operations_recorded(self):
+        args = self.load_yaml()
+        self.context.stats = OperationStats()
+        try:
+            with self.connection:
+                changes = InterfaceModule(self.context).apply(**args)
+            summary = self.context.stats.summary()
+        finally:
+            self.context.stats = None
+        self.context.interactive = True
+        print('stats.summary: %r' % summary)
+        self.assertEqual(1, len(changes))
+        self.assertTrue(summary['count'] >= 2)
+        self.assertTrue('add' in summary['by_operation'])
+        self.assertTrue('InterfaceModule' in summary['by_module'])
+        self.assertEqual(summary['count'], summary['by_module']['InterfaceModule']['count'])
+        self.assertTrue(summary['request_bytes'] > 0)
+        self.assertEqual(summary['count'], sum(summary['histogram'].values()))
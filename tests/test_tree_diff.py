@@ -0,0 +1,114 @@
+import unittest
+
+from jyboss.command.tree import ResourceSchema, TreeDiff, same_value
+from jyboss.exceptions import ParameterError
+
+_PROPERTIES = ResourceSchema(value='value', recreate=True)
+
+_SCHEMA = ResourceSchema(attributes=['enabled', 'jndi-name', 'min-pool-size'],
+                         immutable=['jndi-name'],
+                         children={
+                             'property': _PROPERTIES,
+                             'handler': ResourceSchema(attributes=['level'], prune=True)
+                         })
+
+
+class TestTreeDiff(unittest.TestCase):
+    def test_in_sync(self):
+        current = {'enabled': True, 'jndi-name': 'java:/a', 'min-pool-size': 3, 'property': {'a': {'value': 'x'}}}
+        operations, change = TreeDiff().diff('/r=a', _SCHEMA, {
+            'name': 'a',
+            'enabled': 'true',
+            'min-pool-size': '3',
+            'property': {'a': 'x'}
+        }, current)
+        self.assertEqual([], operations)
+        self.assertIsNone(change)
+
+    def test_add_before_children(self):
+        operations, change = TreeDiff().diff('/r=a', _SCHEMA, {
+            'enabled': True,
+            'property': {'a': 'x'},
+            'handler': [{'name': 'h', 'level': 'INFO'}]
+        }, None)
+        ops = [op for op, _ in operations]
+        self.assertEqual('/r=a:add(enabled=true)', ops[0])
+        self.assertEqual({'/r=a/property=a:add(value="x")', '/r=a/handler=h:add(level="INFO")'}, set(ops[1:]))
+        self.assertEqual('add', change['action'])
+        self.assertEqual(2, len(change['changes']))
+
+    def test_minimal_update(self):
+        current = {
+            'enabled': True,
+            'jndi-name': 'java:/a',
+            'min-pool-size': 3,
+            'property': {'a': {'value': 'x'}, 'b': {'value': 'y'}},
+            'handler': {'h': {'level': 'INFO'}, 'old': {'level': 'INFO'}}
+        }
+        operations, change = TreeDiff().diff('/r=a', _SCHEMA, {
+            'enabled': False,
+            'jndi-name': 'java:/b',
+            'property': {'a': 'z', 'b': None},
+            'handler': [{'name': 'h', 'level': 'INFO'}]
+        }, current)
+        ops = [op for op, _ in operations]
+        # removes first, then attribute writes, a changed property is replaced
+        self.assertEqual({'/r=a/property=b:remove()', '/r=a/handler=old:remove()'}, set(ops[:2]))
+        self.assertEqual(['/r=a:write-attribute(name=enabled, value=false)',
+                          '/r=a/property=a:remove()',
+                          '/r=a/property=a:add(value="z")'], ops[2:])
+        self.assertEqual('update', change['action'])
+        by_name = dict((c.get('attribute', c.get('resource')), c) for c in change['changes'])
+        self.assertEqual({'attribute': 'a', 'action': 'update', 'old_value': 'x', 'new_value': 'z'}, by_name['a'])
+        self.assertEqual('delete', by_name['b']['action'])
+        self.assertEqual('delete', by_name['handler=old']['action'])
+        self.assertFalse('jndi-name' in by_name)
+
+    def test_attributes_from_description(self):
+        description = {
+            'attributes': {
+                'enabled': {'type': {'TYPE_MODEL_VALUE': 'BOOLEAN'}, 'access-type': 'read-write'},
+                'runtime': {'type': {'TYPE_MODEL_VALUE': 'STRING'}, 'access-type': 'read-only'}
+            },
+            'children': {}
+        }
+        operations, change = TreeDiff(description).diff('/r=a', ResourceSchema(), {
+            'enabled': 'false',
+            'runtime': 'x'
+        }, {'enabled': None, 'runtime': 'y'})
+        self.assertEqual(['/r=a:write-attribute(name=enabled, value=false)'], [op for op, _ in operations])
+
+    def test_unknown_attribute_rejected(self):
+        description = {'attributes': {'enabled': {'type': {'TYPE_MODEL_VALUE': 'BOOLEAN'}}}, 'children': {}}
+        schema = ResourceSchema(attributes=['enabled', 'min-pool-size'])
+        # a declared attribute the server does not know is only left out if the document does not set it
+        operations, _ = TreeDiff(description).diff('/r=a', schema, {'enabled': True}, None)
+        self.assertEqual(['/r=a:add(enabled=true)'], [op for op, _ in operations])
+        self.assertRaises(ParameterError, TreeDiff(description).diff, '/r=a', schema, {'min-pool-size': 3}, None)
+
+    def test_unchanged_subtrees_skipped(self):
+        visited = []
+
+        class _Recording(TreeDiff):
+            def _diff(self, operations, path, *args):
+                visited.append(path)
+                return super(_Recording, self)._diff(operations, path, *args)
+
+        current = {'enabled': True, 'handler': dict(('h%d' % i, {'level': 'INFO'}) for i in range(10))}
+        target_state = {'enabled': 'true', 'handler': [{'name': 'h%d' % i, 'level': 'INFO'} for i in range(10)]}
+        self.assertEqual(([], None), _Recording().diff('/r=a', _SCHEMA, target_state, current))
+        self.assertEqual([], visited)
+
+        target_state['handler'][3]['level'] = 'DEBUG'
+        operations, _ = _Recording().diff('/r=a', _SCHEMA, target_state, current)
+        self.assertEqual(['/r=a/handler=h3:write-attribute(name=level, value="DEBUG")'], [op for op, _ in operations])
+        self.assertEqual(['/r=a', '/r=a/handler=h3'], visited)
+
+    def test_same_value(self):
+        self.assertTrue(same_value([{'a': 1}, 'b'], ['b', {'a': '1'}]))
+        self.assertFalse(same_value(['a', 'a'], ['a']))
+        self.assertTrue(same_value({'a': True}, {'a': 'true'}))
+
+
+if __name__ == '__main__':
+    unittest.main()